@@ -7,6 +7,13 @@ from .faculty_api import (
     faculty_bp,
     teacher_bp,
     schedule_bp,
+    blocked_time_bp,
+    room_bp,
+    sandbox_bp,
+    job_bp,
+    changes_bp,
+    sync_bp,
+    config_bp,
     register_api_routes,
     success_response,
     error_response
@@ -16,6 +23,13 @@ __all__ = [
     'faculty_bp',
     'teacher_bp',
     'schedule_bp',
+    'blocked_time_bp',
+    'room_bp',
+    'sandbox_bp',
+    'job_bp',
+    'changes_bp',
+    'sync_bp',
+    'config_bp',
     'register_api_routes',
     'success_response',
     'error_response'
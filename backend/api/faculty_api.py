@@ -6,30 +6,160 @@ API Version: 1.0
 Author: Matrix Agent
 """
 
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, g, stream_with_context
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import uuid
 import sys
 import os
+import threading
+import json
+import heapq
+import pickle
+import time
+import shutil
+import tempfile
+from operator import attrgetter, itemgetter
 
 # 添加父目录到路径，导入核心模块
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from teacher_management import TeacherManagement, FACULTY_CONFIG, FACULTY_MAPPING, INSTRUMENT_CONFIGS
+import teacher_management  # noqa: F401  导入时安装内置教研室与乐器配置注册表
+from faculty_registry import (
+    ConfigError,
+    FacultyRegistry,
+    current_config,
+    current_registry,
+    install_registry,
+    load_config_file,
+    save_config_file
+)
 from faculty_constraint_validator import FacultyConstraintValidator
+from schedule_store import ScheduleStore, HOURS_SCALE, parse_date_ordinal, format_date_ordinal
+from schedule_overlay import ScheduleOverlay
+from blocked_time import (
+    BlockedTimeCalendar, BlockedTimeError, BulkLoadError, BLOCK_KINDS, date_for_weekday, week_start
+)
+from room_registry import RoomRegistry, RoomError
+from room_assignment import assign_rooms
+from leave_repair import affected_records, plan_leave_repair
+from schedule_optimizer import ScheduleClass, ScheduleOptimizer, DEFAULT_WEIGHTS
+from group_packing import pack_groups, DEFAULT_MAX_WEEKLY_HOURS
+from job_queue import JobQueue, JobFailed, JOB_STATUSES, checkpoint
+from change_feed import ChangeFeed
+from sync_log import SyncLog, TrackedDict
+from persistence import Persistence, int_column
+from schedule_archive import (
+    ArchiveError, ArchiveSegment, TermArchive, CODECS, DEFAULT_CODEC,
+    combine_segments, encode_records, encode_segment, workload_report
+)
+from app_state import SchedulerState
+from qualification_matrix import (
+    QualificationMatrix,
+    PROFICIENCY_LEVELS,
+    QUAL_FACULTY_MISMATCH,
+    QUAL_NOT_GRANTED,
+    QUAL_UNKNOWN_INSTRUMENT,
+    QUAL_UNKNOWN_TEACHER
+)
 
 # 创建蓝图
 faculty_bp = Blueprint('faculty', __name__, url_prefix='/api/faculty')
 teacher_bp = Blueprint('teacher', __name__, url_prefix='/api/teacher')
 schedule_bp = Blueprint('schedule', __name__, url_prefix='/api/schedule')
+blocked_time_bp = Blueprint('blocked_time', __name__, url_prefix='/api/blocked-time')
+room_bp = Blueprint('room', __name__, url_prefix='/api/rooms')
+sandbox_bp = Blueprint('sandbox', __name__, url_prefix='/api/sandbox')
+job_bp = Blueprint('job', __name__, url_prefix='/api/jobs')
+changes_bp = Blueprint('changes', __name__, url_prefix='/api/changes')
+sync_bp = Blueprint('sync', __name__, url_prefix='/api/sync')
+config_bp = Blueprint('config', __name__, url_prefix='/api/config')
+
+# 增量同步日志：教师、课程、排课与教学资格的每次写入分配版本号（/api/sync）
+sync_log = SyncLog()
 
 # 存储（实际项目中应使用数据库）
-# 这里使用内存存储作为演示
-teachers_db = {}
-courses_db = {}
-schedule_db = {}
-teacher_instruments_db = {}  # teacher_id -> List[instrument_name, proficiency_level]
+# 这里使用内存存储作为演示；顶层写入自动记入同步日志与预写日志
+teachers_db = TrackedDict(lambda key, deleted: record_write('teachers', key, deleted))
+courses_db = TrackedDict(lambda key, deleted: record_write('courses', key, deleted))
+schedule_db = ScheduleStore()  # 紧凑排课记录存储，序列化时再转换为字典
+
+# 列式镜像：统计接口使用向量化计算，可通过 SCHEDULE_COLUMNAR_STORE=false 关闭（在启动预热中挂载）
+COLUMNAR_STORE_ENABLED = os.environ.get('SCHEDULE_COLUMNAR_STORE', 'true').lower() == 'true'
+teacher_instruments_db = TrackedDict(  # teacher_id -> {instrument_name: 资格记录}
+    lambda key, deleted: record_write('teacher_instruments', key, deleted)
+)
+sandboxes_db = {}  # sandbox_id -> {"overlay": ScheduleOverlay, "created_at": ...}
+
+# 禁排时间日历（基础禁排、优先级禁排、教师禁排），所有排课路径都会查询
+blocked_time_calendar = BlockedTimeCalendar()
+
+# 教室登记表（按类型与容量索引），用于教室校验与自动分配
+room_registry = RoomRegistry()
+
+# 存储写锁：批量操作在锁内先整体校验再一次性应用
+store_lock = threading.RLock()
+
+# 本地数据目录（后台任务等运行时数据）
+DATA_DIR = os.environ.get(
+    'SCHEDULER_DATA_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+)
+
+# 变更推送：排课、教学资格与教师写入事件的环形缓冲区
+change_feed = ChangeFeed(int(os.environ.get('CHANGE_FEED_CAPACITY', 10000)))
+
+# SSE 订阅无事件时发送心跳的间隔（秒），避免代理断开空闲连接
+CHANGE_STREAM_KEEPALIVE = 15
+
+# 持久化：预写日志 + 后台快照（SCHEDULER_PERSISTENCE=false 时关闭），在 register_api_routes 中恢复并启动
+PERSISTENCE_ENABLED = os.environ.get('SCHEDULER_PERSISTENCE', 'true').lower() == 'true'
+persistence = Persistence(
+    DATA_DIR,
+    fsync=os.environ.get('WAL_FSYNC', 'false').lower() == 'true',
+    interval=float(os.environ.get('SNAPSHOT_INTERVAL', 300))
+)
+
+# 启动预热（挂载列式镜像、恢复持久化数据、启动任务队列）在后台线程中执行，
+# 完成前配置类接口即可响应，其余接口最多等待 WARMUP_WAIT 秒，仍未完成时返回 503
+WARMUP_WAIT = float(os.environ.get('WARMUP_WAIT', 30))
+warm_up_started = False
+warm_up_done = threading.Event()
+startup_timings: Dict[str, float] = {}
+
+# 过往学期归档：按学期写入压缩的列式归档段，在线存储只保留当前学期
+term_archive = TermArchive(os.path.join(DATA_DIR, 'archive'))
+
+# 后台任务队列（耗时的生成与导入操作），在预热完成后启动
+job_queue = JobQueue(os.path.join(DATA_DIR, 'jobs.json'), int(os.environ.get('JOB_WORKERS', 2)))
+
+# 教师资格矩阵（乐器 -> 教研室代码，与 teachers_db 中的 faculty_code 一致）
+# 教研室与乐器配置文件（运行时可通过 /api/config 替换），不存在时使用 teacher_management 中的内置配置
+CONFIG_FILE = os.environ.get('FACULTY_CONFIG_FILE', os.path.join(DATA_DIR, 'faculty_config.json'))
+startup_config = load_config_file(CONFIG_FILE)
+startup_registry = FacultyRegistry.from_config(startup_config) if startup_config is not None else current_registry()
+install_registry(startup_registry, QualificationMatrix(startup_registry.instrument_faculty_codes()))
+
+# 资格校验原因码说明（按位组合，0 表示通过）
+QUALIFICATION_REASONS = {
+    QUAL_FACULTY_MISMATCH: "教研室不匹配",
+    QUAL_NOT_GRANTED: "未被授予该乐器资格",
+    QUAL_UNKNOWN_INSTRUMENT: "乐器不在配置中",
+    QUAL_UNKNOWN_TEACHER: "教师不存在"
+}
+
+# 批量资格校验单次最多校验的组合数
+MAX_BATCH_VALIDATION_CELLS = 100000
+
+# 学生课表批量查询单次最多的学生数 / 学生冲突批量检查单次最多的时段数
+MAX_STUDENT_TIMETABLES = 1000
+MAX_STUDENT_SLOT_CHECKS = 100000
+
+# 周课时达到上限的该比例时给出预警
+WEEKLY_HOURS_WARNING_RATIO = 0.9
+
+# 排课优化单次最长运行时间（毫秒）
+MAX_OPTIMIZE_BUDGET_MS = 10000
 
 
 # =====================================================
@@ -56,6 +186,357 @@ def error_response(message, status_code=400, errors=None):
     }), status_code
 
 
+def current_qualifications() -> QualificationMatrix:
+    """当前资格矩阵（与注册表作为同一配置对象发布，配置替换时整体切换）"""
+    return current_config().qualifications
+
+
+def sync_teacher_faculty(teacher_id: str, teacher: Dict):
+    """将教师教研室同步到资格矩阵（只在教师写入与启动恢复时调用，读取与校验路径不修改矩阵）"""
+    current_qualifications().set_teacher(teacher_id, teacher.get('faculty_code'))
+
+
+def active_schedule():
+    """当前请求使用的排课存储：沙盒请求为其叠加层，否则为在线存储"""
+    overlay = g.get('schedule_overlay')
+    return overlay if overlay is not None else schedule_db
+
+
+# 不随变更事件与增量同步输出的教师字段（预写日志与快照保存完整记录）
+TEACHER_PRIVATE_FIELDS = ('password',)
+
+
+def public_teacher(teacher: Optional[Dict]) -> Optional[Dict]:
+    """去除私有字段后的教师数据"""
+    if teacher is None:
+        return None
+    return {key: value for key, value in teacher.items() if key not in TEACHER_PRIVATE_FIELDS}
+
+
+def stored_value(collection: str, key):
+    """同步日志中的键 -> 当前完整数据（写入预写日志）"""
+    if collection == 'schedule':
+        record = schedule_db.get(key)
+        return schedule_db.to_dict(record) if record is not None else None
+    if collection == 'teachers':
+        return teachers_db.get(key)
+    if collection == 'courses':
+        return courses_db.get(key)
+    return teacher_instruments_db.get(key)
+
+
+def sync_value(collection: str, key):
+    """同步日志中的键 -> 对外输出的数据（教师去除私有字段）"""
+    value = stored_value(collection, key)
+    return public_teacher(value) if collection == 'teachers' else value
+
+
+def record_write(collection: str, key, deleted: bool = False):
+    """记录一次写入：分配同步版本号，并在同一把锁内追加预写日志（保证日志顺序与版本顺序一致）"""
+    with persistence.lock:
+        version = sync_log.record(collection, key, deleted)
+        if persistence.enabled:
+            persistence.append((version, collection, key, None if deleted else stored_value(collection, key)))
+
+
+def publish_schedule_change(op: str, record, previous=None):
+    """在线排课写入监听：生成 schedule 变更事件并记入同步日志（沙盒内的写入在提交时才生成）"""
+    record_write('schedule', record.id, op == 'delete')
+    records = [record] if previous is None else [record, previous]
+    change_feed.publish(
+        'schedule', op, record.id,
+        faculty_codes=[schedule_db.faculties.value(item.faculty) for item in records],
+        teacher_ids=[schedule_db.teachers.value(item.teacher) for item in records],
+        data=schedule_db.to_dict(record) if op == 'upsert' else None
+    )
+
+
+schedule_db.attach_listener(publish_schedule_change)
+
+
+def record_local_write(collection: str, key, value):
+    """记录不参与增量同步的写入（教室、禁排学期与禁排）：只追加预写日志，删除时 value 为 None"""
+    with persistence.lock:
+        if persistence.enabled:
+            persistence.append((None, collection, key, value))
+
+
+room_registry.attach_listener(lambda room_id, room: record_local_write('rooms', room_id, room))
+blocked_time_calendar.attach_listener(
+    lambda kind, key, value: record_local_write('blocked_terms' if kind == 'term' else 'blocked_times', key, value)
+)
+
+
+def publish_teacher_change(teacher_id: str, teacher: Dict):
+    """生成 teacher 变更事件并记入同步日志"""
+    record_write('teachers', teacher_id)
+    change_feed.publish(
+        'teacher', 'upsert', teacher_id,
+        faculty_codes=[teacher.get('faculty_code')], teacher_ids=[teacher_id], data=public_teacher(teacher)
+    )
+
+
+def publish_qualification_change(op: str, teacher_id: str, teacher: Dict, instrument_name: str,
+                                 record: Optional[Dict] = None):
+    """生成 qualification 变更事件并记入同步日志（资格变更同时修改教师的可教授乐器列表）"""
+    record_write('teacher_instruments', teacher_id)
+    record_write('teachers', teacher_id)
+    change_feed.publish(
+        'qualification', op, f"{teacher_id}:{instrument_name}",
+        faculty_codes=[teacher.get('faculty_code')], teacher_ids=[teacher_id],
+        data=dict(record, teacher_id=teacher_id) if record is not None else None
+    )
+
+
+def create_validator() -> FacultyConstraintValidator:
+    """基于当前排课、教师与资格矩阵创建约束验证器"""
+    return FacultyConstraintValidator(
+        active_schedule(),
+        teachers_db,
+        current_qualifications()
+    )
+
+
+def apply_qualification_grant(teacher_id: str, teacher: Dict, instrument_name: str, proficiency_level: str) -> Dict:
+    """写入（或更新）一条教学资格，O(1)"""
+    qualifications = teacher_instruments_db.setdefault(teacher_id, {})
+    existing = qualifications.get(instrument_name)
+
+    if existing:
+        # 更新熟练程度
+        existing['proficiency_level'] = proficiency_level
+        existing['updated_at'] = datetime.now().isoformat()
+        record = existing
+    else:
+        record = qualifications[instrument_name] = {
+            "instrument_name": instrument_name,
+            "proficiency_level": proficiency_level,
+            "granted_at": datetime.now().isoformat()
+        }
+
+        # 更新教师可教授乐器列表
+        instruments = teacher.get('can_teach_instruments', [])
+        if instrument_name not in instruments:
+            instruments.append(instrument_name)
+            teacher['can_teach_instruments'] = instruments
+
+    current_qualifications().grant(teacher_id, instrument_name, proficiency_level)
+    publish_qualification_change('upsert', teacher_id, teacher, instrument_name, record)
+    return record
+
+
+def apply_qualification_revoke(teacher_id: str, teacher: Dict, instrument_name: str) -> bool:
+    """删除一条教学资格，O(1)；资格不存在时返回 False"""
+    if teacher_instruments_db.get(teacher_id, {}).pop(instrument_name, None) is None:
+        return False
+
+    current_qualifications().revoke(teacher_id, instrument_name)
+
+    # 更新教师可教授乐器列表
+    instruments = teacher.get('can_teach_instruments', [])
+    if instrument_name in instruments:
+        instruments.remove(instrument_name)
+    publish_qualification_change('delete', teacher_id, teacher, instrument_name)
+    return True
+
+
+def register_teacher(teacher_id: str, teacher: Dict):
+    """写入（或更新）教师，同步资格矩阵并生成 teacher 变更事件"""
+    with store_lock:
+        teachers_db[teacher_id] = teacher
+        sync_teacher_faculty(teacher_id, teacher)
+        publish_teacher_change(teacher_id, teacher)
+
+
+# 共享状态：由 register_api_routes 挂载到应用，教师管理接口（teacher_management）通过它访问同一份存储与索引
+scheduler_state = SchedulerState(
+    teachers_db, courses_db, teacher_instruments_db, schedule_db, store_lock,
+    register_teacher=register_teacher,
+    grant_qualification=apply_qualification_grant
+)
+
+
+def validate_qualification_operations(operations: List[Dict]) -> List[Dict]:
+    """
+    整体校验批量资格操作，返回错误列表（为空表示全部可应用）
+
+    授予操作的教研室兼容性通过资格矩阵一次性向量化校验；
+    撤销操作按顺序模拟，允许同一批次中先授予后撤销
+    """
+    errors = []
+    grant_indexes = []
+
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            errors.append({"index": index, "message": "操作格式错误"})
+            continue
+        op = operation.get('op')
+        teacher_id = operation.get('teacher_id')
+        instrument_name = operation.get('instrument_name')
+
+        if op not in ('grant', 'revoke'):
+            errors.append({"index": index, "message": "op 必须是 grant 或 revoke"})
+        elif teacher_id not in teachers_db:
+            errors.append({"index": index, "message": f"教师 {teacher_id} 不存在"})
+        elif not current_registry().has_instrument(instrument_name):
+            errors.append({"index": index, "message": f"乐器 '{instrument_name}' 不在配置中"})
+        elif op == 'grant':
+            if operation.get('proficiency_level', 'secondary') not in PROFICIENCY_LEVELS:
+                errors.append({"index": index, "message": "熟练程度必须是 primary, secondary 或 assistant"})
+            else:
+                grant_indexes.append(index)
+
+    # 教研室兼容性（未设置教研室的教师不做限制，与单条授予一致）
+    grant_teacher_ids = [operations[i]['teacher_id'] for i in grant_indexes]
+    flags = current_qualifications().validate_pairs(
+        grant_teacher_ids,
+        [operations[i]['instrument_name'] for i in grant_indexes]
+    )
+    registry = current_registry()
+    for index, flag in zip(grant_indexes, flags):
+        teacher = teachers_db[operations[index]['teacher_id']]
+        if teacher.get('faculty_code') and flag & QUAL_FACULTY_MISMATCH:
+            instrument_name = operations[index]['instrument_name']
+            errors.append({
+                "index": index,
+                "message": f"教师属于{registry.faculty_name(teacher['faculty_code']) or teacher['faculty_code']}，"
+                           f"不能授予{instrument_name}（{registry.instrument_faculty_name(instrument_name)}）的资格"
+            })
+
+    # 按顺序模拟撤销，确认资格在执行时存在
+    pending = {}
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get('op') not in ('grant', 'revoke'):
+            continue
+        key = (operation.get('teacher_id'), operation.get('instrument_name'))
+        if operation['op'] == 'grant':
+            pending[key] = True
+            continue
+        exists = pending.get(key)
+        if exists is None:
+            exists = key[1] in teacher_instruments_db.get(key[0], {})
+        if not exists and key[0] in teachers_db:
+            errors.append({"index": index, "message": f"该教师没有{key[1]}的教学资格"})
+        pending[key] = False
+
+    return sorted(errors, key=lambda error: error['index'])
+
+
+def class_hours(instrument_name: Optional[str]) -> float:
+    """一节课的标准课时（乐器课时系数）"""
+    return current_registry().duration_coefficient(instrument_name)
+
+
+def check_weekly_hours(teacher_id: str, teacher: Dict, hours: float, date: Optional[str] = None) -> Dict:
+    """
+    检查新增课时后教师周课时是否超过 max_weekly_hours（使用存储中的周累计，O(1)）
+
+    Returns:
+        {"valid", "warning", "hours", "max_weekly_hours", "message"}
+    """
+    max_hours = teacher.get('max_weekly_hours', DEFAULT_MAX_WEEKLY_HOURS)
+    total = active_schedule().teacher_weekly_hours(teacher_id, date) + hours
+
+    if total > max_hours:
+        return {
+            "valid": False,
+            "warning": True,
+            "hours": total,
+            "max_weekly_hours": max_hours,
+            "message": f"超出教师周课时上限（{total:g}/{max_hours}）"
+        }
+    warning = total >= max_hours * WEEKLY_HOURS_WARNING_RATIO
+    return {
+        "valid": True,
+        "warning": warning,
+        "hours": total,
+        "max_weekly_hours": max_hours,
+        "message": f"周课时接近上限（{total:g}/{max_hours}）" if warning else "周课时正常"
+    }
+
+
+def find_blocked_time(data: Dict, teacher_id: str, period: int, date: Optional[str] = None,
+                      day_of_week: Optional[int] = None, room_id: Optional[str] = None,
+                      student_id: Optional[str] = None) -> Optional[Dict]:
+    """
+    查询排课时段命中的禁排
+
+    未指定日期时按请求中的 academic_year/semester_label（默认当前学期）检查每周循环禁排
+    """
+    term = None
+    if data.get('academic_year') and data.get('semester_label'):
+        term = (str(data['academic_year']), str(data['semester_label']))
+    return blocked_time_calendar.find_block(
+        int(period), date, day_of_week,
+        teacher_id=teacher_id, room_id=room_id, student_id=student_id, term=term
+    )
+
+
+def required_room_capacity(course: Optional[Dict], student_id: Optional[str] = None) -> int:
+    """
+    课程所需教室容量：课程指定 student_count 时使用该值，
+    单个学生的课程为 1，否则按乐器配置的最大人数
+    """
+    if not course:
+        return 1
+    if course.get('student_count'):
+        return int(course['student_count'])
+    if student_id or course.get('student_id'):
+        return 1
+    return current_registry().max_students(course.get('course_type'))
+
+
+def assign_unroomed_classes(class_ids: Optional[List[str]] = None) -> tuple:
+    """
+    为未分配教室的排课记录分配教室（按时段二分匹配）
+
+    Args:
+        class_ids: 仅处理这些记录，默认处理全部未分配教室的记录
+
+    Returns:
+        (class_id -> room_id, 未能分配的 class_id 列表)
+    """
+    store = active_schedule()
+    if class_ids is None:
+        records = store.unroomed_records()
+    else:
+        records = [store.get(class_id) for class_id in class_ids]
+        records = [record for record in records if record is not None and record.room < 0]
+
+    # 时段按 (星期, 节次) 分组：每周循环课与同一星期的有日期课程占用同一教室时会冲突，须在同一组内匹配；
+    # 组内教室须在每个涉及的日期（及每周循环）都空闲且不在教室禁排时段
+    requests = []
+    slot_dates: Dict[tuple, set] = {}
+    for record in records:
+        group = store.group_students(record.id)
+        if group:
+            capacity = len(group)
+        else:
+            course = courses_db.get(store.courses.value(record.course))
+            capacity = required_room_capacity(course, store.students.value(record.student))
+        slot = (record.day_of_week, record.period)
+        slot_dates.setdefault(slot, set()).add(format_date_ordinal(record.date))
+        requests.append({
+            "class_id": record.id,
+            "slot": slot,
+            "required_capacity": capacity,
+            "faculty_code": store.faculties.value(record.faculty)
+        })
+
+    def room_busy(room_id: str, slot: tuple) -> bool:
+        day, period = slot
+        return any(
+            store.is_room_busy(room_id, period, date, day)
+            or blocked_time_calendar.find_block(period, date, day, room_id=room_id)
+            for date in slot_dates[slot]
+        )
+
+    assignments, unassigned = assign_rooms(requests, room_registry, room_busy)
+    for class_id, room_id in assignments.items():
+        store.set_room(class_id, room_id)
+    return assignments, unassigned
+
+
 def pagination_params():
     """提取分页参数"""
     page = request.args.get('page', 1, type=int)
@@ -92,15 +573,15 @@ def list_faculties():
         }
     """
     include_stats = request.args.get('include_stats', 'false').lower() == 'true'
+    if include_stats and not warm_up_done.wait(WARMUP_WAIT):
+        return warming_up_response()
+
+    class_counts = schedule_db.count_by_faculty() if include_stats else {}
 
     faculties = []
-    for code, config in FACULTY_CONFIG.items():
-        faculty_data = {
-            "id": str(uuid.uuid4()),
-            "faculty_name": config['faculty_name'],
-            "faculty_code": config['code'],
-            "description": config['description']
-        }
+    for faculty in current_registry().faculties():
+        code = faculty['faculty_code']
+        faculty_data = dict(faculty, id=str(uuid.uuid4()))
 
         if include_stats:
             # 统计各教研室数据
@@ -108,8 +589,7 @@ def list_faculties():
                               if t.get('faculty_code') == code)
             course_count = sum(1 for c in courses_db.values()
                              if c.get('faculty_code') == code)
-            class_count = sum(1 for s in schedule_db.values()
-                            if s.get('faculty_code') == code)
+            class_count = class_counts.get(code, 0)
 
             faculty_data.update({
                 "teacher_count": teacher_count,
@@ -151,13 +631,8 @@ def get_faculty_teachers(faculty_name: str):
     page, per_page = pagination_params()
     instrument_filter = request.args.get('instrument')
 
-    # 获取教研室代码
-    faculty_code = None
-    for code, config in FACULTY_CONFIG.items():
-        if config['faculty_name'] == faculty_name or code == faculty_name:
-            faculty_code = code
-            break
-
+    # 获取教研室代码（名称或代码均可）
+    faculty_code = current_registry().faculty_code(faculty_name)
     if not faculty_code:
         return error_response(f"教研室 '{faculty_name}' 不存在", 404)
 
@@ -182,8 +657,7 @@ def get_faculty_teachers(faculty_name: str):
             "can_teach_instruments": teacher.get('can_teach_instruments', []),
             "course_count": sum(1 for c in courses_db.values()
                               if c.get('teacher_id') == teacher_id),
-            "class_count": sum(1 for s in schedule_db.values()
-                             if s.get('teacher_id') == teacher_id)
+            "class_count": schedule_db.teacher_class_count(teacher_id)
         }
         teachers.append(teacher_data)
 
@@ -226,30 +700,24 @@ def get_faculty_instruments(faculty_name: str):
             }
         }
     """
-    # 获取教研室代码
-    faculty_code = None
-    target_faculty_name = None
-    for code, config in FACULTY_CONFIG.items():
-        if config['faculty_name'] == faculty_name or code == faculty_name:
-            faculty_code = code
-            target_faculty_name = config['faculty_name']
-            break
-
+    # 获取教研室代码（名称或代码均可）
+    registry = current_registry()
+    faculty_code = registry.faculty_code(faculty_name)
+    target_faculty_name = registry.faculty_name(faculty_name)
     if not faculty_code:
         return error_response(f"教研室 '{faculty_name}' 不存在", 404)
 
     # 获取该教研室的乐器
     instruments = []
-    for name, config in INSTRUMENT_CONFIGS.items():
-        if config['faculty'] == faculty_code:
-            instruments.append({
-                "instrument_name": name,
-                "max_students_per_class": config['max_students'],
-                "duration_coefficient": {
-                    "major_duration": 0.5,
-                    "minor_duration": 0.25
-                }
-            })
+    for name in registry.instruments_of(faculty_code):
+        instruments.append({
+            "instrument_name": name,
+            "max_students_per_class": registry.max_students(name),
+            "duration_coefficient": {
+                "major_duration": 0.5,
+                "minor_duration": 0.25
+            }
+        })
 
     return success_response({
         "faculty_name": target_faculty_name,
@@ -288,25 +756,19 @@ def get_faculty_workload_summary():
     end_date = request.args.get('end_date', datetime.now().strftime('%Y-%m-%d'))
 
     faculties_summary = []
+    class_counts = schedule_db.count_by_faculty()
+    distributions = schedule_db.day_distribution_by_faculty()
 
-    for code, config in FACULTY_CONFIG.items():
-        # 统计该教研室的工作量
-        faculty_classes = [s for s in schedule_db.values()
-                         if s.get('faculty_code') == code]
+    registry = current_registry()
+    for code, name in zip(registry.faculty_codes, registry.faculty_names):
+        # 统计该教研室的工作量（按日期分组）
+        daily_distribution = distributions.get(code, {})
 
-        # 按日期分组统计
-        daily_distribution = {}
-        for cls in faculty_classes:
-            date = cls.get('date', cls.get('day_of_week'))
-            if date not in daily_distribution:
-                daily_distribution[date] = 0
-            daily_distribution[date] += 1
-
-        total_classes = len(faculty_classes)
+        total_classes = class_counts.get(code, 0)
         daily_avg = total_classes / max(1, len(daily_distribution))
 
         faculties_summary.append({
-            "faculty_name": config['faculty_name'],
+            "faculty_name": name,
             "faculty_code": code,
             "total_classes": total_classes,
             "daily_avg": round(daily_avg, 1),
@@ -361,13 +823,13 @@ def get_teacher_qualifications(teacher_id: str):
         return error_response("教师不存在", 404)
 
     # 获取资格列表
-    qualifications = teacher_instruments_db.get(teacher_id, [])
+    qualifications = list(teacher_instruments_db.get(teacher_id, {}).values())
 
     return success_response({
         "teacher": {
             "id": teacher_id,
             "full_name": teacher.get('full_name'),
-            "faculty_name": FACULTY_CONFIG.get(teacher.get('faculty_code'), {}).get('faculty_name'),
+            "faculty_name": current_registry().faculty_name(teacher.get('faculty_code')),
             "faculty_code": teacher.get('faculty_code'),
             "primary_instrument": teacher.get('primary_instrument')
         },
@@ -411,52 +873,26 @@ def grant_teacher_qualification(teacher_id: str):
         return error_response("请指定乐器名称")
 
     # 验证乐器是否存在
-    if instrument_name not in INSTRUMENT_CONFIGS:
+    if not current_registry().has_instrument(instrument_name):
         return error_response(f"乐器 '{instrument_name}' 不在配置中")
 
     # 验证熟练程度
-    if proficiency_level not in ['primary', 'secondary', 'assistant']:
+    if proficiency_level not in PROFICIENCY_LEVELS:
         return error_response("熟练程度必须是 primary, secondary 或 assistant")
 
     # 检查教研室是否匹配
-    instrument_faculty = INSTRUMENT_CONFIGS[instrument_name]['faculty']
     teacher_faculty = teacher.get('faculty_code')
 
-    if teacher_faculty and instrument_faculty != teacher_faculty:
+    if teacher_faculty and current_qualifications().check(teacher_id, instrument_name) & QUAL_FACULTY_MISMATCH:
+        registry = current_registry()
         return error_response(
-            f"教师属于{FACULTY_CONFIG.get(teacher_faculty, {}).get('faculty_name')}，"
-            f"不能授予{instrument_name}（{FACULTY_CONFIG.get(instrument_faculty, {}).get('faculty_name')}）的资格",
+            f"教师属于{registry.faculty_name(teacher_faculty) or teacher_faculty}，"
+            f"不能授予{instrument_name}（{registry.instrument_faculty_name(instrument_name)}）的资格",
             403
         )
 
-    # 添加资格
-    if teacher_id not in teacher_instruments_db:
-        teacher_instruments_db[teacher_id] = []
-
-    # 检查是否已存在
-    existing = next(
-        (q for q in teacher_instruments_db[teacher_id]
-         if q['instrument_name'] == instrument_name),
-        None
-    )
-
-    if existing:
-        # 更新熟练程度
-        existing['proficiency_level'] = proficiency_level
-        existing['updated_at'] = datetime.now().isoformat()
-    else:
-        # 添加新资格
-        teacher_instruments_db[teacher_id].append({
-            "instrument_name": instrument_name,
-            "proficiency_level": proficiency_level,
-            "granted_at": datetime.now().isoformat()
-        })
-
-        # 更新教师可教授乐器列表
-        instruments = teacher.get('can_teach_instruments', [])
-        if instrument_name not in instruments:
-            instruments.append(instrument_name)
-            teacher['can_teach_instruments'] = instruments
+    with store_lock:
+        apply_qualification_grant(teacher_id, teacher, instrument_name, proficiency_level)
 
     return success_response({
         "teacher_id": teacher_id,
@@ -484,27 +920,70 @@ def revoke_teacher_qualification(teacher_id: str, instrument_name: str):
     if not teacher:
         return error_response("教师不存在", 404)
 
-    if teacher_id not in teacher_instruments_db:
+    if not teacher_instruments_db.get(teacher_id):
         return error_response("该教师没有任何教学资格", 404)
 
-    # 查找并删除资格
-    qualifications = teacher_instruments_db[teacher_id]
-    qualification = next(
-        (q for q in qualifications if q['instrument_name'] == instrument_name),
-        None
-    )
+    with store_lock:
+        if not apply_qualification_revoke(teacher_id, teacher, instrument_name):
+            return error_response(f"该教师没有{instrument_name}的教学资格", 404)
 
-    if not qualification:
-        return error_response(f"该教师没有{instrument_name}的教学资格", 404)
+    return success_response(None, f"成功撤销{instrument_name}教学资格")
 
-    qualifications.remove(qualification)
 
-    # 更新教师可教授乐器列表
-    instruments = teacher.get('can_teach_instruments', [])
-    if instrument_name in instruments:
-        instruments.remove(instrument_name)
+@teacher_bp.route('/qualification/bulk', methods=['POST'])
+def bulk_update_teacher_qualifications():
+    """
+    批量授予/撤销教师教学资格（整体校验，全部通过后一次性应用）
 
-    return success_response(None, f"成功撤销{instrument_name}教学资格")
+    Request Body:
+        {
+            "operations": [
+                {"op": "grant", "teacher_id": "uuid", "instrument_name": "钢琴", "proficiency_level": "primary"},
+                {"op": "revoke", "teacher_id": "uuid", "instrument_name": "古筝"}
+            ]
+        }
+
+    Response:
+        {
+            "success": true,
+            "data": {
+                "applied": 2,
+                "granted": 1,
+                "revoked": 1
+            }
+        }
+
+    任一操作校验失败时不应用任何操作，errors 中给出失败操作的序号与原因
+    """
+    data = request.json or {}
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return error_response("请提供 operations 列表")
+
+    with store_lock:
+        errors = validate_qualification_operations(operations)
+        if errors:
+            return error_response("批量资格操作验证失败，未应用任何变更", 400, errors)
+
+        granted = revoked = 0
+        for operation in operations:
+            teacher_id = operation['teacher_id']
+            teacher = teachers_db[teacher_id]
+            if operation['op'] == 'grant':
+                apply_qualification_grant(
+                    teacher_id, teacher, operation['instrument_name'],
+                    operation.get('proficiency_level', 'secondary')
+                )
+                granted += 1
+            else:
+                apply_qualification_revoke(teacher_id, teacher, operation['instrument_name'])
+                revoked += 1
+
+    return success_response({
+        "applied": granted + revoked,
+        "granted": granted,
+        "revoked": revoked
+    }, f"批量资格操作完成，授予{granted}项，撤销{revoked}项")
 
 
 @teacher_bp.route('/<teacher_id>/qualification/validate', methods=['POST'])
@@ -541,19 +1020,12 @@ def validate_teacher_qualification(teacher_id: str):
     if not instrument_name:
         return error_response("请指定要验证的乐器")
 
-    # 检查教研室匹配
-    instrument_faculty = INSTRUMENT_CONFIGS.get(instrument_name, {}).get('faculty')
-    teacher_faculty = teacher.get('faculty_code')
-
-    faculty_match = teacher_faculty == instrument_faculty
+    # 资格矩阵 O(1) 校验
+    matrix = current_qualifications()
+    flags = matrix.check(teacher_id, instrument_name)
 
-    # 检查资格是否存在
-    qualifications = teacher_instruments_db.get(teacher_id, [])
-    qualification = next(
-        (q for q in qualifications if q['instrument_name'] == instrument_name),
-        None
-    )
-    qualification_exists = qualification is not None
+    faculty_match = not flags & QUAL_FACULTY_MISMATCH
+    qualification_exists = not flags & QUAL_NOT_GRANTED
 
     # 综合判断
     valid = faculty_match and qualification_exists
@@ -561,8 +1033,10 @@ def validate_teacher_qualification(teacher_id: str):
     if not valid:
         reasons = []
         if not faculty_match:
-            faculty_name = FACULTY_CONFIG.get(teacher_faculty, {}).get('faculty_name', '未知')
-            instrument_faculty_name = FACULTY_CONFIG.get(instrument_faculty, {}).get('faculty_name', '未知')
+            registry = current_registry()
+            faculty_code = teacher.get('faculty_code')
+            faculty_name = registry.faculty_name(faculty_code) or faculty_code or '未知'
+            instrument_faculty_name = registry.instrument_faculty_name(instrument_name) or '未知'
             reasons.append(f"教师属于{faculty_name}，无法教授{instrument_faculty_name}的课程")
         if not qualification_exists:
             reasons.append(f"教师未被授权教授{instrument_name}")
@@ -579,6 +1053,101 @@ def validate_teacher_qualification(teacher_id: str):
     }, "资格验证完成")
 
 
+@teacher_bp.route('/qualification/validate-batch', methods=['POST'])
+def validate_teacher_qualifications_batch():
+    """
+    批量验证教师资格（一次请求完成全部校验）
+
+    Request Body（二选一）:
+        {
+            "pairs": [["teacher-001", "钢琴"], ["teacher-002", "古筝"]]
+        }
+        {
+            "teacher_ids": ["teacher-001", "teacher-002"],
+            "instrument_names": ["钢琴", "古筝"]  // 可选，默认全部乐器
+        }
+
+    Response:
+        {
+            "success": true,
+            "data": {
+                "mode": "grid",
+                "teacher_ids": [...],
+                "instrument_names": [...],
+                "codes": [[0, 3], [3, 0]],
+                "valid_count": 2,
+                "reason_codes": {"1": "教研室不匹配", ...}
+            }
+        }
+
+    codes 中每个值为原因码按位组合，0 表示有资格
+    """
+    data = request.json or {}
+    pairs = data.get('pairs')
+    matrix = current_qualifications()
+
+    if pairs is not None:
+        try:
+            teacher_ids, instrument_names = _split_validation_pairs(pairs)
+        except (TypeError, ValueError, KeyError):
+            return error_response("pairs 格式错误，应为 [teacher_id, instrument_name] 列表")
+        cell_count = len(teacher_ids)
+    else:
+        teacher_ids = data.get('teacher_ids')
+        instrument_names = data.get('instrument_names') or matrix.instrument_names
+        if not teacher_ids:
+            return error_response("请提供 pairs 或 teacher_ids")
+        cell_count = len(teacher_ids) * len(instrument_names)
+
+    if cell_count > MAX_BATCH_VALIDATION_CELLS:
+        return error_response(f"单次最多校验{MAX_BATCH_VALIDATION_CELLS}个组合")
+
+    # 同步本次涉及教师的教研室，未登记的教师在结果中标记为不存在
+    known_teachers = set()
+    for teacher_id in set(teacher_ids):
+        teacher = teachers_db.get(teacher_id)
+        if teacher:
+            known_teachers.add(teacher_id)
+    lookup_ids = [t if t in known_teachers else None for t in teacher_ids]
+
+    if pairs is not None:
+        codes = matrix.validate_pairs(lookup_ids, instrument_names)
+        result = {
+            "mode": "pairs",
+            "teacher_ids": teacher_ids,
+            "instrument_names": instrument_names
+        }
+    else:
+        codes = matrix.validate_grid(lookup_ids, instrument_names)
+        result = {
+            "mode": "grid",
+            "teacher_ids": teacher_ids,
+            "instrument_names": list(instrument_names)
+        }
+
+    result.update({
+        "codes": codes.tolist(),
+        "valid_count": int((codes == 0).sum()),
+        "reason_codes": {str(code): reason for code, reason in QUALIFICATION_REASONS.items()}
+    })
+
+    return success_response(result, "批量资格验证完成")
+
+
+def _split_validation_pairs(pairs: List) -> tuple:
+    """将 pairs 拆分为教师ID列表与乐器列表，支持二元组或对象两种写法"""
+    teacher_ids = []
+    instrument_names = []
+    for pair in pairs:
+        if isinstance(pair, dict):
+            teacher_id, instrument_name = pair['teacher_id'], pair['instrument_name']
+        else:
+            teacher_id, instrument_name = pair
+        teacher_ids.append(teacher_id)
+        instrument_names.append(instrument_name)
+    return teacher_ids, instrument_names
+
+
 @teacher_bp.route('/<teacher_id>/faculty-workload', methods=['GET'])
 def get_teacher_faculty_workload(teacher_id: str):
     """
@@ -615,13 +1184,22 @@ def get_teacher_faculty_workload(teacher_id: str):
     start_date = request.args.get('start_date', (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d'))
     end_date = request.args.get('end_date', datetime.now().strftime('%Y-%m-%d'))
 
-    # 获取教师的排课记录
-    teacher_classes = [s for s in schedule_db.values() if s.get('teacher_id') == teacher_id]
+    # 获取教师的排课记录：显式指定日期范围时从课表索引切片（含每周循环课），否则统计全部记录
+    if 'start_date' in request.args or 'end_date' in request.args:
+        try:
+            start, end = date_range_params()
+        except ValueError:
+            return error_response("日期格式错误，应为 YYYY-MM-DD")
+        teacher_classes = schedule_db.teacher_timetable(teacher_id, 0, 1)
+        if start or end:
+            teacher_classes += schedule_db.teacher_timetable(teacher_id, max(start, 1), end)
+    else:
+        teacher_classes = schedule_db.teacher_records(teacher_id)
 
     # 按教研室分组统计
     by_faculty = {}
     for cls in teacher_classes:
-        faculty_code = cls.get('faculty_code', 'INSTRUMENT')
+        faculty_code = schedule_db.faculties.value(cls.faculty) or 'INSTRUMENT'
         if faculty_code not in by_faculty:
             by_faculty[faculty_code] = 0
         by_faculty[faculty_code] += 1
@@ -629,7 +1207,7 @@ def get_teacher_faculty_workload(teacher_id: str):
     total = len(teacher_classes)
     faculty_stats = []
     for code, count in by_faculty.items():
-        faculty_name = FACULTY_CONFIG.get(code, {}).get('faculty_name', code)
+        faculty_name = current_registry().faculty_name(code) or code
         faculty_stats.append({
             "faculty_name": faculty_name,
             "faculty_code": code,
@@ -643,7 +1221,7 @@ def get_teacher_faculty_workload(teacher_id: str):
     # 按日期分布
     daily_distribution = {}
     for cls in teacher_classes:
-        date = cls.get('date', str(cls.get('day_of_week')))
+        date = schedule_db.day_label(cls)
         if date not in daily_distribution:
             daily_distribution[date] = 0
         daily_distribution[date] += 1
@@ -652,7 +1230,7 @@ def get_teacher_faculty_workload(teacher_id: str):
         "teacher": {
             "id": teacher_id,
             "full_name": teacher.get('full_name'),
-            "faculty_name": FACULTY_CONFIG.get(teacher.get('faculty_code'), {}).get('faculty_name')
+            "faculty_name": current_registry().faculty_name(teacher.get('faculty_code'))
         },
         "total_classes": total,
         "by_faculty": faculty_stats,
@@ -660,6 +1238,164 @@ def get_teacher_faculty_workload(teacher_id: str):
     }, "获取教师工作量统计成功")
 
 
+@teacher_bp.route('/<teacher_id>/timetable', methods=['GET'])
+def get_teacher_timetable(teacher_id: str):
+    """
+    获取教师课表（从教师课表索引按日期范围切片，不遍历排课记录）
+
+    Path Parameters:
+        - teacher_id: 教师ID
+
+    Query Parameters:
+        - start (str): 开始日期（含），默认本周一
+        - end (str): 结束日期（含），默认 start 所在周的周日
+
+    Response:
+        {
+            "success": true,
+            "data": {
+                "teacher_id": "uuid",
+                "start": "2025-03-03",
+                "end": "2025-03-09",
+                "classes": [...],     # 日期在范围内的课，按 (日期, 节次) 排序
+                "recurring": [...]    # 未指定日期的每周循环课，按 (星期, 节次) 排序
+            }
+        }
+    """
+    if teacher_id not in teachers_db:
+        return error_response("教师不存在", 404)
+
+    try:
+        if request.args.get('start'):
+            start = datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+        else:
+            start = week_start(datetime.now().strftime('%Y-%m-%d'))
+        if request.args.get('end'):
+            end = datetime.strptime(request.args['end'], '%Y-%m-%d').date()
+        else:
+            end = week_start(start.isoformat()) + timedelta(days=6)
+    except ValueError:
+        return error_response("日期格式错误，应为 YYYY-MM-DD")
+    if end < start:
+        return error_response("结束日期不能早于开始日期")
+
+    classes = schedule_db.teacher_timetable(teacher_id, start.toordinal(), end.toordinal() + 1)
+    recurring = sorted(schedule_db.teacher_timetable(teacher_id, 0, 1), key=attrgetter('day_of_week', 'period'))
+    return success_response({
+        "teacher_id": teacher_id,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "classes": [schedule_db.to_dict(record) for record in classes],
+        "recurring": [schedule_db.to_dict(record) for record in recurring]
+    }, f"获取教师课表成功，共{len(classes)}节")
+
+
+@teacher_bp.route('/<teacher_id>/leave-repair', methods=['POST'])
+def repair_teacher_leave(teacher_id: str):
+    """
+    教师请假排课修复：只重排该教师在日期范围内的课程
+
+    优先在原时段安排同教研室、有该乐器资格且周课时未满的代课教师（课时少者优先），
+    无法代课时在同一周临近时段调课；方案默认只预览，apply 为 true 时一次性写入
+
+    Request Body:
+        {
+            "start_date": "2024-03-04",
+            "end_date": "2024-03-15",
+            "include_recurring": false,  // 是否处理无日期的每周循环课程（改写循环记录本身，影响每一周）
+            "allow_reschedule": true,
+            "preferred_days": [1, 2, 3, 4, 5],
+            "periods": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10],
+            "apply": false,
+            "mark_on_leave": false  // apply 时同时将教师状态设为 on_leave
+        }
+
+    Response:
+        {
+            "success": true,
+            "data": {
+                "affected": 12,
+                "changes": [{"class_id", "action": "substitute|reschedule", "before", "after"}],
+                "unresolved": [...],
+                "applied": false
+            }
+        }
+    """
+    data = request.json or {}
+    start_date = data.get('start_date')
+    end_date = data.get('end_date')
+
+    try:
+        parse_date_ordinal(start_date)
+        parse_date_ordinal(end_date)
+    except ValueError:
+        return error_response("日期格式错误，应为 YYYY-MM-DD")
+
+    teacher = teachers_db.get(teacher_id)
+    if not teacher:
+        return error_response("教师不存在", 404)
+
+    with store_lock:
+        overlay = ScheduleOverlay(schedule_db)
+        records = affected_records(
+            schedule_db, teacher_id, start_date, end_date, data.get('include_recurring', False)
+        )
+
+        def substitutes(record) -> List[str]:
+            instrument = (courses_db.get(schedule_db.courses.value(record.course)) or {}).get('course_type')
+            config = current_config()
+            if config.registry.has_instrument(instrument):
+                candidates = config.qualifications.teachers_for(instrument)
+            else:
+                faculty_code = schedule_db.faculties.value(record.faculty)
+                candidates = [tid for tid, t in teachers_db.items() if t.get('faculty_code') == faculty_code]
+            candidates = [
+                tid for tid in candidates
+                if tid != teacher_id and teachers_db.get(tid, {}).get('status', 'active') == 'active'
+            ]
+            return sorted(candidates, key=lambda tid: overlay.teacher_weekly_hours(tid))
+
+        def is_available(substitute_id: str, record, student_ids: List[str],
+                         day: int, period: int, date: Optional[str]) -> bool:
+            if overlay.is_teacher_busy(substitute_id, period, date, day):
+                return False
+            if find_blocked_time(data, substitute_id, period, date, day):
+                return False
+            if any(
+                overlay.is_student_busy(student_id, period, date, day)
+                or find_blocked_time(data, None, period, date, day, student_id=student_id)
+                for student_id in student_ids
+            ):
+                return False
+            max_hours = teachers_db[substitute_id].get('max_weekly_hours', DEFAULT_MAX_WEEKLY_HOURS)
+            return overlay.teacher_weekly_hours(substitute_id, date) + record.hours / HOURS_SCALE <= max_hours
+
+        plan = plan_leave_repair(
+            overlay,
+            records,
+            substitutes,
+            is_available,
+            lambda tid: teachers_db[tid].get('faculty_code'),
+            data.get('preferred_days', [1, 2, 3, 4, 5]),
+            data.get('periods', list(range(1, 11))),
+            data.get('allow_reschedule', True)
+        )
+
+        applied = bool(data.get('apply'))
+        if applied:
+            overlay.commit()
+            if data.get('mark_on_leave'):
+                teacher['status'] = 'on_leave'
+                publish_teacher_change(teacher_id, teacher)
+
+    return success_response({
+        "affected": len(records),
+        "changes": plan['changes'],
+        "unresolved": plan['unresolved'],
+        "applied": applied
+    }, f"影响{len(records)}节课，可调整{len(plan['changes'])}节，未解决{len(plan['unresolved'])}节")
+
+
 # =====================================================
 # 排课API（带教研室验证）
 # =====================================================
@@ -677,7 +1413,9 @@ def arrange_single_class():
             "student_id": "uuid",
             "day_of_week": 1,
             "period": 1,
-            "date": "2024-01-08"  // 可选，按日期排课
+            "date": "2024-01-08",  // 可选，按日期排课
+            "academic_year": "2024-2025",  // 可选，未指定日期时用于检查禁排
+            "semester_label": "2024-2025-2"
         }
 
     Response:
@@ -689,7 +1427,11 @@ def arrange_single_class():
                     "faculty_valid": true,
                     "qualification_valid": true,
                     "time_available": true,
-                    "room_available": true
+                    "room_available": true,
+                    "student_available": true,
+                    "room_suitable": true,
+                    "not_blocked": true,
+                    "weekly_hours": 12.5
                 }
             }
         }
@@ -709,6 +1451,11 @@ def arrange_single_class():
     period = data['period']
     date = data.get('date')
 
+    try:
+        parse_date_ordinal(date)
+    except ValueError:
+        return error_response("日期格式错误，应为 YYYY-MM-DD")
+
     # 验证教师存在
     teacher = teachers_db.get(teacher_id)
     if not teacher:
@@ -720,7 +1467,7 @@ def arrange_single_class():
         return error_response("课程不存在", 404)
 
     # 教研室验证
-    validator = FacultyConstraintValidator(list(schedule_db.values()))
+    validator = create_validator()
 
     # 验证教师资格
     instrument_type = course.get('course_type')
@@ -733,20 +1480,33 @@ def arrange_single_class():
     time_conflict = validator.hasTimeConflict(teacher_id, date or str(day_of_week), period)
 
     # 检查教室冲突
-    room_conflict = any(
-        s.get('room_id') == room_id and
-        s.get('day_of_week') == day_of_week and
-        s.get('period') == period and
-        (not date or s.get('date') == date)
-        for s in schedule_db.values()
+    room_conflict = active_schedule().is_room_busy(room_id, period, date, day_of_week)
+
+    # 检查学生冲突
+    student_conflict = active_schedule().is_student_busy(data.get('student_id'), period, date, day_of_week)
+
+    # 检查教室类型与容量（仅校验已登记的教室）
+    room_suitable = room_id not in room_registry or room_registry.is_suitable(
+        room_id, required_room_capacity(course, data.get('student_id')), teacher.get('faculty_code')
     )
 
+    # 检查禁排时间
+    blocked = find_blocked_time(data, teacher_id, period, date, day_of_week, room_id, data.get('student_id'))
+
+    # 检查周课时
+    hours = class_hours(instrument_type)
+    weekly_result = check_weekly_hours(teacher_id, teacher, hours, date)
+
     # 综合验证
     all_valid = (
         qualification_result['valid'] and
         faculty_match_result['valid'] and
         not time_conflict and
-        not room_conflict
+        not room_conflict and
+        not student_conflict and
+        room_suitable and
+        not blocked and
+        weekly_result['valid']
     )
 
     if not all_valid:
@@ -759,12 +1519,20 @@ def arrange_single_class():
             errors.append("教师在该时间段已有课程安排")
         if room_conflict:
             errors.append("教室已被占用")
+        if student_conflict:
+            errors.append("学生在该时间段已有课程安排")
+        if not room_suitable:
+            errors.append("教室类型或容量不满足课程要求")
+        if blocked:
+            errors.append(f"该时段为禁排时间: {blocked['reason'] or blocked['scope']}")
+        if not weekly_result['valid']:
+            errors.append(weekly_result['message'])
 
-("排课验证        return error_response失败", 400, errors)
+        return error_response("排课验证失败", 400, errors)
 
     # 创建排课记录
     class_id = str(uuid.uuid4())
-    schedule_db[class_id] = {
+    active_schedule().insert({
         "id": class_id,
         "teacher_id": teacher_id,
         "course_id": course_id,
@@ -775,8 +1543,9 @@ def arrange_single_class():
         "date": date,
         "faculty_code": teacher.get('faculty_code'),
         "status": "scheduled",
-        "created_at": datetime.now().isoformat()
-    }
+        "created_at": datetime.now().isoformat(),
+        "hours": hours
+    })
 
     return success_response({
         "class_id": class_id,
@@ -784,7 +1553,11 @@ def arrange_single_class():
             "faculty_valid": faculty_match_result['valid'],
             "qualification_valid": qualification_result['valid'],
             "time_available": not time_conflict,
-            "room_available": not room_conflict
+            "room_available": not room_conflict,
+            "student_available": True,
+            "room_suitable": True,
+            "not_blocked": True,
+            "weekly_hours": weekly_result['hours']
         }
     }, "排课成功")
 
@@ -811,7 +1584,8 @@ def arrange_with_faculty_check():
             "data": {
                 "class_id": "uuid",
                 "validation_result": {...},
-                "workload_warning": null
+                "workload_warning": null,
+                "weekly_hours_warning": null
             }
         }
     """
@@ -830,6 +1604,11 @@ def arrange_with_faculty_check():
     period = data['period']
     date = data.get('date')
 
+    try:
+        parse_date_ordinal(date)
+    except ValueError:
+        return error_response("日期格式错误，应为 YYYY-MM-DD")
+
     teacher = teachers_db.get(teacher_id)
     if not teacher:
         return error_response("教师不存在", 404)
@@ -839,7 +1618,7 @@ def arrange_with_faculty_check():
         return error_response("课程不存在", 404)
 
     # 完整验证
-    validator = FacultyConstraintValidator(list(schedule_db.values()))
+    validator = create_validator()
 
     # 1. 验证教师资格
     qualification_result = validator.checkTeacherQualification(teacher_id, course['course_type'])
@@ -852,13 +1631,16 @@ def arrange_with_faculty_check():
 
     # 4. 检查冲突
     time_conflict = validator.hasTimeConflict(teacher_id, date or str(day_of_week), period)
-    room_conflict = any(
-        s.get('room_id') == room_id and
-        s.get('day_of_week') == day_of_week and
-        s.get('period') == period and
-        (not date or s.get('date') == date)
-        for s in schedule_db.values()
+    room_conflict = active_schedule().is_room_busy(room_id, period, date, day_of_week)
+    student_conflict = active_schedule().is_student_busy(data.get('student_id'), period, date, day_of_week)
+    room_suitable = room_id not in room_registry or room_registry.is_suitable(
+        room_id, required_room_capacity(course, data.get('student_id')), teacher.get('faculty_code')
     )
+    blocked = find_blocked_time(data, teacher_id, period, date, day_of_week, room_id, data.get('student_id'))
+
+    # 5. 检查周课时
+    hours = class_hours(course['course_type'])
+    weekly_result = check_weekly_hours(teacher_id, teacher, hours, date)
 
     # 构建验证结果
     validation_result = {
@@ -877,6 +1659,24 @@ def arrange_with_faculty_check():
         "room_availability": {
             "available": not room_conflict,
             "message": "教室可用" if not room_conflict else "教室已被占用"
+        },
+        "student_availability": {
+            "available": not student_conflict,
+            "message": "学生时间可用" if not student_conflict else "学生在该时间段已有课程安排"
+        },
+        "room_suitability": {
+            "valid": room_suitable,
+            "message": "教室满足课程要求" if room_suitable else "教室类型或容量不满足课程要求"
+        },
+        "blocked_time": {
+            "available": not blocked,
+            "message": "非禁排时段" if not blocked else f"禁排时段: {blocked['reason'] or blocked['scope']}"
+        },
+        "weekly_hours": {
+            "valid": weekly_result['valid'],
+            "hours": weekly_result['hours'],
+            "max_weekly_hours": weekly_result['max_weekly_hours'],
+            "message": weekly_result['message']
         }
     }
 
@@ -885,7 +1685,11 @@ def arrange_with_faculty_check():
         qualification_result['valid'] and
         faculty_match_result['valid'] and
         not time_conflict and
-        not room_conflict
+        not room_conflict and
+        not student_conflict and
+        room_suitable and
+        not blocked and
+        weekly_result['valid']
     )
 
     if not can_schedule:
@@ -898,12 +1702,20 @@ def arrange_with_faculty_check():
             errors.append("教师时间冲突")
         if room_conflict:
             errors.append("教室已被占用")
+        if student_conflict:
+            errors.append("学生时间冲突")
+        if not room_suitable:
+            errors.append(validation_result['room_suitability']['message'])
+        if blocked:
+            errors.append(validation_result['blocked_time']['message'])
+        if not weekly_result['valid']:
+            errors.append(weekly_result['message'])
 
         return error_response("排课验证失败", 400, errors)
 
     # 创建排课记录
     class_id = str(uuid.uuid4())
-    schedule_db[class_id] = {
+    active_schedule().insert({
         "id": class_id,
         "teacher_id": teacher_id,
         "course_id": course_id,
@@ -914,13 +1726,15 @@ def arrange_with_faculty_check():
         "date": date,
         "faculty_code": teacher.get('faculty_code'),
         "status": "scheduled",
-        "created_at": datetime.now().isoformat()
-    }
+        "created_at": datetime.now().isoformat(),
+        "hours": hours
+    })
 
     return success_response({
         "class_id": class_id,
         "validation_result": validation_result,
-        "workload_warning": load_result.get('message') if load_result.get('warning') else None
+        "workload_warning": load_result.get('message') if load_result.get('warning') else None,
+        "weekly_hours_warning": weekly_result['message'] if weekly_result['warning'] else None
     }, "排课成功")
 
 
@@ -936,7 +1750,10 @@ def generate_schedule_with_faculty():
             "start_date": "2024-01-08",
             "end_date": "2024-01-14",
             "preferred_days": [1, 2, 3, 4, 5],
-            "avoid_conflicts": true
+            "avoid_conflicts": true,
+            "academic_year": "2024-2025",  // 可选，未指定开始日期时用于检查禁排
+            "semester_label": "2024-2025-2",
+            "assign_rooms": true  // 可选，已登记教室时自动分配教室
         }
 
     Response:
@@ -958,16 +1775,22 @@ def generate_schedule_with_faculty():
     preferred_days = data.get('preferred_days', [1, 2, 3, 4, 5])
     avoid_conflicts = data.get('avoid_conflicts', True)
 
+    try:
+        parse_date_ordinal(start_date)
+    except ValueError:
+        return error_response("日期格式错误，应为 YYYY-MM-DD")
+
     teacher = teachers_db.get(teacher_id)
     if not teacher:
         return error_response("教师不存在", 404)
 
-    validator = FacultyConstraintValidator(list(schedule_db.values()))
+    validator = create_validator()
 
     scheduled = []
     failed = []
 
-    for course_id in course_ids:
+    for index, course_id in enumerate(course_ids):
+        checkpoint(index, len(course_ids))
         course = courses_db.get(course_id)
         if not course:
             continue
@@ -983,6 +1806,29 @@ def generate_schedule_with_faculty():
                     if validator.hasTimeConflict(teacher_id, str(day), period):
                         continue
 
+                # 跳过禁排时段（给定开始日期时按该周对应日期判断）
+                class_date = date_for_weekday(start_date, day) if start_date else None
+                if find_blocked_time(data, teacher_id, period, class_date, day,
+                                     student_id=course.get('student_id')):
+                    continue
+
+                # 学生在该时段已有课程
+                if avoid_conflicts and active_schedule().is_student_busy(
+                        course.get('student_id'), period, class_date, day):
+                    continue
+
+                # 周课时上限
+                hours = class_hours(course['course_type'])
+                weekly_result = check_weekly_hours(teacher_id, teacher, hours, class_date)
+                if not weekly_result['valid']:
+                    failed.append({
+                        "course_id": course_id,
+                        "course_name": course.get('course_name'),
+                        "reason": weekly_result['message']
+                    })
+                    found_slot = True
+                    break
+
                 # 验证教师资格
                 qualification = validator.checkTeacherQualification(teacher_id, course['course_type'])
                 if not qualification['valid']:
@@ -1007,7 +1853,7 @@ def generate_schedule_with_faculty():
 
                 # 安排课程
                 class_id = str(uuid.uuid4())
-                schedule_db[class_id] = {
+                active_schedule().insert({
                     "id": class_id,
                     "teacher_id": teacher_id,
                     "course_id": course_id,
@@ -1015,18 +1861,20 @@ def generate_schedule_with_faculty():
                     "student_id": course.get('student_id'),
                     "day_of_week": day,
                     "period": period,
-                    "date": start_date,
+                    "date": class_date,
                     "faculty_code": teacher.get('faculty_code'),
                     "status": "scheduled",
-                    "created_at": datetime.now().isoformat()
-                }
+                    "created_at": datetime.now().isoformat(),
+                    "hours": hours
+                })
 
                 scheduled.append({
                     "class_id": class_id,
                     "course_id": course_id,
                     "course_name": course.get('course_name'),
                     "day_of_week": day,
-                    "period": period
+                    "period": period,
+                    "room_id": None
                 })
                 found_slot = True
                 break
@@ -1038,6 +1886,14 @@ def generate_schedule_with_faculty():
                 "reason": "无法找到合适的排课时段"
             })
 
+    # 自动分配教室
+    unroomed = len(scheduled)
+    if scheduled and len(room_registry) and data.get('assign_rooms', True):
+        assignments, unassigned = assign_unroomed_classes([item['class_id'] for item in scheduled])
+        for item in scheduled:
+            item['room_id'] = assignments.get(item['class_id'])
+        unroomed = len(unassigned)
+
     return success_response({
         "scheduled": scheduled,
         "failed": failed,
@@ -1045,17 +1901,1859 @@ def generate_schedule_with_faculty():
             "total": len(course_ids),
             "success": len(scheduled),
             "failed": len(failed),
+            "unroomed": unroomed,
             "success_rate": round(len(scheduled) / max(1, len(course_ids)) * 100, 1)
         }
     }, f"排课完成，成功{len(scheduled)}个，失败{len(failed)}个")
 
 
+@schedule_bp.route('/generate-parallel', methods=['POST'])
+def generate_schedule_parallel():
+    """
+    按教研室并行生成排课（多教师、多教研室的整体排课）
+
+    各教研室的教师互不重叠，按课程数为各教研室预分配教室配额后，在独立进程中分别求解；
+    合并时检查跨教研室的学生冲突，配额内未能分配教室的课程再在全部教室中补分配
+
+    Request Body:
+        {
+            "assignments": [{"course_id": "uuid", "teacher_id": "uuid"}],  // 可选，默认 courses_db 中已指定教师的课程
+            "start_date": "2024-01-08",
+            "preferred_days": [1, 2, 3, 4, 5],
+            "periods": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10],
+            "academic_year": "2024-2025",  // 可选，未指定开始日期时用于检查禁排
+            "semester_label": "2024-2025-2",
+            "parallel": true,  // 为 false 时在当前进程依次求解各教研室
+            "assign_rooms": true
+        }
+
+    Response:
+        {
+            "success": true,
+            "data": {
+                "scheduled": [...],
+                "failed": [...],
+                "faculties": {"PIANO": {"courses": 120, "rooms": 40, "scheduled": 118}},
+                "statistics": {...}
+            }
+        }
+    """
+    # 进程池相关模块只在使用并行生成时加载
+    from parallel_generation import allocate_room_quotas, run_partitions, solve_faculty_partition
+
+    data = request.json or {}
+    start_date = data.get('start_date')
+    days = data.get('preferred_days', [1, 2, 3, 4, 5])
+    periods = data.get('periods', list(range(1, 11)))
+
+    try:
+        parse_date_ordinal(start_date)
+    except ValueError:
+        return error_response("日期格式错误，应为 YYYY-MM-DD")
+
+    assignments = data.get('assignments')
+    if assignments is None:
+        assignments = [
+            {"course_id": course_id, "teacher_id": course['teacher_id']}
+            for course_id, course in courses_db.items() if course.get('teacher_id')
+        ]
+    if not isinstance(assignments, list):
+        return error_response("assignments 必须是数组")
+
+    dates = {day: date_for_weekday(start_date, day) if start_date else None for day in days}
+    store = active_schedule()
+
+    with store_lock:
+        validator = create_validator()
+        failed = []
+        partitions: Dict[str, Dict] = {}
+
+        # 1. 校验资格并按教研室划分，计算教师占用与禁排位图
+        for index, item in enumerate(assignments):
+            checkpoint(index, len(assignments))
+            course_id = item.get('course_id') if isinstance(item, dict) else None
+            teacher_id = item.get('teacher_id') if isinstance(item, dict) else None
+            course = courses_db.get(course_id)
+            teacher = teachers_db.get(teacher_id)
+            if not course or not teacher:
+                failed.append({"course_id": course_id, "teacher_id": teacher_id,
+                               "reason": "课程不存在" if not course else "教师不存在"})
+                continue
+
+            qualification = validator.checkTeacherQualification(teacher_id, course['course_type'])
+            faculty_match = validator.checkFacultyMatch(teacher_id, course['course_type'])
+            if not qualification['valid'] or not faculty_match['valid']:
+                failed.append({
+                    "course_id": course_id,
+                    "teacher_id": teacher_id,
+                    "reason": (qualification if not qualification['valid'] else faculty_match).get('message')
+                })
+                continue
+
+            faculty_code = teacher.get('faculty_code')
+            partition = partitions.setdefault(faculty_code, {"teachers": {}, "courses": []})
+            if teacher_id not in partition['teachers']:
+                busy = {}
+                for day in days:
+                    mask = 0
+                    for period in periods:
+                        if store.is_teacher_busy(teacher_id, period, dates[day], day):
+                            mask |= 1 << period
+                    busy[day] = mask
+                partition['teachers'][teacher_id] = {
+                    "busy": busy,
+                    "remaining_hours": (
+                        teacher.get('max_weekly_hours', DEFAULT_MAX_WEEKLY_HOURS)
+                        - store.teacher_weekly_hours(teacher_id, start_date)
+                    )
+                }
+
+            blocked = {}
+            for day in days:
+                mask = 0
+                for period in periods:
+                    if find_blocked_time(data, teacher_id, period, dates[day], day,
+                                         student_id=course.get('student_id')):
+                        mask |= 1 << period
+                blocked[day] = mask
+
+            partition['courses'].append({
+                "index": index,
+                "course_id": course_id,
+                "teacher_id": teacher_id,
+                "student_id": course.get('student_id'),
+                "capacity": required_room_capacity(course),
+                "hours": class_hours(course['course_type']),
+                "faculty_code": faculty_code,
+                "blocked": blocked
+            })
+
+        # 学生已有课程的占用（查询学生时段占用索引，不扫描排课记录）
+        student_busy: Dict[str, Dict[int, int]] = {}
+        student_ids = {
+            course['student_id'] for partition in partitions.values()
+            for course in partition['courses'] if course['student_id']
+        }
+        for student_id in student_ids:
+            for day in days:
+                mask = 0
+                for period in periods:
+                    if store.is_student_busy(student_id, period, dates[day], day):
+                        mask |= 1 << period
+                if mask:
+                    student_busy.setdefault(student_id, {})[day] = mask
+
+        # 2. 预分配教室配额（配额内教室的占用含已有排课与教室禁排）
+        quotas = allocate_room_quotas(
+            room_registry.rooms(),
+            {faculty: len(partition['courses']) for faculty, partition in partitions.items()}
+        )
+        tasks = []
+        for faculty_code, partition in partitions.items():
+            room_busy = {}
+            for room in quotas[faculty_code]:
+                busy = {}
+                for day in days:
+                    mask = 0
+                    for period in periods:
+                        if (
+                            store.is_room_busy(room['id'], period, dates[day], day)
+                            or blocked_time_calendar.find_block(period, dates[day], day, room_id=room['id'])
+                        ):
+                            mask |= 1 << period
+                    busy[day] = mask
+                room_busy[room['id']] = busy
+            tasks.append({
+                "faculty_code": faculty_code,
+                "days": days,
+                "periods": periods,
+                "rooms": quotas[faculty_code],
+                "room_busy": room_busy,
+                "teachers": partition['teachers'],
+                "students": {
+                    course['student_id']: student_busy[course['student_id']]
+                    for course in partition['courses'] if course['student_id'] in student_busy
+                },
+                "courses": partition['courses']
+            })
+
+        results = run_partitions(tasks, data.get('parallel', True))
+        checkpoint(len(assignments), len(assignments))
+
+        # 3. 合并：同一学生在不同教研室的课程不能排在同一时段，冲突的课程在合并后统一重排
+        scheduled = []
+        faculties = {}
+        teacher_state = {tid: state for partition in partitions.values() for tid, state in partition['teachers'].items()}
+        course_items = {course['index']: course for task in tasks for course in task['courses']}
+        conflicted = []
+
+        def place(item: Dict) -> bool:
+            course_item = course_items[item['index']]
+            day, bit = item['day_of_week'], 1 << item['period']
+            student_id = course_item['student_id']
+            if student_id:
+                days_busy = student_busy.setdefault(student_id, {})
+                if days_busy.get(day, 0) & bit:
+                    return False
+                days_busy[day] = days_busy.get(day, 0) | bit
+            state = teacher_state[item['teacher_id']]
+            state['busy'][day] = state['busy'].get(day, 0) | bit
+            state['remaining_hours'] -= course_item['hours']
+
+            class_id = str(uuid.uuid4())
+            store.insert({
+                "id": class_id,
+                "teacher_id": item['teacher_id'],
+                "course_id": item['course_id'],
+                "room_id": item['room_id'],
+                "student_id": student_id,
+                "day_of_week": day,
+                "period": item['period'],
+                "date": dates[day],
+                "faculty_code": course_item['faculty_code'],
+                "status": "scheduled",
+                "created_at": datetime.now().isoformat(),
+                "hours": course_item['hours']
+            })
+            scheduled.append(dict(item, class_id=class_id, faculty_code=course_item['faculty_code'],
+                                  date=dates[day]))
+            return True
+
+        for task, result in zip(tasks, results):
+            failed.extend(result['failed'])
+            for item in result['scheduled']:
+                if not place(item):
+                    conflicted.append(course_items[item['index']])
+            faculties[task['faculty_code']] = {"courses": len(task['courses']), "rooms": len(task['rooms'])}
+
+        if conflicted:
+            # 教室留待第 4 步在全部教室中分配
+            repair = solve_faculty_partition({
+                "faculty_code": None,
+                "days": days,
+                "periods": periods,
+                "rooms": [],
+                "room_busy": {},
+                "teachers": {course['teacher_id']: teacher_state[course['teacher_id']] for course in conflicted},
+                "students": student_busy,
+                "courses": conflicted
+            })
+            for item in repair['scheduled']:
+                place(item)
+            failed.extend(repair['failed'])
+
+        for faculty_code, summary in faculties.items():
+            summary['scheduled'] = sum(1 for item in scheduled if item['faculty_code'] == faculty_code)
+        for item in failed:
+            index = item.pop('index', None)
+            if index is not None:
+                item['teacher_id'] = assignments[index]['teacher_id']
+
+        # 4. 配额内未能分配教室的课程在全部教室中补分配
+        pending = [item['class_id'] for item in scheduled if item['room_id'] is None]
+        unroomed = len(pending)
+        if pending and len(room_registry) and data.get('assign_rooms', True):
+            room_assignments, unassigned = assign_unroomed_classes(pending)
+            for item in scheduled:
+                if item['class_id'] in room_assignments:
+                    item['room_id'] = room_assignments[item['class_id']]
+            unroomed = len(unassigned)
+
+    for item in scheduled:
+        item.pop('index', None)
+
+    return success_response({
+        "scheduled": scheduled,
+        "failed": failed,
+        "faculties": faculties,
+        "statistics": {
+            "total": len(assignments),
+            "success": len(scheduled),
+            "failed": len(failed),
+            "unroomed": unroomed,
+            "success_rate": round(len(scheduled) / max(1, len(assignments)) * 100, 1)
+        }
+    }, f"排课完成，成功{len(scheduled)}个，失败{len(failed)}个")
+
+
+@schedule_bp.route('/pack-groups', methods=['POST'])
+def pack_group_classes():
+    """
+    小组课编班：按乐器将报名学生编入最少数量的小组，分配有资格的教师并排定时段
+
+    每组人数不超过乐器配置中的 max_students，教师分配受 max_weekly_hours 限制，
+    同一教师或同一学生不会被排在同一时段
+
+    Request Body:
+        {
+            "enrollments": [{"student_id": "uuid", "instrument": "古筝"}],
+            "teacher_ids": ["uuid"],  // 可选，默认全部在职教师
+            "preferred_days": [1, 2, 3, 4, 5],
+            "periods": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10],
+            "hours_per_section": 0.5,  // 默认按乐器课时系数
+            "commit": false  // 为 true 时写入排课记录并自动分配教室
+        }
+
+    Response:
+        {
+            "success": true,
+            "data": {
+                "sections": [{"instrument", "teacher_id", "student_ids", "day_of_week", "period", "class_id"}],
+                "unplaced": [{"instrument", "student_ids", "reason"}],
+                "statistics": {...}
+            }
+        }
+    """
+    data = request.json or {}
+    enrollments = data.get('enrollments')
+
+    if not isinstance(enrollments, list) or not enrollments:
+        return error_response("enrollments 必须是非空数组")
+    for index, item in enumerate(enrollments):
+        if not isinstance(item, dict) or not item.get('student_id') or not item.get('instrument'):
+            return error_response(f"第{index + 1}条报名记录缺少 student_id 或 instrument")
+
+    teacher_ids = data.get('teacher_ids') or list(teachers_db)
+    preferred_days = data.get('preferred_days', [1, 2, 3, 4, 5])
+    periods = data.get('periods', list(range(1, 11)))
+
+    store = active_schedule()
+    with store_lock:
+        config = current_config()
+        registry, matrix = config.registry, config.qualifications
+        # 未指定时每组课时按各乐器的课时系数
+        if data.get('hours_per_section') is not None:
+            hours_per_section = data['hours_per_section']
+        else:
+            hours_per_section = {
+                item['instrument']: registry.duration_coefficient(item['instrument']) for item in enrollments
+            }
+
+        teachers = []
+        for teacher_id in teacher_ids:
+            teacher = teachers_db.get(teacher_id)
+            if not teacher or teacher.get('status', 'active') != 'active':
+                continue
+            teachers.append({
+                "id": teacher_id,
+                "instruments": [
+                    name for name, _ in matrix.teacher_instruments(teacher_id)
+                    if matrix.check(teacher_id, name) == 0
+                ],
+                "max_weekly_hours": teacher.get('max_weekly_hours', DEFAULT_MAX_WEEKLY_HOURS),
+                "current_hours": store.teacher_weekly_hours(teacher_id)
+            })
+
+        def slot_available(teacher_id: str, student_ids: List[str], day: int, period: int) -> bool:
+            if store.is_teacher_busy(teacher_id, period, day_of_week=day):
+                return False
+            if find_blocked_time(data, teacher_id, period, day_of_week=day):
+                return False
+            return not any(
+                store.is_student_busy(student_id, period, day_of_week=day)
+                or find_blocked_time(data, None, period, day_of_week=day, student_id=student_id)
+                for student_id in student_ids
+            )
+
+        result = pack_groups(
+            enrollments,
+            teachers,
+            registry.capacity_table(),
+            [(day, period) for day in preferred_days for period in periods],
+            slot_available,
+            hours_per_section
+        )
+
+        if data.get('commit'):
+            for index, section in enumerate(result['sections']):
+                checkpoint(index, len(result['sections']))
+                class_id = str(uuid.uuid4())
+                store.insert({
+                    "id": class_id,
+                    "teacher_id": section['teacher_id'],
+                    "course_id": None,
+                    "room_id": None,  # 待分配
+                    "student_id": None,
+                    "student_ids": section['student_ids'],
+                    "day_of_week": section['day_of_week'],
+                    "period": section['period'],
+                    "date": None,
+                    "faculty_code": teachers_db[section['teacher_id']].get('faculty_code'),
+                    "status": "scheduled",
+                    "created_at": datetime.now().isoformat(),
+                    "hours": section['hours']
+                })
+                section['class_id'] = class_id
+
+            if result['sections'] and len(room_registry):
+                assignments, _ = assign_unroomed_classes([section['class_id'] for section in result['sections']])
+                for section in result['sections']:
+                    section['room_id'] = assignments.get(section['class_id'])
+
+    placed_students = sum(len(section['student_ids']) for section in result['sections'])
+    return success_response({
+        "sections": result['sections'],
+        "unplaced": result['unplaced'],
+        "statistics": {
+            "sections": len(result['sections']),
+            "placed_students": placed_students,
+            "unplaced_students": sum(len(item['student_ids']) for item in result['unplaced']),
+            "committed": bool(data.get('commit'))
+        }
+    }, f"编班完成，共{len(result['sections'])}个小组")
+
+
+@schedule_bp.route('/optimize', methods=['POST'])
+def optimize_schedule():
+    """
+    排课质量评分与优化（模拟退火，增量计算分值）
+
+    评分项越低越好：教师空堂、教师在优选日间的负载均衡、学生相邻课程换教室、
+    课程不在优选日/优选节次、课程离开原时段；移动课程时保持教师、教室、学生不冲突且不进入禁排时段
+
+    Request Body:
+        {
+            "teacher_ids": ["uuid"],  // 可选，仅移动这些教师的课程
+            "faculty_code": "PIANO",  // 可选，仅移动该教研室的课程
+            "preferred_days": [1, 2, 3, 4, 5],
+            "periods": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10],
+            "preferred_periods": [1, 2, 3, 4, 5, 6, 7, 8],  // 可选
+            "weights": {"teacher_gaps": 1.0, "load_balance": 0.5, "student_travel": 2.0, "preferences": 3.0, "changes": 0.1},
+            "time_budget_ms": 500,
+            "apply": false
+        }
+
+    Response:
+        {
+            "success": true,
+            "data": {
+                "before": {"teacher_gaps": 12, ..., "total": 230.5},
+                "after": {"teacher_gaps": 2, ..., "total": 140.0},
+                "moves": [{"class_id", "from": {...}, "to": {...}}],
+                "iterations": 52000,
+                "applied": false
+            }
+        }
+    """
+    data = request.json or {}
+    teacher_ids = set(data.get('teacher_ids') or [])
+    faculty_code = data.get('faculty_code')
+    weights = data.get('weights') or {}
+
+    unknown = [name for name in weights if name not in DEFAULT_WEIGHTS]
+    if unknown:
+        return error_response(f"未知的评分项: {', '.join(unknown)}")
+    try:
+        time_budget_ms = min(int(data.get('time_budget_ms', 500)), MAX_OPTIMIZE_BUDGET_MS)
+    except (TypeError, ValueError):
+        return error_response("time_budget_ms 必须为整数")
+
+    store = active_schedule()
+    with store_lock:
+        classes = []
+        for record in store.records():
+            teacher_id = store.teachers.value(record.teacher)
+            students = tuple(store.students.value(student) for student in store.record_students(record))
+            movable = (
+                (not teacher_ids or teacher_id in teacher_ids)
+                and (not faculty_code or store.faculties.value(record.faculty) == faculty_code)
+            )
+            classes.append(ScheduleClass(
+                record.id, teacher_id, store.rooms.value(record.room), students,
+                record.date - record.day_of_week + 1 if record.date else 0,
+                record.day_of_week, record.period, movable
+            ))
+
+        def is_blocked(cls: ScheduleClass, day: int, period: int, date: Optional[str]) -> bool:
+            if find_blocked_time(data, cls.teacher, period, date, day, cls.room):
+                return True
+            return any(
+                blocked_time_calendar.find_block(period, date, day, student_id=student_id)
+                for student_id in cls.students
+            )
+
+        optimizer = ScheduleOptimizer(
+            classes,
+            data.get('preferred_days', [1, 2, 3, 4, 5]),
+            data.get('periods', list(range(1, 11))),
+            weights,
+            data.get('preferred_periods'),
+            is_blocked,
+            data.get('seed')
+        )
+        before = optimizer.breakdown()
+        result = optimizer.optimize(time_budget_ms)
+        after = optimizer.breakdown()
+
+        moves = []
+        by_id = {cls.id: cls for cls in optimizer.movable}
+        for class_id, (day, period) in result['moves'].items():
+            record = store.get(class_id)
+            original = store.to_dict(record)
+            updated = dict(original, day_of_week=day, period=period, date=by_id[class_id].date())
+            moves.append({
+                "class_id": class_id,
+                "from": {"day_of_week": original['day_of_week'], "period": original['period'], "date": original['date']},
+                "to": {"day_of_week": day, "period": period, "date": updated['date']}
+            })
+            if data.get('apply'):
+                store.insert(updated)
+
+    return success_response({
+        "before": before,
+        "after": after,
+        "moves": moves,
+        "iterations": result['iterations'],
+        "applied": bool(data.get('apply'))
+    }, f"优化完成，总分 {before['total']} -> {after['total']}，调整{len(moves)}节课")
+
+
 # =====================================================
-# 注册蓝图
+# 学生课表API
 # =====================================================
 
-def register_api_routes(app):
-    """注册所有API蓝图"""
-    app.register_blueprint(faculty_bp)
-    app.register_blueprint(teacher_bp)
-    app.register_blueprint(schedule_bp)
+@schedule_bp.route('/student-timetables', methods=['POST'])
+def get_student_timetables():
+    """
+    批量获取学生课表（从学生课表索引按日期范围切片）
+
+    Request Body:
+        {
+            "student_ids": ["uuid", ...],
+            "start_date": "2025-03-03",  // 可选，与 end_date（含）一起限定日期范围
+            "end_date": "2025-03-09"
+        }
+
+    Response:
+        {
+            "success": true,
+            "data": {
+                "timetables": {
+                    "student_id": {"classes": [...], "recurring": [...]}
+                }
+            }
+        }
+    """
+    data = request.json or {}
+    student_ids = data.get('student_ids')
+    if not isinstance(student_ids, list) or not student_ids:
+        return error_response("student_ids 必须是非空数组")
+    if len(student_ids) > MAX_STUDENT_TIMETABLES:
+        return error_response(f"单次最多查询{MAX_STUDENT_TIMETABLES}名学生")
+    try:
+        start = parse_date_ordinal(data.get('start_date'))
+        end = parse_date_ordinal(data.get('end_date'))
+    except ValueError:
+        return error_response("日期格式错误，应为 YYYY-MM-DD")
+
+    store = active_schedule()
+    timetables = {}
+    for student_id in dict.fromkeys(map(str, student_ids)):
+        recurring = sorted(store.student_timetable(student_id, 0, 1), key=attrgetter('day_of_week', 'period'))
+        classes = store.student_timetable(student_id, max(start, 1), end + 1 if end else 0)
+        timetables[student_id] = {
+            "classes": [store.to_dict(record) for record in classes],
+            "recurring": [store.to_dict(record) for record in recurring]
+        }
+
+    return success_response({
+        "start_date": data.get('start_date'),
+        "end_date": data.get('end_date'),
+        "timetables": timetables
+    }, f"获取{len(timetables)}名学生课表成功")
+
+
+@schedule_bp.route('/student-conflicts', methods=['POST'])
+def check_student_conflicts():
+    """
+    批量检查学生时段冲突（每个时段查询一次学生时段占用索引）
+
+    Request Body:
+        {
+            "slots": [
+                {"student_id": "uuid", "day_of_week": 1, "period": 3, "date": "2025-03-03"}
+            ]
+        }
+
+    Response:
+        {
+            "success": true,
+            "data": {
+                "checked": 1,
+                "conflicts": [
+                    {"index": 0, "student_id": "uuid", "day_of_week": 1, "period": 3, "date": "2025-03-03",
+                     "message": "学生在该时间段已有课程安排"}
+                ]
+            }
+        }
+    """
+    data = request.json or {}
+    slots = data.get('slots')
+    if not isinstance(slots, list):
+        return error_response("slots 必须是数组")
+    if len(slots) > MAX_STUDENT_SLOT_CHECKS:
+        return error_response(f"单次最多检查{MAX_STUDENT_SLOT_CHECKS}个时段")
+
+    store = active_schedule()
+    conflicts = []
+    for index, slot in enumerate(slots):
+        if not isinstance(slot, dict) or not slot.get('student_id') or not slot.get('period'):
+            return error_response(f"第{index + 1}个时段缺少 student_id 或 period")
+        try:
+            busy = store.is_student_busy(str(slot['student_id']), int(slot['period']),
+                                         slot.get('date'), slot.get('day_of_week'))
+        except (TypeError, ValueError):
+            return error_response(f"第{index + 1}个时段的日期或节次格式错误")
+        if busy:
+            conflicts.append({
+                "index": index,
+                "student_id": slot['student_id'],
+                "day_of_week": slot.get('day_of_week'),
+                "period": slot['period'],
+                "date": slot.get('date'),
+                "message": "学生在该时间段已有课程安排"
+            })
+
+    return success_response({
+        "checked": len(slots),
+        "conflicts": conflicts
+    }, f"检查完成，发现{len(conflicts)}个学生冲突")
+
+
+# =====================================================
+# 学期归档API
+# =====================================================
+
+def term_records(term: Dict) -> List:
+    """在线存储中日期落在学期内的记录（未指定日期的每周循环课不属于任何学期）"""
+    start = parse_date_ordinal(term['start_date'])
+    end = start + term['total_weeks'] * 7
+    return [record for record in schedule_db.records() if start <= record.date < end]
+
+
+@schedule_bp.route('/archive-term', methods=['POST'])
+def archive_term():
+    """
+    归档学期：将日期落在该学期内的排课记录写入磁盘归档段，并从在线存储中移除
+
+    学期须已通过 /api/blocked-time/terms 登记；归档段写入完成后才删除在线记录，
+    删除记入同步日志，客户端增量同步时收到删除
+
+    Request Body:
+        {
+            "academic_year": "2024-2025",
+            "semester_label": "2024-2025-1"
+        }
+    """
+    data = request.json or {}
+    for field in ['academic_year', 'semester_label']:
+        if not data.get(field):
+            return error_response(f"缺少必填字段: {field}")
+
+    key = (str(data['academic_year']), str(data['semester_label']))
+    term = next((t for t in blocked_time_calendar.terms()
+                 if (t['academic_year'], t['semester_label']) == key), None)
+    if term is None:
+        return error_response(f"学期 {key[0]} {key[1]} 未登记", 404)
+
+    with store_lock:
+        records = term_records(term)
+        if not records:
+            return success_response({"archived": 0, "segment": None}, "该学期没有需要归档的排课记录")
+        path = term_archive.archive(key[0], key[1], schedule_db, records, meta={
+            "start_date": term['start_date'],
+            "total_weeks": term['total_weeks'],
+            "archived_at": datetime.now().isoformat()
+        })
+        for record in records:
+            schedule_db.remove(record.id)
+
+    return success_response({
+        "archived": len(records),
+        "segment": os.path.basename(path),
+        "remaining": len(schedule_db)
+    }, f"已归档 {len(records)} 条排课记录")
+
+
+@schedule_bp.route('/archive', methods=['GET'])
+def list_archived_terms():
+    """获取已归档的学期（记录数、段数与占用字节数）"""
+    return success_response(term_archive.terms(), "获取归档学期成功")
+
+
+@schedule_bp.route('/archive/<academic_year>/<semester_label>', methods=['GET'])
+def query_archived_term(academic_year, semester_label):
+    """
+    查询归档学期的排课记录（按需打开归档段，只解压用到的列）
+
+    Query Parameters:
+        - teacher_id / course_id / room_id / student_id / faculty_code: 等值筛选
+        - page / per_page: 分页
+    """
+    page, per_page = pagination_params()
+    filters = {}
+    for param, field in [('teacher_id', 'teacher'), ('course_id', 'course'), ('room_id', 'room'),
+                         ('student_id', 'student'), ('faculty_code', 'faculty')]:
+        value = request.args.get(param)
+        if value:
+            filters[field] = value
+
+    if not term_archive.segments(academic_year, semester_label):
+        return error_response(f"学期 {academic_year} {semester_label} 未归档", 404)
+
+    schedules, total = term_archive.query(
+        academic_year, semester_label, filters, (page - 1) * per_page, per_page
+    )
+    return success_response({
+        "schedules": schedules,
+        "pagination": {
+            "page": page,
+            "per_page": per_page,
+            "total": total
+        }
+    }, f"获取归档排课记录成功，共{total}条")
+
+
+def segment_response(data: bytes, filename: str) -> Response:
+    """以附件形式返回归档段"""
+    return Response(data, mimetype='application/octet-stream', headers={
+        'Content-Disposition': f'attachment; filename="{filename}"'
+    })
+
+
+def codec_param():
+    """提取压缩算法参数（默认 zstd，未安装 zstandard 时为 zlib）"""
+    codec = request.args.get('codec', DEFAULT_CODEC)
+    return codec if codec in CODECS else None
+
+
+def date_range_params():
+    """提取 start_date / end_date（含）为日期序数范围 [start, end)，未指定为 0"""
+    start = parse_date_ordinal(request.args.get('start_date'))
+    end = parse_date_ordinal(request.args.get('end_date'))
+    return start, end + 1 if end else 0
+
+
+@schedule_bp.route('/export', methods=['GET'])
+def export_schedules():
+    """
+    导出在线排课记录为列式归档段（与学期归档同一格式，ID 字典编码并压缩）
+
+    Query Parameters:
+        - start_date / end_date: 只导出日期在范围内的记录（指定时不含未指定日期的每周循环课）
+        - codec: zstd / zlib
+    """
+    codec = codec_param()
+    if codec is None:
+        return error_response(f"不支持的压缩算法，可选: {', '.join(CODECS)}")
+    try:
+        start, end = date_range_params()
+    except ValueError:
+        return error_response("日期格式错误，应为 YYYY-MM-DD")
+
+    with store_lock:
+        records = [record for record in schedule_db.records()
+                   if (not start or record.date >= start) and (not end or 0 < record.date < end)]
+        encoded = encode_records(schedule_db, records)
+    data = encode_segment(*encoded, meta={"exported_at": datetime.now().isoformat()}, codec=codec)
+    return segment_response(data, f"schedule-{datetime.now().strftime('%Y%m%d%H%M%S')}.seg")
+
+
+@schedule_bp.route('/archive/<academic_year>/<semester_label>/export', methods=['GET'])
+def export_archived_term(academic_year, semester_label):
+    """导出归档学期（多个段合并为一个）"""
+    codec = codec_param()
+    if codec is None:
+        return error_response(f"不支持的压缩算法，可选: {', '.join(CODECS)}")
+    segments = term_archive.segments(academic_year, semester_label)
+    if not segments:
+        return error_response(f"学期 {academic_year} {semester_label} 未归档", 404)
+
+    meta = dict(segments[0].meta, exported_at=datetime.now().isoformat())
+    data = encode_segment(*combine_segments(segments), meta=meta, codec=codec)
+    return segment_response(data, f"{academic_year}-{semester_label}.seg")
+
+
+@schedule_bp.route('/import', methods=['POST'])
+def import_schedules():
+    """
+    导入归档段（请求体为 /export 导出的文件内容）
+
+    Query Parameters:
+        - target: store（默认，写入在线存储，相同ID的记录被覆盖）或 archive（直接存为归档学期）
+        - academic_year / semester_label: target=archive 时的学期，默认取段内记录的学期
+    """
+    target = request.args.get('target', 'store')
+    if target not in ('store', 'archive'):
+        return error_response("target 只能是 store 或 archive")
+
+    # 上传内容先落盘再通过 mmap 读取，不在内存中保留整个请求体
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=DATA_DIR, suffix='.upload', delete=False) as f:
+        shutil.copyfileobj(request.stream, f)
+        upload_path = f.name
+    segment = None
+    try:
+        segment = ArchiveSegment(upload_path)
+        segment.verify()
+        if target == 'archive':
+            academic_year = request.args.get('academic_year') or segment.meta.get('academic_year')
+            semester_label = request.args.get('semester_label') or segment.meta.get('semester_label')
+            if not academic_year or not semester_label:
+                return error_response("缺少学期: academic_year / semester_label")
+            path = term_archive.add(
+                str(academic_year), str(semester_label), *combine_segments([segment]),
+                meta=dict(segment.meta, imported_at=datetime.now().isoformat()), codec=segment.codec
+            )
+            return success_response({
+                "imported": segment.rows,
+                "segment": os.path.basename(path)
+            }, f"已导入 {segment.rows} 条归档排课记录")
+
+        with store_lock:
+            for row in range(segment.rows):
+                schedule_db.insert(segment.to_dict(row))
+        return success_response({
+            "imported": segment.rows,
+            "total": len(schedule_db)
+        }, f"已导入 {segment.rows} 条排课记录")
+    except ArchiveError as e:
+        return error_response(str(e))
+    finally:
+        if segment is not None:
+            segment.close()
+        os.remove(upload_path)
+
+
+@schedule_bp.route('/archive/workload', methods=['GET'])
+def get_archived_workload():
+    """
+    历史工作量统计（在归档段的整数列上汇总，不还原为记录）
+
+    Query Parameters:
+        - academic_year / semester_label: 只统计该学期，默认统计全部归档
+        - start_date / end_date: 只统计日期在范围内的记录
+
+    Response:
+        {
+            "records": 1820,
+            "teachers": [{"teacher_id": "...", "classes": 64, "hours": 32.0}],
+            "faculties": [{"faculty_code": "PIANO", "classes": 900, "hours": 450.0}]
+        }
+    """
+    try:
+        start, end = date_range_params()
+    except ValueError:
+        return error_response("日期格式错误，应为 YYYY-MM-DD")
+
+    academic_year = request.args.get('academic_year')
+    semester_label = request.args.get('semester_label')
+    if academic_year and semester_label:
+        segments = term_archive.segments(academic_year, semester_label)
+    else:
+        segments = term_archive.all_segments()
+
+    report = workload_report(segments, start, end)
+    registry = current_registry()
+    for faculty in report['faculties']:
+        faculty['faculty_name'] = registry.faculty_name(faculty['faculty_code'])
+    return success_response(report, "获取历史工作量统计成功")
+
+
+# =====================================================
+# 禁排时间API
+# =====================================================
+
+@blocked_time_bp.route('/terms', methods=['GET'])
+def list_blocked_time_terms():
+    """获取已登记的学期周次配置"""
+    return success_response(blocked_time_calendar.terms(), "获取学期配置成功")
+
+
+@blocked_time_bp.route('/terms', methods=['POST'])
+def set_blocked_time_term():
+    """
+    登记学期周次配置（用于按日期换算周次）
+
+    Request Body:
+        {
+            "academic_year": "2024-2025",
+            "semester_label": "2024-2025-2",
+            "start_date": "2025-02-24",
+            "total_weeks": 16
+        }
+    """
+    data = request.json or {}
+
+    for field in ['academic_year', 'semester_label', 'start_date']:
+        if not data.get(field):
+            return error_response(f"缺少必填字段: {field}")
+
+    try:
+        with store_lock:
+            term = blocked_time_calendar.set_term(
+                data['academic_year'], data['semester_label'],
+                data['start_date'], data.get('total_weeks', 16)
+            )
+    except (BlockedTimeError, TypeError, ValueError) as e:
+        return error_response(str(e))
+
+    return success_response(term, "学期配置已保存")
+
+
+@blocked_time_bp.route('/bulk-load', methods=['POST'])
+def bulk_load_blocked_times():
+    """
+    批量加载禁排时间（全部校验通过后才写入）
+
+    Request Body:
+        {
+            "replace": false,  // 是否先清空所涉及学期的同类禁排
+            "blocks": [
+                {
+                    "kind": "base",  // base | priority | teacher
+                    "academic_year": "2024-2025",
+                    "semester_label": "2024-2025-2",
+                    "week_number": 3,  // 可选，单周禁排
+                    "start_week": 1, "end_week": 16,  // 可选，周次范围；均未指定时每周禁排
+                    "day_of_week": 3,  // 可选，未指定时整周
+                    "start_period": 1, "end_period": 4,  // 可选，未指定时全天
+                    "entity_type": "teacher", "entity_id": "uuid",  // priority 禁排的作用对象
+                    "teacher_id": "uuid",  // teacher 禁排的教师
+                    "priority": "high",
+                    "reason": "全校大课"
+                }
+            ]
+        }
+
+    Response:
+        {
+            "success": true,
+            "data": {
+                "loaded": 1,
+                "ids": ["uuid"]
+            }
+        }
+    """
+    data = request.json or {}
+    blocks = data.get('blocks')
+
+    if not isinstance(blocks, list) or not blocks:
+        return error_response("blocks 必须是非空数组")
+
+    try:
+        with store_lock:
+            loaded = blocked_time_calendar.bulk_load(blocks, replace=bool(data.get('replace')))
+    except BulkLoadError as e:
+        return error_response(str(e), 400, e.errors)
+
+    return success_response({
+        "loaded": len(loaded),
+        "ids": [block['id'] for block in loaded]
+    }, f"已加载{len(loaded)}条禁排时间")
+
+
+@blocked_time_bp.route('/clear', methods=['POST'])
+def clear_blocked_times():
+    """
+    清空学期禁排时间
+
+    Request Body:
+        {
+            "academic_year": "2024-2025",
+            "semester_label": "2024-2025-2",
+            "kind": "teacher",  // 可选，仅清空该类型
+            "teacher_id": "uuid"  // 可选，仅清空该教师的禁排
+        }
+    """
+    data = request.json or {}
+
+    if not data.get('academic_year') or not data.get('semester_label'):
+        return error_response("缺少学年或学期标签")
+    if data.get('kind') and data['kind'] not in BLOCK_KINDS:
+        return error_response("kind 必须是 base, priority 或 teacher")
+
+    with store_lock:
+        removed = blocked_time_calendar.clear(
+            data['academic_year'], data['semester_label'],
+            kind=data.get('kind'), teacher_id=data.get('teacher_id')
+        )
+
+    return success_response({"removed": removed}, f"已清空{removed}条禁排时间")
+
+
+@blocked_time_bp.route('/list', methods=['GET'])
+def list_blocked_times():
+    """
+    获取禁排时间列表
+
+    Query Parameters:
+        academic_year, semester_label, kind: 可选过滤条件
+    """
+    blocks = blocked_time_calendar.list_blocks(
+        request.args.get('academic_year'),
+        request.args.get('semester_label'),
+        request.args.get('kind')
+    )
+    return success_response(blocks, "获取禁排时间成功")
+
+
+@blocked_time_bp.route('/check', methods=['GET'])
+def check_blocked_time():
+    """
+    检查时段是否被禁排
+
+    Query Parameters:
+        period: 节次（必填）
+        date: 日期（YYYY-MM-DD），或 day_of_week + academic_year + semester_label
+        teacher_id, room_id, student_id: 可选，同时检查对应对象的禁排
+
+    Response:
+        {
+            "success": true,
+            "data": {
+                "blocked": true,
+                "block": {...}
+            }
+        }
+    """
+    period = request.args.get('period', type=int)
+    day_of_week = request.args.get('day_of_week', type=int)
+    date = request.args.get('date')
+
+    if not period:
+        return error_response("缺少必填字段: period")
+    if not date and not day_of_week:
+        return error_response("需要指定 date 或 day_of_week")
+
+    try:
+        parse_date_ordinal(date)
+    except ValueError:
+        return error_response("日期格式错误，应为 YYYY-MM-DD")
+
+    block = find_blocked_time(
+        request.args, request.args.get('teacher_id'), period, date, day_of_week,
+        request.args.get('room_id'), request.args.get('student_id')
+    )
+    return success_response({"blocked": block is not None, "block": block}, "检查完成")
+
+
+# =====================================================
+# 教室API
+# =====================================================
+
+@room_bp.route('/list', methods=['GET'])
+def list_rooms():
+    """
+    获取已登记的教室
+
+    Query Parameters:
+        room_type: 可选，按教室类型过滤
+    """
+    room_type = request.args.get('room_type')
+    rooms = [room for room in room_registry.rooms() if not room_type or room['room_type'] == room_type]
+    return success_response(rooms, "获取教室列表成功")
+
+
+@room_bp.route('/bulk-load', methods=['POST'])
+def bulk_load_rooms():
+    """
+    批量登记教室（已存在的教室按ID覆盖）
+
+    Request Body:
+        {
+            "rooms": [
+                {
+                    "id": "uuid",
+                    "room_name": "琴房101",
+                    "room_type": "琴房",  // 琴房 | 教室 | 大教室 | 排练厅
+                    "capacity": 1,  // 可选，默认按类型
+                    "faculty_code": "PIANO"  // 可选，教研室专属教室
+                }
+            ]
+        }
+    """
+    data = request.json or {}
+    rooms = data.get('rooms')
+
+    if not isinstance(rooms, list) or not rooms:
+        return error_response("rooms 必须是非空数组")
+
+    try:
+        with store_lock:
+            loaded = room_registry.bulk_load(rooms)
+    except RoomError as e:
+        return error_response(str(e))
+
+    return success_response({"loaded": len(loaded)}, f"已登记{len(loaded)}间教室")
+
+
+@room_bp.route('/<room_id>', methods=['DELETE'])
+def remove_room(room_id: str):
+    """删除教室登记（已排课记录不受影响）"""
+    with store_lock:
+        removed = room_registry.remove(room_id)
+    if not removed:
+        return error_response("教室不存在", 404)
+    return success_response(None, "教室已删除")
+
+
+@room_bp.route('/assign', methods=['POST'])
+def assign_rooms_to_classes():
+    """
+    为未分配教室的排课记录批量分配教室
+
+    按时段分组，在 课程×空闲教室 上做二分匹配，候选教室需满足
+    教研室可用类型与容量（乐器最大人数），优先使用最小可容纳教室
+
+    Request Body:
+        {
+            "class_ids": ["uuid1", "uuid2"]  // 可选，默认全部未分配教室的记录
+        }
+
+    Response:
+        {
+            "success": true,
+            "data": {
+                "assigned": {"class_id": "room_id"},
+                "unassigned": ["class_id"]
+            }
+        }
+    """
+    data = request.json or {}
+    class_ids = data.get('class_ids')
+
+    if class_ids is not None and not isinstance(class_ids, list):
+        return error_response("class_ids 必须是数组")
+    if not len(room_registry):
+        return error_response("尚未登记教室")
+
+    with store_lock:
+        assignments, unassigned = assign_unroomed_classes(class_ids)
+
+    return success_response({
+        "assigned": assignments,
+        "unassigned": unassigned
+    }, f"已分配{len(assignments)}节课程，{len(unassigned)}节未能分配")
+
+
+# =====================================================
+# 排课沙盒API
+# =====================================================
+
+# 沙盒内可执行的排课操作
+SANDBOX_ACTIONS = {
+    'arrange-single': arrange_single_class,
+    'arrange-with-faculty-check': arrange_with_faculty_check,
+    'generate-with-faculty': generate_schedule_with_faculty,
+    'generate-parallel': generate_schedule_parallel,
+    'pack-groups': pack_group_classes,
+    'assign-rooms': assign_rooms_to_classes,
+    'optimize': optimize_schedule
+}
+
+
+@sandbox_bp.route('', methods=['POST'])
+def create_sandbox():
+    """
+    创建排课沙盒（在线排课的写时复制叠加层，创建开销与排课记录数无关）
+
+    Response:
+        {
+            "success": true,
+            "data": {"sandbox_id": "uuid"}
+        }
+    """
+    sandbox_id = str(uuid.uuid4())
+    with store_lock:
+        sandboxes_db[sandbox_id] = {
+            "overlay": ScheduleOverlay(schedule_db),
+            "created_at": datetime.now().isoformat()
+        }
+    return success_response({"sandbox_id": sandbox_id}, "沙盒已创建", 201)
+
+
+@sandbox_bp.route('', methods=['GET'])
+def list_sandboxes():
+    """获取沙盒列表及各自的变更数"""
+    return success_response([
+        {
+            "sandbox_id": sandbox_id,
+            "created_at": sandbox['created_at'],
+            "added": len(sandbox['overlay'].added),
+            "removed": len(sandbox['overlay'].removed)
+        }
+        for sandbox_id, sandbox in sandboxes_db.items()
+    ], "获取沙盒列表成功")
+
+
+@sandbox_bp.route('/<sandbox_id>/schedule/<action>', methods=['POST'])
+def run_sandbox_action(sandbox_id: str, action: str):
+    """
+    在沙盒中执行排课操作，请求体与对应的在线接口一致
+
+    action: arrange-single | arrange-with-faculty-check | generate-with-faculty | generate-parallel |
+            pack-groups | assign-rooms | optimize
+    """
+    sandbox = sandboxes_db.get(sandbox_id)
+    if not sandbox:
+        return error_response("沙盒不存在", 404)
+    view = SANDBOX_ACTIONS.get(action)
+    if view is None:
+        return error_response(f"不支持的沙盒操作: {action}", 404)
+
+    with store_lock:
+        g.schedule_overlay = sandbox['overlay']
+        try:
+            return view()
+        finally:
+            g.schedule_overlay = None
+
+
+@sandbox_bp.route('/<sandbox_id>/diff', methods=['GET'])
+def get_sandbox_diff(sandbox_id: str):
+    """
+    获取沙盒相对在线排课的变更
+
+    Response:
+        {
+            "success": true,
+            "data": {
+                "added": [...],
+                "removed": [...],
+                "modified": [{"before": {...}, "after": {...}}],
+                "conflicts": []
+            }
+        }
+    """
+    sandbox = sandboxes_db.get(sandbox_id)
+    if not sandbox:
+        return error_response("沙盒不存在", 404)
+
+    with store_lock:
+        diff = sandbox['overlay'].diff()
+        diff['conflicts'] = sandbox['overlay'].conflicts()
+    return success_response(diff, "获取沙盒变更成功")
+
+
+@sandbox_bp.route('/<sandbox_id>/commit', methods=['POST'])
+def commit_sandbox(sandbox_id: str):
+    """
+    提交沙盒：无冲突时一次性写回在线排课并关闭沙盒，有冲突时不写入任何变更
+    """
+    with store_lock:
+        sandbox = sandboxes_db.get(sandbox_id)
+        if not sandbox:
+            return error_response("沙盒不存在", 404)
+
+        conflicts = sandbox['overlay'].conflicts()
+        if conflicts:
+            return error_response("沙盒与在线排课存在冲突，未提交任何变更", 409, conflicts)
+
+        result = sandbox['overlay'].commit()
+        del sandboxes_db[sandbox_id]
+
+    return success_response(result, f"沙盒已提交，新增{result['added']}条，移除{result['removed']}条")
+
+
+@sandbox_bp.route('/<sandbox_id>', methods=['DELETE'])
+def discard_sandbox(sandbox_id: str):
+    """丢弃沙盒及其全部变更"""
+    with store_lock:
+        if sandboxes_db.pop(sandbox_id, None) is None:
+            return error_response("沙盒不存在", 404)
+    return success_response(None, "沙盒已丢弃")
+
+
+# =====================================================
+# 后台任务API
+# =====================================================
+
+# 可在后台执行的操作：任务类型 -> (接口函数, 是否在沙盒中运行后提交)
+# 排课类任务在沙盒中运行，取消或失败时不会留下部分写入的排课
+JOB_ACTIONS = {
+    'generate-with-faculty': (generate_schedule_with_faculty, True),
+    'generate-parallel': (generate_schedule_parallel, True),
+    'pack-groups': (pack_group_classes, True),
+    'optimize': (optimize_schedule, True),
+    'assign-rooms': (assign_rooms_to_classes, True),
+    'qualification-bulk': (bulk_update_teacher_qualifications, False),
+    'blocked-time-bulk-load': (bulk_load_blocked_times, False),
+    'rooms-bulk-load': (bulk_load_rooms, False)
+}
+
+
+def run_job(app, job):
+    """
+    在工作线程中执行任务：以任务参数作为请求体调用对应接口
+
+    任务接口只读取 request.json 并通过 g 取得沙盒叠加层，test_request_context 提供的
+    请求上下文与在线请求一致（g 按上下文隔离，各任务互不影响），不经过 WSGI 与
+    before_request 钩子；任务队列在预热完成后才启动，无需预热等待。新增任务类型的接口
+    若依赖请求头、查询参数或钩子，应先将接口主体拆为接收参数字典的函数
+    """
+    view, in_sandbox = JOB_ACTIONS[job.kind]
+    if job.committed:
+        # 提交后、结束状态写入前中断的任务：变更已在在线数据中，不再重复执行
+        return job.result
+    with app.test_request_context(method='POST', json=job.payload):
+        overlay = ScheduleOverlay(schedule_db) if in_sandbox else None
+        g.schedule_overlay = overlay
+        response, _ = view()
+        body = response.get_json()
+        if not body['success']:
+            raise JobFailed(body['message'])
+
+        if overlay is not None:
+            with store_lock:
+                checkpoint(job.progress['total'], job.progress['total'])
+                conflicts = overlay.conflicts()
+                if conflicts:
+                    raise JobFailed(f"与在线排课冲突：{conflicts[0]}")
+                body['data'] = dict(body['data'] or {}, committed=overlay.commit())
+                job_queue.mark_committed(job, body['data'])
+        return body['data']
+
+
+@job_bp.route('', methods=['POST'])
+def submit_job():
+    """
+    提交后台任务，立即返回任务ID
+
+    Request Body:
+        {
+            "kind": "generate-with-faculty",
+            "payload": {...}  // 与对应在线接口的请求体相同
+        }
+
+    Response (202):
+        {
+            "success": true,
+            "data": {"job_id": "uuid", "kind": "...", "status": "queued", "progress": {...}}
+        }
+    """
+    data = request.json or {}
+    kind = data.get('kind')
+    payload = data.get('payload') or {}
+    if kind not in JOB_ACTIONS:
+        return error_response(f"不支持的任务类型: {kind}，可选: {', '.join(JOB_ACTIONS)}")
+    if not isinstance(payload, dict):
+        return error_response("payload 必须是对象")
+
+    job = job_queue.submit(kind, payload)
+    return success_response(job.to_dict(include_result=False), "任务已提交", 202)
+
+
+@job_bp.route('', methods=['GET'])
+def list_jobs():
+    """获取任务列表（不含结果），可按 status 过滤"""
+    status = request.args.get('status')
+    if status and status not in JOB_STATUSES:
+        return error_response(f"status 必须为 {', '.join(JOB_STATUSES)} 之一")
+    return success_response(
+        [job.to_dict(include_result=False) for job in job_queue.jobs(status)],
+        "获取任务列表成功"
+    )
+
+
+@job_bp.route('/<job_id>', methods=['GET'])
+def get_job(job_id: str):
+    """获取任务状态、进度与结果"""
+    job = job_queue.get(job_id)
+    if not job:
+        return error_response("任务不存在", 404)
+    return success_response(job.to_dict(), "获取任务成功")
+
+
+@job_bp.route('/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id: str):
+    """取消任务：排队中的任务立即取消，执行中的任务在下一个进度检查点停止"""
+    job = job_queue.cancel(job_id)
+    if not job:
+        return error_response("任务不存在", 404)
+    return success_response(job.to_dict(include_result=False), "已请求取消任务")
+
+
+# =====================================================
+# 变更推送API
+# =====================================================
+
+def change_filters():
+    """变更查询参数：since 序号与 faculty_code / teacher_id 过滤"""
+    since = request.args.get('since', type=int)
+    if since is None:
+        since = request.headers.get('Last-Event-ID', 0, type=int)
+    return max(since, 0), request.args.get('faculty_code'), request.args.get('teacher_id')
+
+
+@changes_bp.route('', methods=['GET'])
+def list_changes():
+    """
+    拉取指定序号之后的变更事件
+
+    Query Parameters:
+        - since (int): 上次获得的 cursor，首次可用 0
+        - faculty_code / teacher_id: 可选过滤
+        - limit (int): 最多返回的事件数，默认 1000
+
+    Response:
+        {
+            "success": true,
+            "data": {
+                "events": [{"seq", "entity", "op", "id", "faculty_codes", "teacher_ids", "data", "ts"}],
+                "cursor": 128,
+                "complete": true  // false 表示部分事件已被覆盖，需重新拉取全量数据
+            }
+        }
+    """
+    since, faculty_code, teacher_id = change_filters()
+    limit = min(request.args.get('limit', 1000, type=int), change_feed.capacity)
+    events, complete, cursor = change_feed.since(since, faculty_code, teacher_id, limit)
+    return success_response({
+        "events": events,
+        "cursor": cursor,
+        "complete": complete
+    }, f"获取{len(events)}条变更")
+
+
+@changes_bp.route('/stream', methods=['GET'])
+def stream_changes():
+    """
+    通过 Server-Sent Events 订阅变更（参数同 GET /api/changes，断线重连时使用 Last-Event-ID 续传）
+
+    每个事件以 event: change 发送，id 为事件序号；部分事件已被覆盖时先发送 event: reset
+    """
+    since, faculty_code, teacher_id = change_filters()
+
+    def generate():
+        cursor = since
+        while True:
+            events, complete, cursor_next = change_feed.since(cursor, faculty_code, teacher_id)
+            if not complete:
+                yield f"event: reset\ndata: {json.dumps({'cursor': cursor_next})}\n\n"
+            for event in events:
+                yield f"id: {event['seq']}\nevent: change\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            cursor = cursor_next
+            if not change_feed.wait(cursor, CHANGE_STREAM_KEEPALIVE):
+                yield ": keepalive\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+# =====================================================
+# 增量同步API
+# =====================================================
+
+# 单次同步最多返回的变更数
+MAX_SYNC_CHANGES = 5000
+
+
+@sync_bp.route('', methods=['GET'])
+def sync_changes():
+    """
+    增量同步：返回指定版本之后的新增、更新与删除（每个键只返回最新状态）
+
+    Query Parameters:
+        - since (int): 上次同步返回的 version，首次为 0
+        - limit (int): 最多返回的变更数，默认 5000；结果被截断时 has_more 为 true
+
+    Response:
+        {
+            "success": true,
+            "data": {
+                "version": 1024,
+                "reset": false,  // true 表示 since 早于日志下限，返回全部现存数据，客户端应整体替换
+                "has_more": false,
+                "changes": {
+                    "teachers": {"upserts": {"id": {...}}, "deletes": ["id"]},
+                    "courses": {...},
+                    "schedule": {...},
+                    "teacher_instruments": {...}
+                }
+            }
+        }
+    """
+    since = request.args.get('since', 0, type=int)
+    limit = min(request.args.get('limit', MAX_SYNC_CHANGES, type=int), MAX_SYNC_CHANGES)
+
+    with store_lock:
+        entries, reset, version = sync_log.changes_since(since, limit + 1)
+        has_more = len(entries) > limit
+        if has_more:
+            entries = entries[:limit]
+            version = entries[-1][2]
+
+        changes = {
+            name: {"upserts": {}, "deletes": []}
+            for name in ('teachers', 'courses', 'schedule', 'teacher_instruments')
+        }
+        for collection, key, _, deleted in entries:
+            value = None if deleted else sync_value(collection, key)
+            if value is None:
+                changes[collection]['deletes'].append(key)
+            else:
+                changes[collection]['upserts'][key] = value
+
+    return success_response({
+        "version": version,
+        "reset": reset,
+        "has_more": has_more,
+        "changes": changes
+    }, f"同步{len(entries)}项变更")
+
+
+# =====================================================
+# 配置热更新API
+# =====================================================
+
+# 同一时间只进行一次配置替换
+config_update_lock = threading.Lock()
+config_status = {"rebuilding": False, "error": None}
+
+
+def config_reference_errors(registry: FacultyRegistry) -> List[Dict]:
+    """新配置中缺少已有数据引用的乐器或教研室时返回错误（每个乐器/教研室一条）"""
+    instruments, faculties = {}, {}
+    for qualifications in teacher_instruments_db.values():
+        for instrument_name in qualifications:
+            if not registry.has_instrument(instrument_name):
+                instruments[instrument_name] = instruments.get(instrument_name, 0) + 1
+    for teacher in teachers_db.values():
+        code = teacher.get('faculty_code')
+        if code and registry.faculty_id(code) is None:
+            faculties[code] = faculties.get(code, 0) + 1
+
+    errors = [
+        {"field": f"instruments.{name}", "message": f"仍有 {count} 条该乐器的教学资格，不能删除"}
+        for name, count in instruments.items()
+    ]
+    errors.extend(
+        {"field": "faculties", "message": f"仍有 {count} 名教师属于教研室 {code}，不能删除"}
+        for code, count in faculties.items()
+    )
+    return errors
+
+
+def rebuild_config_indexes(registry: FacultyRegistry, persist: bool):
+    """
+    后台替换配置：在写锁内按新配置生成资格矩阵，再将注册表与矩阵作为一个配置对象一次替换
+
+    读取方不加锁，替换过程中读到的是完整的旧配置或新配置；写入方（授予资格等）在替换期间短暂等待
+    """
+    try:
+        with store_lock:
+            # 提交校验之后的写入可能引用了被删除的乐器，替换前再检查一次
+            errors = config_reference_errors(registry)
+            if errors:
+                raise ConfigError(errors)
+            matrix = current_qualifications().reconfigured(registry.instrument_faculty_codes())
+            install_registry(registry, matrix)
+        if persist:
+            save_config_file(CONFIG_FILE, registry.to_config())
+    except ConfigError as e:
+        config_status['error'] = {"message": str(e), "errors": e.errors}
+    except Exception as e:
+        config_status['error'] = {"message": f"{type(e).__name__}: {e}", "errors": []}
+    finally:
+        config_status['rebuilding'] = False
+        config_update_lock.release()
+
+
+def submit_config(config: Dict, persist: bool):
+    """校验新配置并提交后台替换，返回 (响应, 状态码)"""
+    if not config_update_lock.acquire(blocking=False):
+        return error_response("配置正在更新，请稍后重试", 409)
+    try:
+        registry = FacultyRegistry.from_config(config, current_registry().version + 1)
+        with store_lock:
+            errors = config_reference_errors(registry)
+        if errors:
+            raise ConfigError(errors)
+    except ConfigError as e:
+        config_update_lock.release()
+        return error_response(str(e), 400, e.errors)
+
+    config_status.update(rebuilding=True, error=None)
+    threading.Thread(
+        target=rebuild_config_indexes, args=(registry, persist), name='config-rebuild', daemon=True
+    ).start()
+    return success_response({
+        "version": registry.version,
+        "faculties": len(registry.faculty_codes),
+        "instruments": len(registry.instrument_names)
+    }, "配置已校验，正在后台替换", 202)
+
+
+@config_bp.route('', methods=['GET'])
+def get_config():
+    """
+    获取当前教研室与乐器配置
+
+    Response:
+        {"version": 2, "rebuilding": false, "error": null, "config": {"faculties": {...}, "instruments": {...}}}
+    """
+    registry = current_registry()
+    return success_response({
+        "version": registry.version,
+        "rebuilding": config_status['rebuilding'],
+        "error": config_status['error'],
+        "config": registry.to_config()
+    }, "获取配置成功")
+
+
+@config_bp.route('', methods=['PUT'])
+def update_config():
+    """
+    替换教研室与乐器配置（校验通过后在后台替换，并写入配置文件）
+
+    Request Body:
+        {"faculties": {"钢琴专业": {"code": "PIANO", "description": "..."}},
+         "instruments": {"二胡": {"faculty": "器乐专业", "max_students": 8, "duration_coefficient": 0.5}},
+         "default_duration_coefficient": 0.5}
+    """
+    return submit_config(request.json or {}, persist=True)
+
+
+@config_bp.route('/reload', methods=['POST'])
+def reload_config():
+    """从配置文件重新加载配置"""
+    try:
+        config = load_config_file(CONFIG_FILE)
+    except (OSError, ValueError) as e:
+        return error_response(f"配置文件读取失败: {e}", 400)
+    if config is None:
+        return error_response("配置文件不存在", 404)
+    return submit_config(config, persist=False)
+
+
+# =====================================================
+# 持久化（预写日志与快照）
+# =====================================================
+
+PERSISTED_DICTS = ('teachers', 'courses', 'teacher_instruments')
+
+# 只写预写日志与快照、不进入同步日志的集合
+LOCAL_COLLECTIONS = ('rooms', 'blocked_terms', 'blocked_times')
+
+
+def persisted_dict(collection: str) -> Dict:
+    return {'teachers': teachers_db, 'courses': courses_db, 'teacher_instruments': teacher_instruments_db}[collection]
+
+
+def restore_local_write(collection: str, key, value):
+    """重放一条教室或禁排写入"""
+    if collection == 'rooms':
+        if value is None:
+            room_registry.remove(key)
+        else:
+            room_registry.upsert(value)
+    elif collection == 'blocked_terms':
+        blocked_time_calendar.set_term(
+            value['academic_year'], value['semester_label'], value['start_date'], value['total_weeks']
+        )
+    elif value is None:
+        blocked_time_calendar.remove_block(key)
+    else:
+        blocked_time_calendar.restore_block(value)
+
+
+def capture_state():
+    """
+    快照截面（在持久化写锁内调用）：同步日志、小型字典、教室与禁排在锁内复制，
+    排课记录在锁外按同步日志顺序导出为整数列；截面之后的写入在新日志段中重放
+    """
+    entries = sync_log.export()
+    stores = pickle.dumps({name: dict(persisted_dict(name)) for name in PERSISTED_DICTS})
+    local = [
+        ('rooms', 'pickle', pickle.dumps(room_registry.rooms())),
+        ('blocked_terms', 'pickle', pickle.dumps(blocked_time_calendar.terms())),
+        ('blocked_times', 'pickle', pickle.dumps(blocked_time_calendar.export_blocks()))
+    ]
+    meta = {"sync_version": sync_log.version, "sync_floor": sync_log.floor}
+
+    def build():
+        ids, versions, records, others = [], [], [], []
+        for entry in entries:
+            collection, key, version, deleted = entry
+            if collection == 'schedule' and not deleted:
+                record = schedule_db.get(key)
+                if record is not None:
+                    ids.append(key)
+                    versions.append(version)
+                    records.append(record)
+            else:
+                others.append(entry)
+        exported = set(ids)
+        groups = {key: members for key, members in schedule_db.group_rows().items() if key in exported}
+        # 驻留表只追加，在导出记录之后复制即可覆盖全部编号
+        interned = {name: list(getattr(schedule_db, name).values()) for name in ScheduleStore.INTERNER_NAMES}
+
+        sections = [
+            ('stores', 'pickle', stores),
+            ('sync_entries', 'pickle', pickle.dumps(others)),
+            ('interned', 'pickle', pickle.dumps(interned)),
+            ('schedule_ids', 'utf8', '\n'.join(ids).encode('utf-8')),
+            ('schedule_versions', 'q', int_column('q', versions)),
+            ('schedule_groups', 'pickle', pickle.dumps(groups))
+        ] + local
+        for field in ScheduleStore.SNAPSHOT_FIELDS:
+            sections.append((field, 'q', int_column('q', map(attrgetter(field), records))))
+        return meta, sections
+
+    return build
+
+
+def restore_state():
+    """启动时从快照与预写日志恢复存储、教室、禁排、同步日志与资格矩阵（不重复写入日志）"""
+    if persistence.enabled:
+        return
+    snapshot, wal_entries = persistence.load()
+    listener = schedule_db.listener
+    schedule_db.listener = None
+    try:
+        sync_entries = []
+        version = floor = 0
+        if snapshot is not None:
+            stores = snapshot['stores']
+            for name in PERSISTED_DICTS:
+                dict.update(persisted_dict(name), stores[name])
+            schedule_db.load_rows(
+                snapshot['interned'], snapshot['schedule_ids'],
+                {field: snapshot[field] for field in ScheduleStore.SNAPSHOT_FIELDS},
+                snapshot.get('schedule_groups')
+            )
+            schedule_entries = (
+                ('schedule', key, entry_version, False)
+                for key, entry_version in zip(snapshot['schedule_ids'], snapshot['schedule_versions'])
+            )
+            sync_entries = list(heapq.merge(snapshot['sync_entries'], schedule_entries, key=itemgetter(2)))
+            version, floor = snapshot['meta']['sync_version'], snapshot['meta']['sync_floor']
+            for term in snapshot.get('blocked_terms', []):
+                restore_local_write('blocked_terms', None, term)
+            for block in snapshot.get('blocked_times', []):
+                restore_local_write('blocked_times', block['id'], block)
+            for room in snapshot.get('rooms', []):
+                restore_local_write('rooms', room['id'], room)
+
+        # 重放快照之后的写入（按键覆盖，与快照重叠的部分结果不变）
+        for entry_version, collection, key, value in wal_entries:
+            if collection in LOCAL_COLLECTIONS:
+                restore_local_write(collection, key, value)
+                continue
+            if collection == 'schedule':
+                if value is None:
+                    schedule_db.remove(key)
+                else:
+                    schedule_db.insert(value)
+            elif value is None:
+                dict.pop(persisted_dict(collection), key, None)
+            else:
+                dict.__setitem__(persisted_dict(collection), key, value)
+            sync_entries.append((collection, key, entry_version, value is None))
+        sync_log.restore(sync_entries, version, floor)
+    finally:
+        schedule_db.listener = listener
+
+    for teacher_id, teacher in teachers_db.items():
+        sync_teacher_faculty(teacher_id, teacher)
+    # 配置文件在停机期间删除了乐器时，该乐器的资格不进入矩阵（记录保留，下次提交配置时作为引用错误报告）
+    matrix = current_qualifications()
+    for teacher_id, qualifications in teacher_instruments_db.items():
+        for instrument_name, qualification in qualifications.items():
+            if instrument_name in matrix.instrument_ids:
+                matrix.grant(teacher_id, instrument_name, qualification.get('proficiency_level', 'secondary'))
+
+    persistence.enable()
+    persistence.start(capture_state)
+
+
+
+# =====================================================
+# 启动预热
+# =====================================================
+
+# 不依赖排课与教师数据的配置类接口，预热完成前即可响应
+WARMUP_EXEMPT_ENDPOINTS = {
+    'faculty.list_faculties',  # include_stats=true 时在接口内等待预热
+    'faculty.get_faculty_instruments',
+    'blocked_time.list_blocked_time_terms',
+    'teacher_management.get_faculties',
+    'teacher_management.get_instruments',
+    'teacher_management.get_instrument_max_students',
+    'config.get_config',
+    'health',
+    'static'
+}
+
+
+def warming_up_response():
+    response, status = error_response("服务正在启动，请稍后重试", 503)
+    response.headers['Retry-After'] = '5'
+    return response, status
+
+
+def wait_for_warm_up():
+    """请求前钩子：数据接口等待预热完成"""
+    if request.endpoint in WARMUP_EXEMPT_ENDPOINTS or warm_up_done.is_set():
+        return None
+    if not warm_up_done.wait(WARMUP_WAIT):
+        return warming_up_response()
+    return None
+
+
+def warm_up(app):
+    """
+    启动预热：挂载列式镜像（首次加载 NumPy 列存模块）、从快照与预写日志恢复数据、启动任务队列
+
+    各阶段耗时记入 startup_timings（秒）
+    """
+    started = time.perf_counter()
+    try:
+        if COLUMNAR_STORE_ENABLED and schedule_db.columns is None:
+            from schedule_columns import ScheduleColumns
+            schedule_db.attach_columns(ScheduleColumns())
+        startup_timings['columns'] = time.perf_counter() - started
+
+        if PERSISTENCE_ENABLED:
+            restore_state()
+        startup_timings['restore'] = time.perf_counter() - started - startup_timings['columns']
+
+        job_queue.start(lambda job: run_job(app, job))
+    finally:
+        startup_timings['warm_up'] = time.perf_counter() - started
+        warm_up_done.set()
+
+
+def register_api_routes(app, warm_up_async: bool = True):
+    """
+    注册所有API蓝图、挂载共享状态并启动预热
+
+    Args:
+        warm_up_async: 为 True 时预热在后台线程中执行，应用立即可以响应配置类接口；
+                       为 False 时在返回前完成预热（脚本与测试使用）
+    """
+    app.register_blueprint(faculty_bp)
+    app.register_blueprint(teacher_bp)
+    app.register_blueprint(schedule_bp)
+    app.register_blueprint(blocked_time_bp)
+    app.register_blueprint(room_bp)
+    app.register_blueprint(sandbox_bp)
+    app.register_blueprint(job_bp)
+    app.register_blueprint(changes_bp)
+    app.register_blueprint(sync_bp)
+    app.register_blueprint(config_bp)
+    scheduler_state.init_app(app)
+    app.before_request(wait_for_warm_up)
+
+    global warm_up_started
+    if warm_up_started:
+        return
+    warm_up_started = True
+    if warm_up_async:
+        threading.Thread(target=warm_up, args=(app,), name='warm-up', daemon=True).start()
+    else:
+        warm_up(app)
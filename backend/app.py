@@ -0,0 +1,50 @@
+"""
+音乐学校课程排课系统 - 应用入口
+create_app() 创建 Flask 应用并注册全部 API 蓝图（教研室管理与教师管理接口共用同一份共享状态）；
+数据恢复等耗时的预热在后台线程中执行，应用创建后立即可以响应配置类接口与健康检查
+"""
+
+import os
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, jsonify  # noqa: E402
+from flask_cors import CORS  # noqa: E402
+
+from api import register_api_routes  # noqa: E402
+from api.faculty_api import warm_up_done, startup_timings  # noqa: E402
+from teacher_management import teacher_management_bp  # noqa: E402
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+
+def create_app(warm_up_async: bool = True) -> Flask:
+    """
+    创建应用
+
+    Args:
+        warm_up_async: 为 False 时在返回前完成数据恢复（脚本与测试使用）
+    """
+    app = Flask(__name__)
+    CORS(app)
+    startup_timings['import'] = IMPORT_SECONDS
+
+    @app.route('/api/health', methods=['GET'])
+    def health():
+        """健康检查：ready 表示预热已完成，startup 为各启动阶段耗时（秒）"""
+        return jsonify({
+            "status": "ok",
+            "ready": warm_up_done.is_set(),
+            "startup": {name: round(seconds, 4) for name, seconds in startup_timings.items()}
+        })
+
+    app.register_blueprint(teacher_management_bp)
+    register_api_routes(app, warm_up_async)
+    return app
+
+
+if __name__ == '__main__':
+    # 支持Render等云平台的端口配置
+    port = int(os.environ.get('PORT', 5000))
+    create_app().run(debug=False, host='0.0.0.0', port=port)
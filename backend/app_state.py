@@ -0,0 +1,52 @@
+"""
+进程内共享状态
+教研室管理接口（api.faculty_api）与教师管理接口（teacher_management）共用同一份教师、课程、
+排课存储与资格矩阵；状态由 faculty_api 创建，create_app() 挂载到 app.extensions 后注入各蓝图
+"""
+
+from typing import Callable, Dict
+
+from flask import current_app
+
+from faculty_registry import current_config
+
+STATE_EXTENSION = 'scheduler_state'
+
+
+class SchedulerState:
+    """
+    共享状态容器
+
+    - teachers / courses / teacher_instruments: 记入同步日志与预写日志的字典存储
+    - schedule: 排课记录存储（ScheduleStore）
+    - qualifications: 教师资格矩阵（教研室按代码比较；随配置整体替换，每次读取当前配置中的矩阵）
+    - lock: 存储写锁，批量写入在锁内完成
+    - register_teacher(teacher_id, teacher): 写入教师并同步资格矩阵、生成变更事件
+    - grant_qualification(teacher_id, teacher, instrument_name, proficiency_level): 授予教学资格
+    """
+
+    __slots__ = ('teachers', 'courses', 'teacher_instruments', 'schedule', 'lock',
+                 'register_teacher', 'grant_qualification')
+
+    def __init__(self, teachers: Dict, courses: Dict, teacher_instruments: Dict, schedule,
+                 lock, register_teacher: Callable[[str, Dict], None],
+                 grant_qualification: Callable[[str, Dict, str, str], Dict]):
+        self.teachers = teachers
+        self.courses = courses
+        self.teacher_instruments = teacher_instruments
+        self.schedule = schedule
+        self.lock = lock
+        self.register_teacher = register_teacher
+        self.grant_qualification = grant_qualification
+
+    @property
+    def qualifications(self):
+        return current_config().qualifications
+
+    def init_app(self, app):
+        app.extensions[STATE_EXTENSION] = self
+
+
+def get_state() -> SchedulerState:
+    """当前应用挂载的共享状态"""
+    return current_app.extensions[STATE_EXTENSION]
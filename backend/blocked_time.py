@@ -0,0 +1,400 @@
+"""
+禁排时间日历
+按 (学年, 学期) 分区保存基础禁排、优先级禁排与教师禁排，
+每个作用对象按周次保存 星期×节次 位图，排课时按日期定位学期与周次后 O(log n) 判断
+"""
+
+import bisect
+import uuid
+from datetime import date as date_cls, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+BLOCK_KINDS = ('base', 'priority', 'teacher')
+PRIORITY_LEVELS = ('high', 'medium', 'low')
+ENTITY_SCOPES = ('teacher', 'room', 'student')
+
+MAX_PERIODS = 16       # 每日节次位数（位图中每天占 16 位）
+ALL_WEEKS = 0          # 周次 0 表示每周循环
+SCHOOL_SCOPE = 'school'
+
+TermKey = Tuple[str, str]
+
+
+def _bit(day_of_week: int, period: int) -> int:
+    return 1 << ((day_of_week - 1) * MAX_PERIODS + (period - 1))
+
+
+def week_start(value: str) -> date_cls:
+    """日期所在周的周一"""
+    day = date_cls.fromisoformat(value)
+    return day - timedelta(days=day.isoweekday() - 1)
+
+
+def date_for_weekday(start_date: str, day_of_week: int) -> str:
+    """start_date 所在周中星期 day_of_week 对应的日期"""
+    return (week_start(start_date) + timedelta(days=day_of_week - 1)).isoformat()
+
+
+class BlockedTimeError(ValueError):
+    """禁排时间数据不合法"""
+
+
+class BulkLoadError(BlockedTimeError):
+    """批量加载中存在不合法的禁排记录"""
+
+    def __init__(self, errors: List[Dict]):
+        super().__init__("禁排数据校验失败")
+        self.errors = errors
+
+
+class BlockedTimeCalendar:
+    """
+    禁排时间日历
+
+    - terms: 学期周次配置（学期开始日期即第1周开始日期）
+    - 每个学期下按作用对象（全校 / teacher:ID / room:ID / student:ID）保存 周次 -> 位图，
+      周次 0 为每周循环的禁排
+    - 原始禁排记录单独保存，用于列表展示、给出禁排原因与删除后重建位图
+    """
+
+    def __init__(self):
+        self._terms: Dict[TermKey, Dict] = {}
+        self._term_starts: List[int] = []       # 按开始日期排序的学期开始日期序数
+        self._term_keys: List[TermKey] = []     # 与 _term_starts 对应的学期
+        self._blocks: Dict[str, Dict] = {}
+        self._scope_blocks: Dict[Tuple[TermKey, str], Dict[str, None]] = {}
+        self._masks: Dict[TermKey, Dict[str, Dict[int, int]]] = {}
+        # 可选的写入监听：listener('term' | 'block', 键, 学期或规范化的禁排记录（删除时为 None）)
+        self.listener = None
+
+    def attach_listener(self, listener):
+        """挂载写入监听（持久化），学期登记、禁排写入与删除逐条通知"""
+        self.listener = listener
+
+    # -------------------------------------------------
+    # 学期配置
+    # -------------------------------------------------
+
+    def set_term(self, academic_year: str, semester_label: str, start_date: str, total_weeks: int = 16) -> Dict:
+        """登记学期周次配置"""
+        try:
+            start = date_cls.fromisoformat(start_date)
+        except (TypeError, ValueError):
+            raise BlockedTimeError("学期开始日期格式错误，应为 YYYY-MM-DD")
+        if int(total_weeks) <= 0:
+            raise BlockedTimeError("学期总周数必须大于0")
+
+        key = (str(academic_year), str(semester_label))
+        term = {
+            "academic_year": key[0],
+            "semester_label": key[1],
+            "start_date": start.isoformat(),
+            "total_weeks": int(total_weeks)
+        }
+        self._terms[key] = term
+        ordered = sorted(
+            (date_cls.fromisoformat(t['start_date']).toordinal(), k)
+            for k, t in self._terms.items()
+        )
+        self._term_starts = [start for start, _ in ordered]
+        self._term_keys = [k for _, k in ordered]
+        if self.listener is not None:
+            self.listener('term', key, term)
+        return term
+
+    def terms(self) -> List[Dict]:
+        return [self._terms[key] for key in self._term_keys]
+
+    def locate(self, value: str) -> Optional[Tuple[TermKey, int]]:
+        """日期 -> (学期, 周次)；不在任何已登记学期内时返回 None"""
+        ordinal = date_cls.fromisoformat(value).toordinal()
+        index = bisect.bisect_right(self._term_starts, ordinal) - 1
+        if index < 0:
+            return None
+        key = self._term_keys[index]
+        week = (ordinal - self._term_starts[index]) // 7 + 1
+        if week > self._terms[key]['total_weeks']:
+            return None
+        return key, week
+
+    def current_term(self) -> Optional[TermKey]:
+        located = self.locate(datetime.now().strftime('%Y-%m-%d'))
+        return located[0] if located else None
+
+    # -------------------------------------------------
+    # 禁排维护
+    # -------------------------------------------------
+
+    def add_block(self, block: Dict) -> Dict:
+        """添加单条禁排，返回规范化后的记录"""
+        normalized = self.normalize(block)
+        self._store(normalized)
+        return normalized
+
+    def bulk_load(self, blocks: List[Dict], replace: bool = False) -> List[Dict]:
+        """
+        批量加载禁排：全部校验通过后才写入
+
+        Args:
+            blocks: 禁排记录列表
+            replace: 是否先清空所涉及学期的同类禁排
+        """
+        normalized = []
+        errors = []
+        for index, block in enumerate(blocks):
+            try:
+                normalized.append(self.normalize(block))
+            except BlockedTimeError as e:
+                errors.append({"index": index, "message": str(e)})
+        if errors:
+            raise BulkLoadError(errors)
+
+        if replace:
+            for term_key, kind in {(b['term'], b['kind']) for b in normalized}:
+                self.clear(term_key[0], term_key[1], kind=kind)
+        for block in normalized:
+            self._store(block)
+        return normalized
+
+    def remove_block(self, block_id: str) -> bool:
+        removed = self._discard(block_id)
+        if removed and self.listener is not None:
+            self.listener('block', block_id, None)
+        return removed
+
+    def _discard(self, block_id: str) -> bool:
+        block = self._blocks.pop(block_id, None)
+        if block is None:
+            return False
+        scope_key = (block['term'], block['scope'])
+        self._scope_blocks.get(scope_key, {}).pop(block_id, None)
+        self._rebuild_scope(*scope_key)
+        return True
+
+    def clear(self, academic_year: str, semester_label: str,
+              kind: Optional[str] = None, teacher_id: Optional[str] = None) -> int:
+        """清空学期禁排，可按类型或教师过滤，返回删除条数"""
+        term_key = (str(academic_year), str(semester_label))
+        scope = f'teacher:{teacher_id}' if teacher_id else None
+        removed = [
+            block_id for block_id, block in self._blocks.items()
+            if block['term'] == term_key
+            and (kind is None or block['kind'] == kind)
+            and (scope is None or block['scope'] == scope)
+        ]
+
+        touched = set()
+        for block_id in removed:
+            block = self._blocks.pop(block_id)
+            scope_key = (term_key, block['scope'])
+            self._scope_blocks.get(scope_key, {}).pop(block_id, None)
+            touched.add(scope_key)
+            if self.listener is not None:
+                self.listener('block', block_id, None)
+        for scope_key in touched:
+            self._rebuild_scope(*scope_key)
+        return len(removed)
+
+    def restore_block(self, block: Dict):
+        """写入已规范化的禁排记录（从快照与预写日志恢复，不重新校验）"""
+        self._store(block)
+
+    def export_blocks(self) -> List[Dict]:
+        """全部规范化的禁排记录（含各周位图），用于快照"""
+        return list(self._blocks.values())
+
+    def _store(self, block: Dict):
+        # 同一ID重复写入时先移除旧记录，旧位图与作用对象登记不能残留
+        if block['id'] in self._blocks:
+            self._discard(block['id'])
+        self._blocks[block['id']] = block
+        self._scope_blocks.setdefault((block['term'], block['scope']), {})[block['id']] = None
+        weeks = self._masks.setdefault(block['term'], {}).setdefault(block['scope'], {})
+        for week, mask in block['_masks'].items():
+            weeks[week] = weeks.get(week, 0) | mask
+        if self.listener is not None:
+            self.listener('block', block['id'], block)
+
+    def _rebuild_scope(self, term_key: TermKey, scope: str):
+        weeks = {}
+        for block_id in self._scope_blocks.get((term_key, scope), {}):
+            for week, mask in self._blocks[block_id]['_masks'].items():
+                weeks[week] = weeks.get(week, 0) | mask
+
+        term_masks = self._masks.setdefault(term_key, {})
+        if weeks:
+            term_masks[scope] = weeks
+        else:
+            term_masks.pop(scope, None)
+            self._scope_blocks.pop((term_key, scope), None)
+
+    @staticmethod
+    def normalize(block: Dict) -> Dict:
+        """校验并规范化禁排记录，预先计算各周位图"""
+        kind = block.get('kind', 'base')
+        if kind not in BLOCK_KINDS:
+            raise BlockedTimeError("kind 必须是 base, priority 或 teacher")
+
+        academic_year = block.get('academic_year')
+        semester_label = block.get('semester_label')
+        if not academic_year or not semester_label:
+            raise BlockedTimeError("缺少学年或学期标签")
+
+        priority = block.get('priority', 'high')
+        if priority not in PRIORITY_LEVELS:
+            raise BlockedTimeError("priority 必须是 high, medium 或 low")
+
+        # 作用对象
+        if kind == 'base':
+            scope = SCHOOL_SCOPE
+        elif kind == 'teacher':
+            if not block.get('teacher_id'):
+                raise BlockedTimeError("教师禁排需要 teacher_id")
+            scope = f"teacher:{block['teacher_id']}"
+        else:
+            entity_type = block.get('entity_type')
+            if entity_type in ENTITY_SCOPES:
+                if not block.get('entity_id'):
+                    raise BlockedTimeError(f"{entity_type} 禁排需要 entity_id")
+                scope = f"{entity_type}:{block['entity_id']}"
+            else:
+                scope = SCHOOL_SCOPE
+
+        # 周次
+        try:
+            if block.get('week_number') is not None:
+                weeks = [int(block['week_number'])]
+            elif block.get('start_week') is not None:
+                start_week = int(block['start_week'])
+                weeks = list(range(start_week, int(block.get('end_week', start_week)) + 1))
+            else:
+                weeks = [ALL_WEEKS]
+
+            days = [int(block['day_of_week'])] if block.get('day_of_week') else list(range(1, 8))
+            start_period = int(block.get('start_period') or 1)
+            end_period = int(block.get('end_period') or MAX_PERIODS)
+        except (TypeError, ValueError):
+            raise BlockedTimeError("周次、星期与节次必须为整数")
+
+        if not weeks or any(week < 0 for week in weeks):
+            raise BlockedTimeError("周次范围不合法")
+        if any(day < 1 or day > 7 for day in days):
+            raise BlockedTimeError("星期必须在 1-7 之间")
+        if not 1 <= start_period <= end_period <= MAX_PERIODS:
+            raise BlockedTimeError(f"节次必须在 1-{MAX_PERIODS} 之间且开始节次不大于结束节次")
+
+        mask = 0
+        for day in days:
+            for period in range(start_period, end_period + 1):
+                mask |= _bit(day, period)
+
+        return {
+            "id": block.get('id') or str(uuid.uuid4()),
+            "kind": kind,
+            "term": (str(academic_year), str(semester_label)),
+            "scope": scope,
+            "priority": priority,
+            "weeks": weeks,
+            "day_of_week": block.get('day_of_week'),
+            "start_period": start_period,
+            "end_period": end_period,
+            "reason": block.get('reason', ''),
+            "created_at": block.get('created_at') or datetime.now().isoformat(),
+            "_masks": {week: mask for week in weeks}
+        }
+
+    # -------------------------------------------------
+    # 查询
+    # -------------------------------------------------
+
+    def find_block(
+        self,
+        period: int,
+        date: Optional[str] = None,
+        day_of_week: Optional[int] = None,
+        teacher_id: Optional[str] = None,
+        room_id: Optional[str] = None,
+        student_id: Optional[str] = None,
+        term: Optional[TermKey] = None
+    ) -> Optional[Dict]:
+        """
+        查找命中指定时段的禁排
+
+        给定日期时按日期所在学期与周次判断（含每周循环禁排）；
+        仅给定星期时判断学期（默认当前学期）的每周循环禁排
+
+        Returns:
+            命中的禁排记录（对外格式），未命中返回 None
+        """
+        if date:
+            located = self.locate(date)
+            if located is None:
+                return None
+            term, week = located
+            day_of_week = date_cls.fromisoformat(date).isoweekday()
+            weeks = (week, ALL_WEEKS)
+        else:
+            term = term or self.current_term()
+            if term is None or not day_of_week:
+                return None
+            weeks = (ALL_WEEKS,)
+
+        term_masks = self._masks.get(term)
+        if not term_masks:
+            return None
+
+        # 超出位图范围的节次或星期不会被任何禁排覆盖（否则位会移入相邻一天或得到负移位）
+        day_of_week, period = int(day_of_week), int(period)
+        if not 1 <= period <= MAX_PERIODS or not 1 <= day_of_week <= 7:
+            return None
+        bit = _bit(day_of_week, period)
+        scopes = [SCHOOL_SCOPE]
+        if teacher_id:
+            scopes.append(f'teacher:{teacher_id}')
+        if room_id:
+            scopes.append(f'room:{room_id}')
+        if student_id:
+            scopes.append(f'student:{student_id}')
+
+        for scope in scopes:
+            scope_weeks = term_masks.get(scope)
+            if not scope_weeks:
+                continue
+            for week in weeks:
+                if scope_weeks.get(week, 0) & bit:
+                    return self._reason_for(term, scope, week, bit)
+        return None
+
+    def _reason_for(self, term: TermKey, scope: str, week: int, bit: int) -> Optional[Dict]:
+        """位图命中后在该作用对象的少量禁排中找出具体记录"""
+        for block_id in self._scope_blocks.get((term, scope), {}):
+            block = self._blocks[block_id]
+            if block['_masks'].get(week, 0) & bit:
+                return self.to_dict(block)
+        return None
+
+    def list_blocks(self, academic_year: Optional[str] = None, semester_label: Optional[str] = None,
+                    kind: Optional[str] = None) -> List[Dict]:
+        return [
+            self.to_dict(block) for block in self._blocks.values()
+            if (academic_year is None or block['term'][0] == str(academic_year))
+            and (semester_label is None or block['term'][1] == str(semester_label))
+            and (kind is None or block['kind'] == kind)
+        ]
+
+    @staticmethod
+    def to_dict(block: Dict) -> Dict:
+        return {
+            "id": block['id'],
+            "kind": block['kind'],
+            "academic_year": block['term'][0],
+            "semester_label": block['term'][1],
+            "scope": block['scope'],
+            "priority": block['priority'],
+            "weeks": block['weeks'],
+            "day_of_week": block['day_of_week'],
+            "start_period": block['start_period'],
+            "end_period": block['end_period'],
+            "reason": block['reason'],
+            "created_at": block['created_at']
+        }
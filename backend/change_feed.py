@@ -0,0 +1,101 @@
+"""
+变更推送
+排课、教学资格与教师数据的每次写入生成一条紧凑事件，按序号写入固定容量的环形缓冲区；
+客户端按序号拉取增量或通过 SSE 订阅，可按教研室或教师过滤
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+CHANGE_ENTITIES = ('schedule', 'qualification', 'teacher')
+CHANGE_OPS = ('upsert', 'delete')
+
+DEFAULT_FEED_CAPACITY = 10000
+
+
+class ChangeFeed:
+    """
+    变更事件环形缓冲区
+
+    - 事件序号从 1 开始单调递增，序号 s 的事件保存在 buffer[s % capacity]
+    - 缓冲区满后覆盖最早的事件；客户端请求的序号早于最早事件（或大于最新序号，即服务已重启）时
+      since() 返回 complete=False，客户端应重新拉取全量数据
+    - publish() 唤醒所有等待中的订阅者
+    """
+
+    def __init__(self, capacity: int = DEFAULT_FEED_CAPACITY):
+        self.capacity = capacity
+        self._buffer: List[Optional[Dict]] = [None] * capacity
+        self._seq = 0
+        self._condition = threading.Condition()
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    @property
+    def first_seq(self) -> int:
+        """缓冲区中最早事件的序号（无事件时为 last_seq + 1）"""
+        return max(1, self._seq - self.capacity + 1)
+
+    def publish(self, entity: str, op: str, key: str, faculty_codes: Iterable[Optional[str]] = (),
+                teacher_ids: Iterable[Optional[str]] = (), data: Optional[Dict] = None) -> Dict:
+        """
+        写入一条事件
+
+        Args:
+            entity: schedule | qualification | teacher
+            op: upsert | delete
+            key: 实体ID（排课ID、教师ID、"教师ID:乐器"）
+            faculty_codes / teacher_ids: 事件涉及的教研室与教师（修改前后不同时均列出），用于订阅过滤
+            data: upsert 时的新数据
+        """
+        with self._condition:
+            self._seq += 1
+            event = {
+                "seq": self._seq,
+                "entity": entity,
+                "op": op,
+                "id": key,
+                "faculty_codes": sorted({code for code in faculty_codes if code}),
+                "teacher_ids": sorted({tid for tid in teacher_ids if tid}),
+                "data": data,
+                "ts": time.time()
+            }
+            self._buffer[self._seq % self.capacity] = event
+            self._condition.notify_all()
+        return event
+
+    def since(self, seq: int, faculty_code: Optional[str] = None, teacher_id: Optional[str] = None,
+              limit: Optional[int] = None) -> Tuple[List[Dict], bool, int]:
+        """
+        序号大于 seq 的事件（按序号升序）
+
+        Returns:
+            (事件列表, complete, cursor)；complete 为 False 表示 seq 之后的部分事件已被覆盖，
+            cursor 为下次拉取时使用的序号（过滤掉的事件也计入）
+        """
+        with self._condition:
+            last = self._seq
+            first = self.first_seq
+            # 请求的序号大于最新序号说明服务已重启，序号重新计数
+            complete = first <= seq + 1 <= last + 1
+            events = []
+            cursor = last
+            for current in range(max(seq + 1, first), last + 1):
+                event = self._buffer[current % self.capacity]
+                if faculty_code and faculty_code not in event['faculty_codes']:
+                    continue
+                if teacher_id and teacher_id not in event['teacher_ids']:
+                    continue
+                events.append(event)
+                if limit is not None and len(events) >= limit:
+                    cursor = current
+                    break
+        return events, complete, cursor
+
+    def wait(self, seq: int, timeout: float) -> bool:
+        """等待序号大于 seq 的事件，超时返回 False"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._seq > seq, timeout)
@@ -0,0 +1,176 @@
+"""
+教研室约束验证器
+验证排课相关的教研室约束（与前端 src/utils/facultyValidation.ts 保持一致）
+"""
+
+from typing import Dict, List, Optional
+
+from faculty_registry import current_registry
+from schedule_store import ScheduleRecord, ScheduleStore, parse_date_ordinal
+from qualification_matrix import (
+    QualificationMatrix,
+    QUAL_FACULTY_MISMATCH,
+    QUAL_NOT_GRANTED,
+    QUAL_UNKNOWN_INSTRUMENT
+)
+
+
+class FacultyConstraintValidator:
+    """教研室约束验证器"""
+
+    # 教师单日总课时上限 / 单个教研室单日课时预警线
+    MAX_DAILY_CLASSES = 10
+    FACULTY_DAILY_WARNING = 8
+
+    def __init__(
+        self,
+        schedule: Optional[ScheduleStore] = None,
+        teachers: Optional[Dict[str, Dict]] = None,
+        qualification_matrix: Optional[QualificationMatrix] = None
+    ):
+        """
+        Args:
+            schedule: 排课记录存储（冲突与工作量检查直接使用其索引）
+            teachers: 教师ID -> 教师信息
+            qualification_matrix: 教师资格矩阵
+        """
+        self.schedule = schedule if schedule is not None else ScheduleStore()
+        self.teachers = teachers or {}
+        self.qualification_matrix = qualification_matrix
+
+    @staticmethod
+    def _split_day(date: str):
+        """将 'YYYY-MM-DD' 或星期数字字符串拆分为 (日期, 星期)"""
+        date = str(date)
+        if date.isdigit():
+            return None, int(date)
+        return date, None
+
+    def validateFacultyConstraints(self, proposal: Dict) -> Dict:
+        """
+        验证教研室相关约束
+
+        Args:
+            proposal: {teacher_id, instrument_type, date, period}
+        """
+        errors = []
+        warnings = []
+
+        # 1. 验证教师是否有资格教授该乐器
+        qualification_result = self.checkTeacherQualification(
+            proposal['teacher_id'], proposal['instrument_type']
+        )
+        if not qualification_result['valid']:
+            errors.append(qualification_result['message'])
+
+        # 2. 验证教师教研室与乐器教研室是否匹配
+        faculty_match_result = self.checkFacultyMatch(
+            proposal['teacher_id'], proposal['instrument_type']
+        )
+        if not faculty_match_result['valid']:
+            errors.append(faculty_match_result['message'])
+
+        # 3. 检查教师是否超负荷
+        daily_load_result = self.checkFacultyDailyLoad(proposal['teacher_id'], proposal['date'])
+        if daily_load_result['warning']:
+            warnings.append(daily_load_result['message'])
+
+        return {
+            'valid': len(errors) == 0,
+            'errors': errors,
+            'warnings': warnings
+        }
+
+    def checkTeacherQualification(self, teacher_id: str, instrument_type: str) -> Dict:
+        """检查教师教学资格"""
+        teacher = self.teachers.get(teacher_id)
+        if not teacher:
+            return {'valid': False, 'message': f'教师ID {teacher_id} 不存在'}
+
+        if self.qualification_matrix is not None:
+            can_teach = not self.qualification_matrix.check(teacher_id, instrument_type) & QUAL_NOT_GRANTED
+        else:
+            can_teach = instrument_type in teacher.get('can_teach_instruments', [])
+
+        if not can_teach:
+            return {
+                'valid': False,
+                'message': f"教师 {teacher.get('full_name', teacher_id)} 未获得 {instrument_type} 的教学资格"
+            }
+
+        return {'valid': True}
+
+    def checkFacultyMatch(self, teacher_id: str, instrument_type: str) -> Dict:
+        """检查教研室匹配"""
+        teacher = self.teachers.get(teacher_id)
+        if not teacher:
+            return {'valid': False, 'message': f'教师ID {teacher_id} 不存在'}
+
+        if self.qualification_matrix is None:
+            return {'valid': True}
+
+        flags = self.qualification_matrix.check(teacher_id, instrument_type)
+        if flags & QUAL_UNKNOWN_INSTRUMENT:
+            return {'valid': False, 'message': f'未知乐器类型: {instrument_type}'}
+
+        if flags & QUAL_FACULTY_MISMATCH:
+            registry = current_registry()
+            faculty_code = teacher.get('faculty_code')
+            return {
+                'valid': False,
+                'message': f"教师属于{registry.faculty_name(faculty_code) or faculty_code or '未知教研室'}，"
+                           f"不能教授{registry.instrument_faculty_name(instrument_type)}的课程"
+            }
+
+        return {'valid': True}
+
+    def checkFacultyDailyLoad(self, teacher_id: str, date: str) -> Dict:
+        """检查教师当日教研室工作量"""
+        daily_schedule = self._teacher_daily_records(teacher_id, date)
+
+        if len(daily_schedule) >= self.MAX_DAILY_CLASSES:
+            return {'warning': True, 'message': f'教师当日已排满{self.MAX_DAILY_CLASSES}节课'}
+
+        for faculty_code, workload in self._count_by_faculty(daily_schedule).items():
+            if workload >= self.FACULTY_DAILY_WARNING:
+                return {
+                    'warning': True,
+                    'message': f'教师当日在{faculty_code}的工作量已达到{workload}节，建议平衡分配'
+                }
+
+        return {'warning': False}
+
+    def getFacultyWorkload(self, teacher_id: str, date: str) -> List[Dict]:
+        """获取教研室工作量统计"""
+        daily_schedule = self._teacher_daily_records(teacher_id, date)
+        return [
+            {'faculty_code': code, 'class_count': count}
+            for code, count in self._count_by_faculty(daily_schedule).items()
+        ]
+
+    def hasTimeConflict(self, teacher_id: str, date: str, period: int) -> bool:
+        """检查特定时间段是否有冲突"""
+        date, day_of_week = self._split_day(date)
+        return self.schedule.is_teacher_busy(teacher_id, period, date, day_of_week)
+
+    def getTeacherDaySchedule(self, teacher_id: str, date: str) -> List[Dict]:
+        """获取教师某日的所有课程"""
+        return [
+            self.schedule.to_dict(record)
+            for record in sorted(self._teacher_daily_records(teacher_id, date), key=lambda r: r.period)
+        ]
+
+    def _teacher_daily_records(self, teacher_id: str, date: str) -> List[ScheduleRecord]:
+        """教师当日课表（仅遍历该教师自己的记录）"""
+        date, day_of_week = self._split_day(date)
+        if date:
+            ordinal = parse_date_ordinal(date)
+            return [r for r in self.schedule.teacher_records(teacher_id) if r.date == ordinal]
+        return [r for r in self.schedule.teacher_records(teacher_id) if r.day_of_week == day_of_week]
+
+    def _count_by_faculty(self, daily_schedule: List[ScheduleRecord]) -> Dict[str, int]:
+        counts = {}
+        for record in daily_schedule:
+            faculty_code = self.schedule.faculties.value(record.faculty) or 'INSTRUMENT'
+            counts[faculty_code] = counts.get(faculty_code, 0) + 1
+        return counts
@@ -0,0 +1,271 @@
+"""
+教研室与乐器注册表
+由配置一次性构建的只读查找表：教研室名称与代码双向映射、乐器 -> 教研室 / 每班人数 / 课时系数，
+教研室与乐器各分配从 0 开始的整数编号；接口通过 current_registry() 以 O(1) 解析名称或代码
+
+配置可从 JSON 文件加载并在运行时替换：新注册表校验通过后整体替换引用（读取方不加锁，
+任一时刻读到的都是完整的旧表或新表）
+"""
+
+import copy
+import json
+import os
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+
+class ConfigError(ValueError):
+    """教研室与乐器配置不合法"""
+
+    def __init__(self, errors: List[Dict]):
+        super().__init__("教研室与乐器配置校验失败")
+        self.errors = errors
+
+
+def _positive_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+
+def validate_config(config: Dict) -> List[Dict]:
+    """
+    校验配置结构，返回错误列表（为空表示合法）
+
+    配置格式：
+        {"faculties": {名称: {"code", "description"}},
+         "instruments": {名称: {"faculty"（教研室名称或代码）, "max_students", "duration_coefficient"}},
+         "default_duration_coefficient": 0.5}
+    """
+    if not isinstance(config, dict):
+        return [{"field": "", "message": "配置必须是对象"}]
+    errors = []
+    faculties = config.get('faculties')
+    instruments = config.get('instruments')
+    if not isinstance(faculties, dict) or not faculties:
+        errors.append({"field": "faculties", "message": "至少需要一个教研室"})
+        faculties = {}
+    if not isinstance(instruments, dict):
+        errors.append({"field": "instruments", "message": "instruments 必须是对象"})
+        instruments = {}
+
+    keys = set()
+    for name, faculty in faculties.items():
+        code = faculty.get('code') if isinstance(faculty, dict) else None
+        if not isinstance(code, str) or not code:
+            errors.append({"field": f"faculties.{name}", "message": "缺少教研室代码"})
+            continue
+        if name in keys or code in keys:
+            errors.append({"field": f"faculties.{name}", "message": f"教研室名称或代码 '{code}' 重复"})
+        keys.update((name, code))
+
+    default_duration = config.get('default_duration_coefficient', 0.5)
+    if not _positive_number(default_duration):
+        errors.append({"field": "default_duration_coefficient", "message": "默认课时系数必须是正数"})
+
+    for name, instrument in instruments.items():
+        field = f"instruments.{name}"
+        if not isinstance(instrument, dict):
+            errors.append({"field": field, "message": "乐器配置必须是对象"})
+            continue
+        if instrument.get('faculty') not in keys:
+            errors.append({"field": field, "message": f"教研室 '{instrument.get('faculty')}' 不存在"})
+        max_students = instrument.get('max_students')
+        if not isinstance(max_students, int) or isinstance(max_students, bool) or max_students < 1:
+            errors.append({"field": field, "message": "max_students 必须是正整数"})
+        if not _positive_number(instrument.get('duration_coefficient', default_duration)):
+            errors.append({"field": field, "message": "duration_coefficient 必须是正数"})
+    return errors
+
+
+def load_config_file(path: str) -> Optional[Dict]:
+    """读取 JSON 配置文件（文件不存在时返回 None）"""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_config_file(path: str, config: Dict):
+    """写入 JSON 配置文件（临时文件 + 替换，写入中断不会损坏原文件）"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+
+class FacultyRegistry:
+    """
+    只读注册表（构建后不再修改，可在线程间共享）
+
+    - 教研室可用名称（钢琴专业）或代码（PIANO）查找，faculty_ids 同时收录两者
+    - 乐器编号顺序与配置顺序一致，instrument_* 元组按乐器编号索引
+    """
+
+    __slots__ = ('faculty_codes', 'faculty_names', 'faculty_descriptions', 'faculty_ids',
+                 'instrument_names', 'instrument_ids', 'instrument_faculty_ids', 'instrument_capacity',
+                 'instrument_duration', 'faculty_instruments', 'default_duration', 'version', '_config')
+
+    def __init__(self, faculties: Mapping[str, Dict], instruments: Mapping[str, Dict], default_duration: float,
+                 version: int = 1):
+        """
+        Args:
+            faculties: 教研室名称 -> {"code", "description"}
+            instruments: 乐器名称 -> {"faculty"（教研室名称或代码）, "max_students", "duration_coefficient"}
+            default_duration: 未配置课时系数时的默认值
+            version: 配置版本（每次运行时替换加 1）
+        """
+        self.version = version
+        self._config = copy.deepcopy({
+            "faculties": dict(faculties),
+            "instruments": dict(instruments),
+            "default_duration_coefficient": default_duration
+        })
+        self.faculty_names: Tuple[str, ...] = tuple(faculties)
+        self.faculty_codes: Tuple[str, ...] = tuple(config['code'] for config in faculties.values())
+        self.faculty_descriptions: Tuple[str, ...] = tuple(config.get('description', '') for config in faculties.values())
+        ids = {name: idx for idx, name in enumerate(self.faculty_names)}
+        ids.update((code, idx) for idx, code in enumerate(self.faculty_codes))
+        self.faculty_ids: Mapping[str, int] = MappingProxyType(ids)
+
+        self.default_duration = default_duration
+        self.instrument_names: Tuple[str, ...] = tuple(instruments)
+        self.instrument_ids: Mapping[str, int] = MappingProxyType(
+            {name: idx for idx, name in enumerate(self.instrument_names)}
+        )
+        self.instrument_faculty_ids: Tuple[int, ...] = tuple(
+            ids[config['faculty']] for config in instruments.values()
+        )
+        self.instrument_capacity: Tuple[int, ...] = tuple(
+            int(config['max_students']) for config in instruments.values()
+        )
+        self.instrument_duration: Tuple[float, ...] = tuple(
+            float(config.get('duration_coefficient', default_duration)) for config in instruments.values()
+        )
+
+        by_faculty: List[List[str]] = [[] for _ in self.faculty_codes]
+        for name, faculty_id in zip(self.instrument_names, self.instrument_faculty_ids):
+            by_faculty[faculty_id].append(name)
+        self.faculty_instruments: Tuple[Tuple[str, ...], ...] = tuple(tuple(names) for names in by_faculty)
+
+    @classmethod
+    def from_config(cls, config: Dict, version: int = 1) -> 'FacultyRegistry':
+        """校验并构建注册表，配置不合法时抛出 ConfigError"""
+        errors = validate_config(config)
+        if errors:
+            raise ConfigError(errors)
+        return cls(config['faculties'], config['instruments'], config.get('default_duration_coefficient', 0.5),
+                   version)
+
+    def to_config(self) -> Dict:
+        """构建时使用的配置（副本）"""
+        return copy.deepcopy(self._config)
+
+    # -------------------------------------------------
+    # 教研室
+    # -------------------------------------------------
+
+    def faculty_id(self, faculty: Optional[str]) -> Optional[int]:
+        """教研室名称或代码 -> 编号"""
+        return self.faculty_ids.get(faculty)
+
+    def faculty_code(self, faculty: Optional[str]) -> Optional[str]:
+        """教研室名称或代码 -> 代码"""
+        idx = self.faculty_ids.get(faculty)
+        return self.faculty_codes[idx] if idx is not None else None
+
+    def faculty_name(self, faculty: Optional[str]) -> Optional[str]:
+        """教研室名称或代码 -> 名称"""
+        idx = self.faculty_ids.get(faculty)
+        return self.faculty_names[idx] if idx is not None else None
+
+    def faculty_info(self, faculty: Optional[str]) -> Optional[Dict]:
+        """教研室名称或代码 -> {"faculty_name", "faculty_code", "description"}"""
+        idx = self.faculty_ids.get(faculty)
+        if idx is None:
+            return None
+        return {
+            "faculty_name": self.faculty_names[idx],
+            "faculty_code": self.faculty_codes[idx],
+            "description": self.faculty_descriptions[idx]
+        }
+
+    def faculties(self) -> List[Dict]:
+        """全部教研室（配置顺序）"""
+        return [self.faculty_info(code) for code in self.faculty_codes]
+
+    def instruments_of(self, faculty: Optional[str]) -> Tuple[str, ...]:
+        """教研室下的乐器（配置顺序）"""
+        idx = self.faculty_ids.get(faculty)
+        return self.faculty_instruments[idx] if idx is not None else ()
+
+    # -------------------------------------------------
+    # 乐器
+    # -------------------------------------------------
+
+    def has_instrument(self, instrument_name: Optional[str]) -> bool:
+        return instrument_name in self.instrument_ids
+
+    def instrument_faculty_code(self, instrument_name: Optional[str]) -> Optional[str]:
+        idx = self.instrument_ids.get(instrument_name)
+        return self.faculty_codes[self.instrument_faculty_ids[idx]] if idx is not None else None
+
+    def instrument_faculty_name(self, instrument_name: Optional[str]) -> Optional[str]:
+        idx = self.instrument_ids.get(instrument_name)
+        return self.faculty_names[self.instrument_faculty_ids[idx]] if idx is not None else None
+
+    def max_students(self, instrument_name: Optional[str], default: int = 1) -> int:
+        """每班最多学生数（未知乐器返回 default）"""
+        idx = self.instrument_ids.get(instrument_name)
+        return self.instrument_capacity[idx] if idx is not None else default
+
+    def duration_coefficient(self, instrument_name: Optional[str]) -> float:
+        """一节课的标准课时（未知乐器返回默认课时系数）"""
+        idx = self.instrument_ids.get(instrument_name)
+        return self.instrument_duration[idx] if idx is not None else self.default_duration
+
+    def capacity_table(self) -> Dict[str, int]:
+        """乐器 -> 每班最多学生数"""
+        return dict(zip(self.instrument_names, self.instrument_capacity))
+
+    def instrument_faculty_codes(self) -> Dict[str, str]:
+        """乐器 -> 教研室代码（用于构建资格矩阵）"""
+        return {
+            name: self.faculty_codes[faculty_id]
+            for name, faculty_id in zip(self.instrument_names, self.instrument_faculty_ids)
+        }
+
+
+class InstalledConfig:
+    """当前配置：注册表与按其生成的资格矩阵，作为一个对象整体发布"""
+
+    __slots__ = ('registry', 'qualifications')
+
+    def __init__(self, registry: FacultyRegistry, qualifications=None):
+        self.registry = registry
+        self.qualifications = qualifications  # QualificationMatrix（由 api.faculty_api 生成）
+
+
+_current: Optional[InstalledConfig] = None
+
+
+def install_registry(registry: FacultyRegistry, qualifications=None):
+    """
+    设置当前注册表及按其生成的资格矩阵
+
+    两者包装为一个对象后单次引用赋值，读取方读到完整的旧配置或新配置，
+    不会读到新注册表与旧矩阵的组合
+    """
+    global _current
+    _current = InstalledConfig(registry, qualifications)
+
+
+def current_config() -> Optional[InstalledConfig]:
+    """当前配置（同时使用注册表与资格矩阵时只读取一次，再分别使用其字段）"""
+    return _current
+
+
+def current_registry() -> FacultyRegistry:
+    """当前注册表（引用读取，无需加锁）"""
+    return _current.registry if _current is not None else None
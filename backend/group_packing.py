@@ -0,0 +1,261 @@
+"""
+小组课编班引擎
+按乐器将报名学生编入尽量少的小组（每组不超过乐器最大人数），
+以最大流把各乐器的小组分配给有资格且周课时未满的教师，
+再按 教师/学生 占用位图为每个小组选择互不冲突的时段
+"""
+
+from collections import deque
+from math import gcd
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+DEFAULT_MAX_WEEKLY_HOURS = 20  # 与 v2 schema teachers.max_weekly_hours 默认值一致
+
+HOUR_UNITS = 100  # 课时按 0.01 课时为单位折算为整数容量
+
+Slot = Tuple[int, int]  # (星期, 节次)
+SectionHours = Union[float, Dict[str, float]]  # 统一课时，或 乐器 -> 每组课时
+
+
+def section_hours(hours_per_section: SectionHours, instrument: str, default: float = 1) -> float:
+    """某乐器每个小组每周占用的课时"""
+    if isinstance(hours_per_section, dict):
+        return hours_per_section.get(instrument, default)
+    return hours_per_section
+
+
+def split_groups(student_ids: List[str], max_students: int) -> List[List[str]]:
+    """将学生均分为最少数量的小组（各组人数相差不超过1）"""
+    if not student_ids:
+        return []
+    count = -(-len(student_ids) // max_students)
+    base, extra = divmod(len(student_ids), count)
+    groups, start = [], 0
+    for index in range(count):
+        size = base + (1 if index < extra else 0)
+        groups.append(student_ids[start:start + size])
+        start += size
+    return groups
+
+
+class _FlowNetwork:
+    """整数容量最大流（BFS 增广）"""
+
+    def __init__(self, size: int):
+        self.graph: List[List[int]] = [[] for _ in range(size)]
+        self.to: List[int] = []
+        self.capacity: List[int] = []
+
+    def add_edge(self, source: int, target: int, capacity: int) -> int:
+        self.graph[source].append(len(self.to))
+        self.to.append(target)
+        self.capacity.append(capacity)
+        self.graph[target].append(len(self.to))
+        self.to.append(source)
+        self.capacity.append(0)
+        return len(self.to) - 2
+
+    def max_flow(self, source: int, sink: int) -> int:
+        total = 0
+        while True:
+            parent_edge = [-1] * len(self.graph)
+            parent_edge[source] = -2
+            queue = deque([source])
+            while queue and parent_edge[sink] == -1:
+                node = queue.popleft()
+                for edge in self.graph[node]:
+                    target = self.to[edge]
+                    if self.capacity[edge] > 0 and parent_edge[target] == -1:
+                        parent_edge[target] = edge
+                        queue.append(target)
+            if parent_edge[sink] == -1:
+                return total
+
+            bottleneck, node = None, sink
+            while node != source:
+                edge = parent_edge[node]
+                bottleneck = self.capacity[edge] if bottleneck is None else min(bottleneck, self.capacity[edge])
+                node = self.to[edge ^ 1]
+            node = sink
+            while node != source:
+                edge = parent_edge[node]
+                self.capacity[edge] -= bottleneck
+                self.capacity[edge ^ 1] += bottleneck
+                node = self.to[edge ^ 1]
+            total += bottleneck
+
+    def flow(self, edge: int) -> int:
+        return self.capacity[edge ^ 1]
+
+
+def allocate_sections(
+    section_counts: Dict[str, int],
+    teachers: List[Dict],
+    hours_per_section: SectionHours = 1
+) -> Dict[str, List[str]]:
+    """
+    将各乐器的小组数分配给教师（最大流，最大化可安排的课时）
+
+    流量以 0.01 课时为单位：乐器边容量为 小组数 × 每组课时，教师边容量为剩余课时；
+    各乐器课时相同时结果与按小组计数的最大流一致。课时不同时，流量按各乐器每组课时
+    向下取整为小组数，剩余小组再按剩余课时补充分配给有资格的教师
+
+    Args:
+        section_counts: 乐器 -> 小组数
+        teachers: 教师列表，每项包含 id、instruments（有资格的乐器）、
+                  max_weekly_hours、current_hours
+        hours_per_section: 每个小组每周占用的课时，或 乐器 -> 每组课时
+
+    Returns:
+        乐器 -> 按小组顺序分配的教师ID列表（长度可能小于小组数，表示教师课时不足）
+    """
+    instruments = list(section_counts)
+    units = {
+        name: max(int(round(section_hours(hours_per_section, name) * HOUR_UNITS)), 1)
+        for name in instruments
+    }
+    source, sink = 0, 1
+    instrument_nodes = {name: 2 + i for i, name in enumerate(instruments)}
+    teacher_base = 2 + len(instruments)
+    network = _FlowNetwork(teacher_base + len(teachers))
+
+    for name, node in instrument_nodes.items():
+        network.add_edge(source, node, section_counts[name] * units[name])
+
+    remaining: Dict[str, int] = {}
+    pair_edges: List[Tuple[str, str, int]] = []
+    for index, teacher in enumerate(teachers):
+        qualified = [name for name in teacher.get('instruments', ()) if name in instrument_nodes]
+        hours = teacher.get('max_weekly_hours', DEFAULT_MAX_WEEKLY_HOURS) - teacher.get('current_hours', 0)
+        capacity = int(round(hours * HOUR_UNITS))
+        if not qualified or capacity <= 0:
+            continue
+        # 教师容量向下取整为其各乐器课时的公约数倍数，避免出现无法凑成整组的零散流量
+        step = 0
+        for name in qualified:
+            step = gcd(step, units[name])
+        capacity -= capacity % step
+        if capacity <= 0:
+            continue
+        node = teacher_base + index
+        network.add_edge(node, sink, capacity)
+        remaining[teacher['id']] = capacity
+        for name in qualified:
+            edge = network.add_edge(instrument_nodes[name], node, section_counts[name] * units[name])
+            pair_edges.append((name, teacher['id'], edge))
+
+    network.max_flow(source, sink)
+
+    allocation: Dict[str, List[str]] = {name: [] for name in instruments}
+    for name, teacher_id, edge in pair_edges:
+        count = network.flow(edge) // units[name]
+        allocation[name].extend([teacher_id] * count)
+        remaining[teacher_id] -= count * units[name]
+
+    # 取整后未分配的小组：交给剩余课时足够的有资格教师
+    for name, teacher_id, _ in pair_edges:
+        while len(allocation[name]) < section_counts[name] and remaining[teacher_id] >= units[name]:
+            allocation[name].append(teacher_id)
+            remaining[teacher_id] -= units[name]
+    return allocation
+
+
+def pack_groups(
+    enrollments: Iterable[Dict],
+    teachers: List[Dict],
+    max_students: Dict[str, int],
+    slots: List[Slot],
+    slot_available: Optional[Callable[[str, List[str], int, int], bool]] = None,
+    hours_per_section: SectionHours = 1
+) -> Dict:
+    """
+    编班并排定时段
+
+    Args:
+        enrollments: 报名记录，每项包含 student_id、instrument
+        teachers: 教师列表（见 allocate_sections）
+        max_students: 乐器 -> 每组最大人数
+        slots: 候选时段 (星期, 节次)，按优先顺序
+        slot_available: (teacher_id, student_ids, 星期, 节次) -> 教师与小组全部学生该时段是否可排
+                        （已有课程、禁排等）
+        hours_per_section: 每个小组每周占用的课时，或 乐器 -> 每组课时
+
+    Returns:
+        {
+            "sections": [{"instrument", "teacher_id", "student_ids", "day_of_week", "period", "hours"}],
+            "unplaced": [{"instrument", "student_ids", "reason"}]
+        }
+    """
+    by_instrument: Dict[str, List[str]] = {}
+    seen = set()
+    for item in enrollments:
+        key = (item['student_id'], item['instrument'])
+        if key in seen:
+            continue
+        seen.add(key)
+        by_instrument.setdefault(item['instrument'], []).append(item['student_id'])
+
+    unplaced: List[Dict] = []
+    groups: Dict[str, List[List[str]]] = {}
+    for instrument, student_ids in by_instrument.items():
+        if instrument not in max_students:
+            unplaced.append({"instrument": instrument, "student_ids": student_ids, "reason": "乐器不在配置中"})
+            continue
+        groups[instrument] = split_groups(sorted(student_ids), max_students[instrument])
+
+    allocation = allocate_sections(
+        {instrument: len(items) for instrument, items in groups.items()}, teachers, hours_per_section
+    )
+
+    # 待排小组：较大的组优先（学生越多越难找到共同空闲时段）
+    pending: List[Tuple[str, str, List[str]]] = []
+    for instrument, items in groups.items():
+        staffed = allocation.get(instrument, [])
+        for index, student_ids in enumerate(items):
+            if index < len(staffed):
+                pending.append((instrument, staffed[index], student_ids))
+            else:
+                unplaced.append({"instrument": instrument, "student_ids": student_ids, "reason": "有资格的教师课时不足"})
+    pending.sort(key=lambda item: -len(item[2]))
+
+    slot_bits = {slot: 1 << index for index, slot in enumerate(slots)}
+    teacher_masks: Dict[str, int] = {}
+    student_masks: Dict[str, int] = {}
+    day_load: Dict[Tuple[str, int], int] = {}
+    sections: List[Dict] = []
+
+    for instrument, teacher_id, student_ids in pending:
+        taken = teacher_masks.get(teacher_id, 0)
+        for student_id in student_ids:
+            taken |= student_masks.get(student_id, 0)
+
+        # 优先选择教师当天课程较少的时段，使课程在一周内分布均匀
+        chosen = None
+        for slot in sorted(slots, key=lambda s: day_load.get((teacher_id, s[0]), 0)):
+            bit = slot_bits[slot]
+            if taken & bit:
+                continue
+            if slot_available is not None and not slot_available(teacher_id, student_ids, slot[0], slot[1]):
+                continue
+            chosen = slot
+            break
+
+        if chosen is None:
+            unplaced.append({"instrument": instrument, "student_ids": student_ids, "reason": "无可用的共同时段"})
+            continue
+
+        bit = slot_bits[chosen]
+        teacher_masks[teacher_id] = teacher_masks.get(teacher_id, 0) | bit
+        for student_id in student_ids:
+            student_masks[student_id] = student_masks.get(student_id, 0) | bit
+        day_load[(teacher_id, chosen[0])] = day_load.get((teacher_id, chosen[0]), 0) + 1
+        sections.append({
+            "instrument": instrument,
+            "teacher_id": teacher_id,
+            "student_ids": student_ids,
+            "day_of_week": chosen[0],
+            "period": chosen[1],
+            "hours": section_hours(hours_per_section, instrument)
+        })
+
+    return {"sections": sections, "unplaced": unplaced}
@@ -0,0 +1,245 @@
+"""
+后台任务队列
+进程内线程池执行耗时的生成与导入操作，任务状态写入本地 JSON 文件，
+服务重启后排队中与执行中断的任务会重新排队；不依赖外部消息队列
+"""
+
+import json
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+# 本地保留的已结束任务数（超出时丢弃最早结束的任务）
+MAX_FINISHED_JOBS = 200
+
+_local = threading.local()
+
+
+class JobCancelled(Exception):
+    """任务已被取消（由 checkpoint 在执行中抛出）"""
+
+
+class JobFailed(Exception):
+    """任务执行失败，消息作为任务错误信息"""
+
+
+def current_job() -> Optional['Job']:
+    """当前线程正在执行的任务"""
+    return getattr(_local, 'job', None)
+
+
+def checkpoint(done: int, total: int):
+    """
+    上报进度并检查取消请求（不在任务线程中调用时无操作）
+
+    长时间运行的循环应定期调用，任务被取消时抛出 JobCancelled
+    """
+    job = current_job()
+    if job is None:
+        return
+    job.progress = {"done": done, "total": total}
+    if job.cancel_requested:
+        raise JobCancelled()
+
+
+class Job:
+    """一个后台任务"""
+
+    __slots__ = ('id', 'kind', 'payload', 'status', 'progress', 'result', 'error',
+                 'created_at', 'started_at', 'finished_at', 'cancel_requested', 'committed')
+
+    def __init__(self, kind: str, payload: Dict, job_id: Optional[str] = None):
+        self.id = job_id or str(uuid.uuid4())
+        self.kind = kind
+        self.payload = payload
+        self.status = 'queued'
+        self.progress = {"done": 0, "total": 0}
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+        # 沙盒任务的变更已提交到在线数据（结果随之保存），重新执行时不再提交
+        self.committed = False
+
+    def to_dict(self, include_result: bool = True) -> Dict:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+        if include_result:
+            data['result'] = self.result
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Job':
+        job = cls(data['kind'], data.get('payload') or {}, data['job_id'])
+        for name in ('status', 'progress', 'result', 'error', 'created_at', 'started_at', 'finished_at'):
+            if data.get(name) is not None:
+                setattr(job, name, data[name])
+        job.committed = bool(data.get('committed'))
+        return job
+
+
+class JobQueue:
+    """
+    后台任务队列
+
+    - submit() 立即返回任务，工作线程按提交顺序执行
+    - runner(job) 返回任务结果（可 JSON 序列化），抛出 JobFailed / JobCancelled 或其他异常时记录失败原因
+    - 每次状态变化时整体写入 path（临时文件 + 替换，写入中断不会损坏原文件）
+    """
+
+    def __init__(self, path: Optional[str] = None, workers: int = 2):
+        self.path = path
+        self.workers = workers
+        self._jobs: Dict[str, Job] = {}
+        self._pending: 'queue.Queue[str]' = queue.Queue()
+        self._lock = threading.RLock()
+        self._threads: List[threading.Thread] = []
+        self._runner: Optional[Callable[[Job], object]] = None
+
+    # -------------------------------------------------
+    # 生命周期
+    # -------------------------------------------------
+
+    def start(self, runner: Callable[[Job], object]):
+        """加载本地任务并启动工作线程（重复调用无副作用）"""
+        with self._lock:
+            if self._threads:
+                return
+            self._runner = runner
+            self._load()
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'job-worker-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            items = json.load(f)
+        for item in items:
+            job = Job.from_dict(item)
+            # 重启前执行中断的任务重新执行：排课类任务在沙盒叠加层中运行、结束时一次性提交，
+            # 提交前中断不会写入在线数据，提交后中断的任务带有 committed 标记，重新执行时直接返回已保存的结果；
+            # 批量导入类任务在存储锁内整体校验后一次性应用
+            if job.status == 'running':
+                job.status = 'queued'
+                job.started_at = None
+            self._jobs[job.id] = job
+            if job.status == 'queued':
+                self._pending.put(job.id)
+
+    def _save(self):
+        if not self.path:
+            return
+        with self._lock:
+            items = [dict(job.to_dict(), payload=job.payload, committed=job.committed) for job in self._jobs.values()]
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(items, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+
+    # -------------------------------------------------
+    # 任务操作
+    # -------------------------------------------------
+
+    def submit(self, kind: str, payload: Dict) -> Job:
+        job = Job(kind, payload)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._save()
+        self._pending.put(job.id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def jobs(self, status: Optional[str] = None) -> List[Job]:
+        with self._lock:
+            items = list(self._jobs.values())
+        if status:
+            items = [job for job in items if job.status == status]
+        return sorted(items, key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """取消任务：排队中的任务直接取消，执行中的任务在下一个 checkpoint 停止"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATUSES:
+                return job
+            job.cancel_requested = True
+            if job.status == 'queued':
+                self._finish(job, 'cancelled')
+            return job
+
+    def mark_committed(self, job: Job, result):
+        """记录沙盒任务已提交及其结果（在提交所在的存储锁内调用，先于任务结束写入文件）"""
+        with self._lock:
+            job.committed = True
+            job.result = result
+            self._save()
+
+    def _finish(self, job: Job, status: str, result=None, error: Optional[str] = None):
+        with self._lock:
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished_at = datetime.now().isoformat()
+            self._trim()
+            self._save()
+
+    def _trim(self):
+        finished = [job for job in self._jobs.values() if job.status in FINISHED_STATUSES]
+        if len(finished) <= MAX_FINISHED_JOBS:
+            return
+        finished.sort(key=lambda job: job.finished_at)
+        for job in finished[:len(finished) - MAX_FINISHED_JOBS]:
+            del self._jobs[job.id]
+
+    # -------------------------------------------------
+    # 工作线程
+    # -------------------------------------------------
+
+    def _work(self):
+        while True:
+            job_id = self._pending.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job.status != 'queued':
+                    continue
+                job.status = 'running'
+                job.started_at = datetime.now().isoformat()
+                self._save()
+
+            _local.job = job
+            try:
+                result = self._runner(job)
+            except JobCancelled:
+                self._finish(job, 'cancelled')
+            except JobFailed as e:
+                self._finish(job, 'failed', error=str(e))
+            except Exception as e:
+                self._finish(job, 'failed', error=f"{type(e).__name__}: {e}")
+            else:
+                self._finish(job, 'succeeded', result)
+            finally:
+                _local.job = None
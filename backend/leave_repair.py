@@ -0,0 +1,125 @@
+"""
+教师请假排课修复
+只处理请假教师在日期范围内的排课记录：优先在原时段换同教研室有资格的代课教师，
+其次在临近时段调课，变更在写时复制叠加层中进行，未受影响的排课保持不变
+"""
+
+from datetime import date as date_cls, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from schedule_overlay import ScheduleOverlay
+from schedule_store import ScheduleRecord, parse_date_ordinal
+
+# (教师ID, 待安排记录, 须检查的学生ID, 星期, 节次, 日期) -> 该教师与学生是否可以在此时段上这节课
+# （原时段代课时学生列表为空：学生本就在该时段上这节课）
+Availability = Callable[[str, ScheduleRecord, List[str], int, int, Optional[str]], bool]
+
+
+def affected_records(store, teacher_id: str, start_date: Optional[str] = None,
+                     end_date: Optional[str] = None, include_recurring: bool = False) -> List[ScheduleRecord]:
+    """
+    请假范围内受影响的排课记录（通过教师索引查找，不遍历全部记录）
+
+    无日期（每周循环）的记录在 include_recurring 为真时计入：修复会改写循环记录本身，
+    对请假范围之外的每一周同样生效，因此默认不处理
+    """
+    start = parse_date_ordinal(start_date) or 0
+    end = parse_date_ordinal(end_date) or float('inf')
+    return [
+        record for record in store.teacher_records(teacher_id)
+        if (record.date and start <= record.date <= end) or (not record.date and include_recurring)
+    ]
+
+
+def _nearby_slots(record: ScheduleRecord, days: List[int], periods: List[int]) -> List[Tuple[int, int]]:
+    """候选调课时段：同一天优先，再按与原时段的距离排序"""
+    slots = [
+        (day, period) for day in days for period in periods
+        if (day, period) != (record.day_of_week, record.period)
+    ]
+    slots.sort(key=lambda slot: (abs(slot[0] - record.day_of_week), abs(slot[1] - record.period)))
+    return slots
+
+
+def _shift_date(record: ScheduleRecord, day: int) -> Optional[str]:
+    """调到同一周的另一天时对应的日期"""
+    if not record.date:
+        return None
+    return (date_cls.fromordinal(record.date) + timedelta(days=day - record.day_of_week)).isoformat()
+
+
+def plan_leave_repair(
+    overlay: ScheduleOverlay,
+    records: List[ScheduleRecord],
+    substitutes: Callable[[ScheduleRecord], List[str]],
+    is_available: Availability,
+    faculty_of: Callable[[str], Optional[str]],
+    days: List[int],
+    periods: List[int],
+    allow_reschedule: bool = True
+) -> Dict[str, List]:
+    """
+    在叠加层中生成最小变更的修复方案
+
+    Args:
+        overlay: 在线排课的叠加层，方案写入其中（提交或丢弃由调用方决定）
+        records: 受影响的排课记录
+        substitutes: 记录 -> 按优先顺序排列的代课教师ID
+        is_available: 教师与学生时段可用性检查（基于叠加层，已计入方案中的变更）
+        faculty_of: 教师ID -> 教研室代码
+        days, periods: 允许调课的星期与节次
+        allow_reschedule: 原时段无代课教师时是否允许调课
+
+    Returns:
+        {"changes": [...], "unresolved": [...]}
+    """
+    changes, unresolved = [], []
+
+    # 代课教师少的记录优先处理，减少被其他记录抢占
+    candidates = {record.id: substitutes(record) for record in records}
+    ordered = sorted(records, key=lambda record: len(candidates[record.id]))
+
+    def apply(record: ScheduleRecord, before: Dict, teacher_id: str, day: int, period: int,
+              date: Optional[str], room_id: Optional[str], action: str):
+        after = dict(before, teacher_id=teacher_id, day_of_week=day, period=period, date=date,
+                     room_id=room_id, faculty_code=faculty_of(teacher_id) or before['faculty_code'])
+        overlay.insert(after)
+        changes.append({"class_id": record.id, "action": action, "before": before, "after": after})
+
+    # 1. 先为所有记录尝试原时段代课，避免调课占用其他记录原时段的代课教师
+    pending = []
+    for record in ordered:
+        before = overlay.to_dict(record)
+        for teacher_id in candidates[record.id]:
+            if is_available(teacher_id, record, [], record.day_of_week, record.period, before['date']):
+                apply(record, before, teacher_id, record.day_of_week, record.period,
+                      before['date'], before['room_id'], 'substitute')
+                break
+        else:
+            pending.append((record, before))
+
+    # 2. 其余记录在临近时段调课（学生或小组成员须同样空闲，教室被占用时改为待分配）
+    for record, before in pending:
+        students = [overlay.students.value(student) for student in overlay.record_students(record)]
+        chosen = None
+        if allow_reschedule:
+            for day, period in _nearby_slots(record, days, periods):
+                date = _shift_date(record, day)
+                teacher_id = next(
+                    (tid for tid in candidates[record.id]
+                     if is_available(tid, record, students, day, period, date)),
+                    None
+                )
+                if teacher_id is not None:
+                    room_id = before['room_id']
+                    if room_id and overlay.is_room_busy(room_id, period, date, day):
+                        room_id = None
+                    chosen = (teacher_id, day, period, date, room_id)
+                    break
+
+        if chosen is None:
+            unresolved.append({"class_id": record.id, "record": before, "reason": "没有可代课的教师或可用时段"})
+        else:
+            apply(record, before, *chosen, 'reschedule')
+
+    return {"changes": changes, "unresolved": unresolved}
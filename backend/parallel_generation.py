@@ -0,0 +1,164 @@
+"""
+按教研室并行生成排课
+各教研室教师互不重叠（资格规则限定），只共享教室：先按需求为各教研室预分配教室配额，
+各教研室在独立进程中求解，合并时再为配额不足的课程在全部教室中二分匹配补分配
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+from room_registry import RoomRegistry, ROOM_TYPES_BY_FACULTY, DEFAULT_ROOM_TYPES
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """进程池（首次使用时创建，进程数不超过教研室数与 CPU 核数）"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=max(1, min(len(ROOM_TYPES_BY_FACULTY), os.cpu_count() or 1)))
+    return _executor
+
+
+def allocate_room_quotas(rooms: List[Dict], demand: Dict[str, int]) -> Dict[str, List[Dict]]:
+    """
+    按各教研室课程数预分配教室配额（配额互不重叠，各进程无需协调教室占用）
+
+    专属教研室的教室直接归属该教研室；其余教室按类型在可使用该类型的教研室之间，
+    优先分给 已分配教室数 / 课程数 最小的教研室
+    """
+    quotas: Dict[str, List[Dict]] = {faculty: [] for faculty in demand}
+    shared = []
+    for room in rooms:
+        if room.get('faculty_code') in quotas:
+            quotas[room['faculty_code']].append(room)
+        elif not room.get('faculty_code'):
+            shared.append(room)
+
+    # 可用教研室少的教室先分配，避免通用教室被先占满
+    def users(room: Dict) -> List[str]:
+        return [
+            faculty for faculty in demand
+            if demand[faculty] and room['room_type'] in ROOM_TYPES_BY_FACULTY.get(faculty, DEFAULT_ROOM_TYPES)
+        ]
+
+    for room in sorted(shared, key=lambda r: (len(users(r)), r['capacity'])):
+        candidates = users(room)
+        if not candidates:
+            continue
+        faculty = min(candidates, key=lambda f: len(quotas[f]) / demand[f])
+        quotas[faculty].append(room)
+    return quotas
+
+
+def solve_faculty_partition(task: Dict) -> Dict:
+    """
+    求解单个教研室的排课（在工作进程中运行，输入输出均为可序列化的基础类型）
+
+    task:
+        faculty_code, days, periods
+        rooms: 该教研室的教室配额
+        room_busy: {room_id: {星期: 已占用节次位图}}
+        teachers: {teacher_id: {"busy": {星期: 已占用节次位图}, "remaining_hours": 剩余周课时}}
+        students: 可选，{student_id: {星期: 已占用节次位图}}
+        courses: [{"index", "course_id", "teacher_id", "student_id", "capacity", "hours", "faculty_code",
+                   "blocked": {星期: 禁排节次位图}}]
+
+    Returns:
+        {"scheduled": [{"index", "course_id", "teacher_id", "day_of_week", "period", "room_id"}],
+         "failed": [{"index", "course_id", "reason"}]}
+    """
+    registry = RoomRegistry()
+    registry.bulk_load(task['rooms'])
+    room_busy = {room_id: {int(day): mask for day, mask in days.items()}
+                 for room_id, days in task['room_busy'].items()}
+    teachers = {
+        teacher_id: {
+            "busy": {int(day): mask for day, mask in info['busy'].items()},
+            "remaining_hours": info['remaining_hours'],
+            "day_load": {}
+        }
+        for teacher_id, info in task['teachers'].items()
+    }
+    students = {student_id: {int(day): mask for day, mask in days.items()}
+                for student_id, days in task.get('students', {}).items()}
+
+    scheduled, failed = [], []
+    courses = []
+    for course in task['courses']:
+        blocked = {int(day): mask for day, mask in course['blocked'].items()}
+        busy = teachers[course['teacher_id']]['busy']
+        unavailable = sum(bin(busy.get(day, 0) | blocked.get(day, 0)).count('1') for day in task['days'])
+        courses.append((unavailable, course, blocked))
+    # 可用时段少的课程先排
+    courses.sort(key=lambda item: -item[0])
+
+    for _, course, blocked in courses:
+        teacher = teachers[course['teacher_id']]
+        if teacher['remaining_hours'] < course['hours']:
+            failed.append({"index": course['index'], "course_id": course['course_id'], "reason": "超出教师周课时上限"})
+            continue
+
+        candidates = registry.candidates(course['capacity'], course['faculty_code'])
+        chosen = fallback = None
+        # 教师当天课程少的日子优先，使课程均匀分布在一周内；
+        # 配额内没有空闲教室时记下第一个教师可用时段，以待分配教室排入，留给合并阶段补分配
+        for day in sorted(task['days'], key=lambda d: teacher['day_load'].get(d, 0)):
+            taken = teacher['busy'].get(day, 0) | blocked.get(day, 0)
+            if course.get('student_id'):
+                taken |= students.get(course['student_id'], {}).get(day, 0)
+            for period in task['periods']:
+                bit = 1 << period
+                if taken & bit:
+                    continue
+                room_id = next((r for r in candidates if not room_busy.get(r, {}).get(day, 0) & bit), None)
+                if room_id is not None:
+                    chosen = (day, period, room_id)
+                    break
+                if fallback is None:
+                    fallback = (day, period, None)
+            if chosen is not None:
+                break
+        chosen = chosen or fallback
+
+        if chosen is None:
+            failed.append({"index": course['index'], "course_id": course['course_id'], "reason": "无法找到合适的排课时段"})
+            continue
+
+        day, period, room_id = chosen
+        bit = 1 << period
+        teacher['busy'][day] = teacher['busy'].get(day, 0) | bit
+        teacher['day_load'][day] = teacher['day_load'].get(day, 0) + 1
+        teacher['remaining_hours'] -= course['hours']
+        if course.get('student_id'):
+            days = students.setdefault(course['student_id'], {})
+            days[day] = days.get(day, 0) | bit
+        if room_id is not None:
+            days = room_busy.setdefault(room_id, {})
+            days[day] = days.get(day, 0) | bit
+        scheduled.append({
+            "index": course['index'],
+            "course_id": course['course_id'],
+            "teacher_id": course['teacher_id'],
+            "day_of_week": day,
+            "period": period,
+            "room_id": room_id
+        })
+
+    return {"faculty_code": task['faculty_code'], "scheduled": scheduled, "failed": failed}
+
+
+def run_partitions(tasks: List[Dict], parallel: bool = True) -> List[Dict]:
+    """
+    求解全部教研室分区：并行模式下分发到进程池，否则在当前进程依次求解
+    （运行环境不允许创建子进程时退回到当前进程）
+    """
+    global _executor
+    if parallel and len(tasks) > 1:
+        try:
+            return list(get_executor().map(solve_faculty_partition, tasks))
+        except (OSError, BrokenProcessPool):
+            _executor = None
+    return [solve_faculty_partition(task) for task in tasks]
@@ -0,0 +1,240 @@
+"""
+内存存储持久化：预写日志 + 二进制快照
+每次写入先追加到预写日志（长度 + CRC32 + pickle 记录）再返回；后台线程定期写快照，
+快照为整数列 + 字符串块的二进制文件，启动时通过 mmap 读取，再重放快照之后的日志段
+"""
+
+import json
+import mmap
+import os
+import pickle
+import struct
+import threading
+import zlib
+from array import array
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+SNAPSHOT_MAGIC = b'MSSNAP01'
+SNAPSHOT_FILE = 'snapshot.bin'
+WAL_PREFIX = 'wal-'
+WAL_SUFFIX = '.log'
+
+_ENTRY_HEADER = struct.Struct('<II')  # 记录长度, CRC32
+
+
+class WriteAheadLog:
+    """
+    分段预写日志
+
+    - 每段文件名为 wal-<代数>.log，快照时切换到新的一段，快照写完后删除更早的段
+    - append() 写入后 flush 到操作系统（进程崩溃不丢失），fsync=True 时同时落盘（掉电不丢失）
+    - 读取时遇到长度不足或校验失败的尾部记录即停止（未确认的写入）
+    """
+
+    def __init__(self, directory: str, fsync: bool = False):
+        self.directory = directory
+        self.fsync = fsync
+        self.generation = 0
+        self.entries = 0  # 当前段的记录数
+        self._file = None
+
+    def _path(self, generation: int) -> str:
+        return os.path.join(self.directory, f'{WAL_PREFIX}{generation:08d}{WAL_SUFFIX}')
+
+    def segments(self) -> List[int]:
+        if not os.path.isdir(self.directory):
+            return []
+        generations = []
+        for name in os.listdir(self.directory):
+            if name.startswith(WAL_PREFIX) and name.endswith(WAL_SUFFIX):
+                generations.append(int(name[len(WAL_PREFIX):-len(WAL_SUFFIX)]))
+        return sorted(generations)
+
+    def open(self, generation: int):
+        """以追加方式打开指定代数的日志段"""
+        os.makedirs(self.directory, exist_ok=True)
+        if self._file is not None:
+            self._file.close()
+        self.generation = generation
+        self.entries = 0
+        self._file = open(self._path(generation), 'ab')
+
+    def rotate(self) -> int:
+        """切换到新的日志段，返回新段代数"""
+        self.open(self.generation + 1)
+        return self.generation
+
+    def append(self, entry: Tuple):
+        payload = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.write(_ENTRY_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.entries += 1
+
+    def read(self, generation: int) -> Iterator[Tuple]:
+        path = self._path(generation)
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+        offset = 0
+        while offset + _ENTRY_HEADER.size <= len(data):
+            length, crc = _ENTRY_HEADER.unpack_from(data, offset)
+            start = offset + _ENTRY_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            yield pickle.loads(payload)
+            offset = start + length
+
+    def remove_before(self, generation: int):
+        for old in self.segments():
+            if old < generation:
+                os.remove(self._path(old))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def write_snapshot(path: str, sections: List[Tuple[str, str, bytes]]):
+    """
+    写入快照文件（先写临时文件并落盘，再原子替换）
+
+    格式：MAGIC | 头部长度(u32) | 头部 JSON [[名称, 类型码, 偏移, 长度]] | 各段数据（按 8 字节对齐）
+    类型码为 array 类型码，或 'pickle' / 'utf8'
+    """
+    header, offset = [], 0
+    for name, kind, data in sections:
+        header.append([name, kind, offset, len(data)])
+        offset += len(data) + (-len(data)) % 8
+    header_bytes = json.dumps(header).encode('utf-8')
+    base = len(SNAPSHOT_MAGIC) + 4 + len(header_bytes)
+    padding = (-base) % 8
+
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(struct.pack('<I', len(header_bytes) + padding))
+        f.write(header_bytes + b' ' * padding)
+        for _, _, data in sections:
+            f.write(data)
+            f.write(b'\0' * ((-len(data)) % 8))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def read_snapshot(path: str) -> Optional[Dict[str, object]]:
+    """
+    通过 mmap 读取快照，返回 名称 -> 数据（整数列为 array，pickle 段为对象，utf8 段为按换行分隔的字符串列表）
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if mapped[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"快照文件格式错误: {path}")
+        header_length = struct.unpack_from('<I', mapped, len(SNAPSHOT_MAGIC))[0]
+        header_start = len(SNAPSHOT_MAGIC) + 4
+        header = json.loads(bytes(mapped[header_start:header_start + header_length]))
+        base = header_start + header_length
+
+        result: Dict[str, object] = {}
+        view = memoryview(mapped)
+        try:
+            for name, kind, offset, length in header:
+                chunk = view[base + offset:base + offset + length]
+                if kind == 'pickle':
+                    result[name] = pickle.loads(chunk)
+                elif kind == 'utf8':
+                    text = str(chunk, 'utf-8')
+                    result[name] = text.split('\n') if text else []
+                else:
+                    values = array(kind)
+                    values.frombytes(chunk)
+                    result[name] = values
+                chunk.release()
+        finally:
+            view.release()
+        return result
+
+
+def int_column(typecode: str, values) -> bytes:
+    return array(typecode, values).tobytes()
+
+
+class Persistence:
+    """
+    持久化管理
+
+    - append() 在写锁内追加日志；调用方在同一把锁内分配同步版本号，日志顺序与版本顺序一致
+    - snapshot(capture) 在写锁内切换日志段并调用 capture() 取得存储的一致截面（应尽量快），
+      capture 返回的函数在锁外生成快照各段；快照之后的写入都在新日志段中，重放时按键覆盖，结果幂等
+    - start() 启动后台线程，每 interval 秒在有新写入时写快照
+    """
+
+    def __init__(self, directory: str, fsync: bool = False, interval: float = 300):
+        self.directory = directory
+        self.interval = interval
+        self.wal = WriteAheadLog(directory, fsync)
+        self.lock = threading.RLock()
+        self.enabled = False
+        self._snapshot_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, SNAPSHOT_FILE)
+
+    def load(self) -> Tuple[Optional[Dict[str, object]], Iterator[Tuple]]:
+        """读取快照与其后的日志记录（enable() 后新写入追加到新的日志段）"""
+        snapshot = read_snapshot(self.snapshot_path)
+        start = snapshot['meta']['generation'] if snapshot else 0
+        segments = [generation for generation in self.wal.segments() if generation >= start]
+
+        def entries():
+            for generation in segments:
+                yield from self.wal.read(generation)
+
+        # 之前的段可能以不完整的记录结尾，新写入总是追加到新段
+        self.wal.generation = max(segments + [start])
+        return snapshot, entries()
+
+    def enable(self):
+        """开始记录日志（在 load() 与重放完成后调用）"""
+        with self.lock:
+            self.wal.rotate()
+            self.enabled = True
+
+    def append(self, entry: Tuple):
+        if self.enabled:
+            self.wal.append(entry)
+
+    def snapshot(self, capture: Callable[[], Callable[[], Tuple[Dict, List[Tuple[str, str, bytes]]]]]):
+        """写快照；capture() 在写锁内执行，返回的函数在锁外生成 (meta, sections)"""
+        with self._snapshot_lock:
+            with self.lock:
+                generation = self.wal.rotate()
+                build = capture()
+            meta, sections = build()
+            meta = dict(meta, generation=generation)
+            write_snapshot(self.snapshot_path, [('meta', 'pickle', pickle.dumps(meta))] + sections)
+            self.wal.remove_before(generation)
+
+    def start(self, capture):
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(self.interval):
+                if self.wal.entries:
+                    self.snapshot(capture)
+
+        self._thread = threading.Thread(target=run, name='snapshot-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
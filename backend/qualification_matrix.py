@@ -0,0 +1,277 @@
+"""
+教师资格矩阵
+教师 × 乐器 的稠密资格矩阵，乐器与教研室均使用整数编号，
+单次资格校验为 O(1)，批量校验与“可教授某乐器的教师”查询为向量化运算
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 熟练程度编码（0 表示无资格，数值越大级别越高）
+PROFICIENCY_LEVELS = ('assistant', 'secondary', 'primary')
+PROFICIENCY_CODES = {level: code for code, level in enumerate(PROFICIENCY_LEVELS, 1)}
+
+# 资格校验原因码（按位组合，0 表示通过）
+QUAL_OK = 0
+QUAL_FACULTY_MISMATCH = 1     # 教师教研室与乐器教研室不一致
+QUAL_NOT_GRANTED = 2          # 教师未被授予该乐器资格
+QUAL_UNKNOWN_INSTRUMENT = 4   # 乐器不在配置中
+QUAL_UNKNOWN_TEACHER = 8      # 教师未登记
+
+_NO_FACULTY = -1
+
+
+class QualificationMatrix:
+    """
+    教师资格矩阵
+
+    - 每位教师占一行，每种乐器占一列，单元格为熟练程度编码（int8）
+    - 教研室比较使用整数编号，不再逐次查询 INSTRUMENT_CONFIGS
+    - 矩阵在授予/撤销资格时同步维护，行容量按倍增扩展
+    """
+
+    def __init__(self, instrument_faculties: Dict[str, str], initial_capacity: int = 64):
+        """
+        Args:
+            instrument_faculties: 乐器名称 -> 所属教研室（名称或代码，与教师教研室使用同一种标识即可）
+            initial_capacity: 初始教师行容量
+        """
+        self.instrument_names: List[str] = list(instrument_faculties)
+        self.instrument_ids: Dict[str, int] = {
+            name: idx for idx, name in enumerate(self.instrument_names)
+        }
+
+        self.faculty_keys: List[str] = sorted(set(instrument_faculties.values()))
+        self.faculty_ids: Dict[str, int] = {
+            key: idx for idx, key in enumerate(self.faculty_keys)
+        }
+        self._instrument_faculty = np.array(
+            [self.faculty_ids[instrument_faculties[name]] for name in self.instrument_names],
+            dtype=np.int16
+        )
+
+        capacity = max(1, initial_capacity)
+        self._teacher_rows: Dict[str, int] = {}
+        self._row_teachers: List[Optional[str]] = []
+        self._free_rows: List[int] = []
+        self._teacher_faculty = np.full(capacity, _NO_FACULTY, dtype=np.int16)
+        self._cells = np.zeros((capacity, len(self.instrument_names)), dtype=np.int8)
+
+    # -------------------------------------------------
+    # 维护
+    # -------------------------------------------------
+
+    def set_teacher(self, teacher_id: str, faculty: Optional[str]) -> int:
+        """登记教师（或更新其教研室），返回行号"""
+        row = self._teacher_rows.get(teacher_id)
+        if row is None:
+            row = self._allocate_row(teacher_id)
+        self._teacher_faculty[row] = self.faculty_ids.get(faculty, _NO_FACULTY)
+        return row
+
+    def remove_teacher(self, teacher_id: str) -> bool:
+        """移除教师行，行号回收复用"""
+        row = self._teacher_rows.pop(teacher_id, None)
+        if row is None:
+            return False
+        self._cells[row, :] = 0
+        self._teacher_faculty[row] = _NO_FACULTY
+        self._row_teachers[row] = None
+        self._free_rows.append(row)
+        return True
+
+    def grant(self, teacher_id: str, instrument_name: str, proficiency_level: str) -> None:
+        """授予资格（已存在时更新熟练程度）"""
+        col = self.instrument_ids[instrument_name]
+        row = self._teacher_rows.get(teacher_id)
+        if row is None:
+            row = self._allocate_row(teacher_id)
+        self._cells[row, col] = PROFICIENCY_CODES[proficiency_level]
+
+    def revoke(self, teacher_id: str, instrument_name: str) -> bool:
+        """撤销资格，返回撤销前是否存在"""
+        row = self._teacher_rows.get(teacher_id)
+        col = self.instrument_ids.get(instrument_name)
+        if row is None or col is None or not self._cells[row, col]:
+            return False
+        self._cells[row, col] = 0
+        return True
+
+    def _allocate_row(self, teacher_id: str) -> int:
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self._row_teachers[row] = teacher_id
+        else:
+            row = len(self._row_teachers)
+            if row >= len(self._teacher_faculty):
+                self._grow(row + 1)
+            self._row_teachers.append(teacher_id)
+        self._teacher_rows[teacher_id] = row
+        return row
+
+    def _grow(self, min_rows: int) -> None:
+        capacity = len(self._teacher_faculty)
+        while capacity < min_rows:
+            capacity *= 2
+
+        faculty = np.full(capacity, _NO_FACULTY, dtype=np.int16)
+        faculty[:len(self._teacher_faculty)] = self._teacher_faculty
+        cells = np.zeros((capacity, self._cells.shape[1]), dtype=np.int8)
+        cells[:self._cells.shape[0]] = self._cells
+
+        self._teacher_faculty = faculty
+        self._cells = cells
+
+    def reconfigured(self, instrument_faculties: Dict[str, str]) -> 'QualificationMatrix':
+        """
+        按新的乐器配置生成新矩阵（当前矩阵不变，生成后由调用方整体替换引用）
+
+        保留的乐器整列复制，新增乐器列为空；教师行号不变，
+        教师教研室按标识重新编号（新配置中不存在的教研室记为无教研室）
+        """
+        matrix = QualificationMatrix(instrument_faculties, initial_capacity=len(self._teacher_faculty))
+        matrix._teacher_rows = dict(self._teacher_rows)
+        matrix._row_teachers = list(self._row_teachers)
+        matrix._free_rows = list(self._free_rows)
+
+        kept = [(col, self.instrument_ids[name]) for col, name in enumerate(matrix.instrument_names)
+                if name in self.instrument_ids]
+        if kept:
+            new_cols, old_cols = (list(cols) for cols in zip(*kept))
+            matrix._cells[:, new_cols] = self._cells[:, old_cols]
+
+        # 末尾追加一项，使无教研室（-1）映射为无教研室
+        remap = np.array(
+            [matrix.faculty_ids.get(key, _NO_FACULTY) for key in self.faculty_keys] + [_NO_FACULTY],
+            dtype=np.int16
+        )
+        matrix._teacher_faculty = remap[self._teacher_faculty]
+        return matrix
+
+    # -------------------------------------------------
+    # 单次查询（O(1)）
+    # -------------------------------------------------
+
+    def has_teacher(self, teacher_id: str) -> bool:
+        return teacher_id in self._teacher_rows
+
+    def proficiency(self, teacher_id: str, instrument_name: str) -> Optional[str]:
+        """获取熟练程度，无资格时返回 None"""
+        row = self._teacher_rows.get(teacher_id)
+        col = self.instrument_ids.get(instrument_name)
+        if row is None or col is None:
+            return None
+        code = int(self._cells[row, col])
+        return PROFICIENCY_LEVELS[code - 1] if code else None
+
+    def check(self, teacher_id: str, instrument_name: str) -> int:
+        """校验单个 (教师, 乐器)，返回原因码（0 表示通过）"""
+        col = self.instrument_ids.get(instrument_name)
+        if col is None:
+            return QUAL_UNKNOWN_INSTRUMENT | QUAL_FACULTY_MISMATCH | QUAL_NOT_GRANTED
+
+        row = self._teacher_rows.get(teacher_id)
+        if row is None:
+            return QUAL_UNKNOWN_TEACHER | QUAL_FACULTY_MISMATCH | QUAL_NOT_GRANTED
+
+        flags = QUAL_OK
+        if self._teacher_faculty[row] != self._instrument_faculty[col]:
+            flags |= QUAL_FACULTY_MISMATCH
+        if not self._cells[row, col]:
+            flags |= QUAL_NOT_GRANTED
+        return flags
+
+    def instrument_faculty(self, instrument_name: str) -> Optional[str]:
+        """乐器所属教研室"""
+        col = self.instrument_ids.get(instrument_name)
+        if col is None:
+            return None
+        return self.faculty_keys[self._instrument_faculty[col]]
+
+    def teacher_instruments(self, teacher_id: str) -> List[Tuple[str, str]]:
+        """教师已获资格的 (乐器, 熟练程度) 列表"""
+        row = self._teacher_rows.get(teacher_id)
+        if row is None:
+            return []
+        cells = self._cells[row]
+        return [
+            (self.instrument_names[col], PROFICIENCY_LEVELS[int(cells[col]) - 1])
+            for col in np.flatnonzero(cells)
+        ]
+
+    # -------------------------------------------------
+    # 向量化查询
+    # -------------------------------------------------
+
+    def teachers_for(
+        self,
+        instrument_name: str,
+        min_level: str = 'assistant',
+        require_faculty_match: bool = True
+    ) -> List[str]:
+        """可教授指定乐器的教师ID列表"""
+        col = self.instrument_ids.get(instrument_name)
+        if col is None:
+            return []
+
+        used = len(self._row_teachers)
+        mask = self._cells[:used, col] >= PROFICIENCY_CODES[min_level]
+        if require_faculty_match:
+            mask &= self._teacher_faculty[:used] == self._instrument_faculty[col]
+
+        return [self._row_teachers[row] for row in np.flatnonzero(mask)]
+
+    def teacher_rows(self, teacher_ids: Iterable[str]) -> np.ndarray:
+        """教师ID -> 行号数组（未登记为 -1）"""
+        rows = self._teacher_rows
+        return np.fromiter((rows.get(t, -1) for t in teacher_ids), dtype=np.int64)
+
+    def instrument_cols(self, instrument_names: Iterable[str]) -> np.ndarray:
+        """乐器名称 -> 列号数组（未知乐器为 -1）"""
+        ids = self.instrument_ids
+        return np.fromiter((ids.get(i, -1) for i in instrument_names), dtype=np.int64)
+
+    def validate_pairs(
+        self,
+        teacher_ids: Sequence[str],
+        instrument_names: Sequence[str]
+    ) -> np.ndarray:
+        """批量校验 (教师, 乐器) 对，返回与输入等长的原因码数组（uint8）"""
+        rows = self.teacher_rows(teacher_ids)
+        cols = self.instrument_cols(instrument_names)
+        return self._validate_rows_cols(rows, cols)
+
+    def validate_grid(
+        self,
+        teacher_ids: Sequence[str],
+        instrument_names: Sequence[str]
+    ) -> np.ndarray:
+        """教师 × 乐器 全组合校验，返回 (教师数, 乐器数) 的原因码矩阵"""
+        rows = self.teacher_rows(teacher_ids)
+        cols = self.instrument_cols(instrument_names)
+        return self._validate_rows_cols(rows[:, None], cols[None, :])
+
+    def _validate_rows_cols(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        rows, cols = np.broadcast_arrays(rows, cols)
+        unknown_teacher = rows < 0
+        unknown_instrument = cols < 0
+        safe_rows = np.where(unknown_teacher, 0, rows)
+        safe_cols = np.where(unknown_instrument, 0, cols)
+
+        if self._cells.shape[1]:
+            granted = self._cells[safe_rows, safe_cols] > 0
+            same_faculty = (
+                self._teacher_faculty[safe_rows] == self._instrument_faculty[safe_cols]
+            )
+        else:
+            granted = np.zeros(rows.shape, dtype=bool)
+            same_faculty = np.zeros(rows.shape, dtype=bool)
+
+        invalid = unknown_teacher | unknown_instrument
+        flags = np.zeros(rows.shape, dtype=np.uint8)
+        flags[~same_faculty | invalid] |= QUAL_FACULTY_MISMATCH
+        flags[~granted | invalid] |= QUAL_NOT_GRANTED
+        flags[unknown_instrument] |= QUAL_UNKNOWN_INSTRUMENT
+        flags[unknown_teacher] |= QUAL_UNKNOWN_TEACHER
+        return flags
@@ -0,0 +1,130 @@
+"""
+教室分配引擎
+将待分配教室的课程按时段分组，每个时段内在 课程×空闲教室 二分图上求最大匹配；
+候选教室按容量从小到大排列，优先匹配最小可容纳教室
+"""
+
+from typing import Callable, Dict, Hashable, Iterable, List, Tuple
+
+from room_registry import RoomRegistry
+
+
+def _max_matching(adjacency: List[List[str]]) -> Dict[int, str]:
+    """
+    二分图最大匹配（增广路算法）
+
+    Args:
+        adjacency: 第 i 门课程的候选教室列表（按优先顺序）
+
+    Returns:
+        课程序号 -> 教室ID
+    """
+    room_owner: Dict[str, int] = {}
+    matched: Dict[int, str] = {}
+
+    # 先按优先顺序贪心匹配，再为剩余课程寻找增广路
+    for left, rooms in enumerate(adjacency):
+        for room_id in rooms:
+            if room_id not in room_owner:
+                room_owner[room_id] = left
+                matched[left] = room_id
+                break
+
+    for left in range(len(adjacency)):
+        if left in matched:
+            continue
+
+        visited = set()
+        # 栈中保存 (课程序号, 下一个候选下标)，parent 记录增广路上教室的来源课程
+        stack: List[List[int]] = [[left, 0]]
+        parent: Dict[str, int] = {}
+        end_room = None
+
+        while stack and end_room is None:
+            frame = stack[-1]
+            node, index = frame
+            rooms = adjacency[node]
+            if index >= len(rooms):
+                stack.pop()
+                continue
+            frame[1] += 1
+
+            room_id = rooms[index]
+            if room_id in visited:
+                continue
+            visited.add(room_id)
+            parent[room_id] = node
+
+            owner = room_owner.get(room_id)
+            if owner is None:
+                end_room = room_id
+            else:
+                stack.append([owner, 0])
+
+        if end_room is None:
+            continue
+
+        # 沿增广路翻转匹配
+        room_id = end_room
+        while room_id is not None:
+            node = parent[room_id]
+            previous = matched.get(node)
+            matched[node] = room_id
+            room_owner[room_id] = node
+            room_id = previous if node != left else None
+
+    return matched
+
+
+def assign_rooms(
+    requests: Iterable[Dict],
+    registry: RoomRegistry,
+    is_room_busy: Callable[[str, Hashable], bool]
+) -> Tuple[Dict[str, str], List[str]]:
+    """
+    为一批课程分配教室
+
+    Args:
+        requests: 待分配课程，每项包含 class_id、slot（时段键，可哈希）、
+                  required_capacity、faculty_code
+        registry: 教室登记表
+        is_room_busy: (room_id, slot) -> 教室在该时段是否已被占用
+
+    Returns:
+        (class_id -> room_id, 未能分配的 class_id 列表)
+    """
+    by_slot: Dict[Hashable, List[Dict]] = {}
+    for item in requests:
+        by_slot.setdefault(item['slot'], []).append(item)
+
+    candidate_cache: Dict[tuple, List[str]] = {}
+    assignments: Dict[str, str] = {}
+    unassigned: List[str] = []
+
+    for slot, items in by_slot.items():
+        busy_cache: Dict[str, bool] = {}
+        adjacency = []
+        for item in items:
+            key = (item['required_capacity'], item.get('faculty_code'))
+            candidates = candidate_cache.get(key)
+            if candidates is None:
+                candidates = candidate_cache[key] = registry.candidates(*key)
+
+            free = []
+            for room_id in candidates:
+                busy = busy_cache.get(room_id)
+                if busy is None:
+                    busy = busy_cache[room_id] = is_room_busy(room_id, slot)
+                if not busy:
+                    free.append(room_id)
+            adjacency.append(free)
+
+        matched = _max_matching(adjacency)
+        for index, item in enumerate(items):
+            room_id = matched.get(index)
+            if room_id is None:
+                unassigned.append(item['class_id'])
+            else:
+                assignments[item['class_id']] = room_id
+
+    return assignments, unassigned
@@ -0,0 +1,153 @@
+"""
+教室登记与索引
+按教室类型保存按容量排序的教室列表，按 (类型, 最小容量) 查询可用教室为二分查找
+"""
+
+import bisect
+from typing import Dict, Iterable, List, Optional
+
+# 教室类型及模板默认容量（与前端教室导入模板一致）
+ROOM_TYPE_CAPACITY = {
+    '琴房': 1,
+    '教室': 30,
+    '大教室': 50,
+    '排练厅': 50
+}
+
+# 教研室可使用的教室类型（与前端 scheduler.findSuitableRoom 规则一致）
+ROOM_TYPES_BY_FACULTY = {
+    'PIANO': ('琴房',),
+    'VOCAL': ('琴房', '教室', '大教室'),
+    'INSTRUMENT': ('琴房', '大教室', '排练厅')
+}
+DEFAULT_ROOM_TYPES = ('教室',)
+
+
+class RoomError(ValueError):
+    """教室数据不合法"""
+
+
+class RoomRegistry:
+    """
+    教室登记表
+
+    - rooms: room_id -> 教室字典（id, room_name, room_type, capacity, faculty_code）
+    - 按类型维护 (容量, room_id) 有序列表，候选教室按容量从小到大返回，便于优先使用最小可容纳教室
+    """
+
+    def __init__(self):
+        self._rooms: Dict[str, Dict] = {}
+        self._by_type: Dict[str, List[tuple]] = {room_type: [] for room_type in ROOM_TYPE_CAPACITY}
+        # 可选的写入监听：listener(room_id, 教室字典（删除时为 None）)
+        self.listener = None
+
+    def attach_listener(self, listener):
+        """挂载写入监听（持久化），upsert 与 remove 各通知一次"""
+        self.listener = listener
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def __contains__(self, room_id: str) -> bool:
+        return room_id in self._rooms
+
+    def get(self, room_id: str) -> Optional[Dict]:
+        return self._rooms.get(room_id)
+
+    def rooms(self) -> List[Dict]:
+        return list(self._rooms.values())
+
+    # -------------------------------------------------
+    # 维护
+    # -------------------------------------------------
+
+    @staticmethod
+    def normalize(room: Dict) -> Dict:
+        """校验并规范化教室记录，未指定容量时使用类型默认容量"""
+        room_id = room.get('id')
+        if not room_id:
+            raise RoomError("缺少教室ID")
+
+        room_type = room.get('room_type', '琴房')
+        if room_type not in ROOM_TYPE_CAPACITY:
+            raise RoomError(f"不支持的教室类型: {room_type}")
+
+        try:
+            capacity = int(room.get('capacity') or ROOM_TYPE_CAPACITY[room_type])
+        except (TypeError, ValueError):
+            raise RoomError("教室容量必须为整数")
+        if capacity <= 0:
+            raise RoomError("教室容量必须大于0")
+
+        return {
+            "id": str(room_id),
+            "room_name": room.get('room_name', ''),
+            "room_type": room_type,
+            "capacity": capacity,
+            "faculty_code": room.get('faculty_code')
+        }
+
+    def upsert(self, room: Dict) -> Dict:
+        normalized = self.normalize(room)
+        self._discard(normalized['id'])
+        self._rooms[normalized['id']] = normalized
+        bisect.insort(self._by_type[normalized['room_type']], (normalized['capacity'], normalized['id']))
+        if self.listener is not None:
+            self.listener(normalized['id'], normalized)
+        return normalized
+
+    def bulk_load(self, rooms: Iterable[Dict]) -> List[Dict]:
+        """批量登记：全部校验通过后才写入"""
+        normalized = [self.normalize(room) for room in rooms]
+        return [self.upsert(room) for room in normalized]
+
+    def remove(self, room_id: str) -> bool:
+        removed = self._discard(room_id)
+        if removed and self.listener is not None:
+            self.listener(room_id, None)
+        return removed
+
+    def _discard(self, room_id: str) -> bool:
+        room = self._rooms.pop(room_id, None)
+        if room is None:
+            return False
+        entries = self._by_type[room['room_type']]
+        index = bisect.bisect_left(entries, (room['capacity'], room_id))
+        if index < len(entries) and entries[index] == (room['capacity'], room_id):
+            entries.pop(index)
+        return True
+
+    # -------------------------------------------------
+    # 查询
+    # -------------------------------------------------
+
+    @staticmethod
+    def room_types_for(faculty_code: Optional[str]) -> tuple:
+        return ROOM_TYPES_BY_FACULTY.get(faculty_code, DEFAULT_ROOM_TYPES)
+
+    def is_suitable(self, room_id: str, required_capacity: int, faculty_code: Optional[str] = None) -> bool:
+        """教室类型、容量与专属教研室是否满足课程要求"""
+        room = self._rooms.get(room_id)
+        if room is None:
+            return False
+        return (
+            room['room_type'] in self.room_types_for(faculty_code)
+            and room['capacity'] >= required_capacity
+            and (not room['faculty_code'] or not faculty_code or room['faculty_code'] == faculty_code)
+        )
+
+    def candidates(self, required_capacity: int, faculty_code: Optional[str] = None) -> List[str]:
+        """
+        满足要求的教室ID，按容量从小到大排列（同容量时教研室专属教室优先）
+        """
+        matches = []
+        for room_type in self.room_types_for(faculty_code):
+            entries = self._by_type[room_type]
+            start = bisect.bisect_left(entries, (required_capacity, ''))
+            for capacity, room_id in entries[start:]:
+                room_faculty = self._rooms[room_id]['faculty_code']
+                if room_faculty and faculty_code and room_faculty != faculty_code:
+                    continue
+                matches.append((capacity, 0 if room_faculty else 1, room_id))
+        matches.sort()
+        return [room_id for _, _, room_id in matches]
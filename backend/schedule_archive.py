@@ -0,0 +1,458 @@
+"""
+排课记录归档段
+过往学期的排课记录按学期写入磁盘归档段，在线存储只保留当前学期（及未指定日期的每周循环课），
+全量扫描与索引的规模与当前学期成正比；归档段按需打开、按列解压后查询。
+同一格式也用于排课数据的导出与导入，历史工作量统计直接在整数列上计算，不还原为字典
+
+归档段格式（按列保存，ID 字段使用段内字典编码，每列单独压缩）：
+    MAGIC | 头部长度(u32) | 头部 JSON | 各列压缩数据
+    头部: {"rows", "meta", "codec", "sections": [[名称, 类型码, 偏移, 压缩长度, 原始长度]]}
+    字典段名为 "dict:<字段>"（按换行分隔的字符串，段内编号即下标），"ids" 为排课ID
+    codec 为 zlib 或 zstd（需安装 zstandard，未安装时只能读写 zlib 段）
+"""
+
+import importlib.util
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from schedule_store import ScheduleRecord, ScheduleStore, HOURS_SCALE, format_date_ordinal
+
+ARCHIVE_MAGIC = b'MSARCH01'
+SEGMENT_SUFFIX = '.seg'
+
+# 字典编码字段 -> ScheduleStore 驻留表
+DICTIONARY_FIELDS = (
+    ('teacher', 'teachers'),
+    ('course', 'courses'),
+    ('room', 'rooms'),
+    ('student', 'students'),
+    ('faculty', 'faculties'),
+    ('status', 'statuses')
+)
+
+# 列类型码（array 类型码）
+COLUMN_TYPES = {
+    'teacher': 'i', 'course': 'i', 'room': 'i', 'student': 'i', 'faculty': 'i', 'status': 'i',
+    'day_of_week': 'b', 'period': 'b', 'date': 'i', 'created_at': 'q', 'hours': 'i'
+}
+
+# 压缩算法：安装了 zstandard 时默认使用 zstd（压缩与解压更快），否则使用 zlib
+ZSTD_AVAILABLE = importlib.util.find_spec('zstandard') is not None
+CODECS = ('zstd', 'zlib') if ZSTD_AVAILABLE else ('zlib',)
+DEFAULT_CODEC = CODECS[0]
+
+# 同时保持打开的归档段数
+MAX_OPEN_SEGMENTS = 8
+
+
+class ArchiveError(ValueError):
+    """归档数据不合法"""
+
+
+def compress(codec: str, raw: bytes) -> bytes:
+    if codec == 'zlib':
+        return zlib.compress(raw, 6)
+    if codec == 'zstd' and ZSTD_AVAILABLE:
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).compress(raw)
+    raise ArchiveError(f"不支持的压缩算法: {codec}")
+
+
+def decompress(codec: str, data, raw_length: int) -> bytes:
+    if codec not in CODECS:
+        raise ArchiveError(f"不支持的压缩算法: {codec}（zstd 需要安装 zstandard）")
+    try:
+        if codec == 'zlib':
+            return zlib.decompress(data, bufsize=max(raw_length, 1))
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data, max_output_size=raw_length)
+    except Exception as e:
+        raise ArchiveError(f"归档段解压失败: {e}")
+
+
+def encode_records(store: ScheduleStore, records: Iterable[ScheduleRecord]) -> Tuple[List[str], Dict[str, array], Dict[str, List[str]]]:
+    """
+    将在线记录编码为列（ID 字段重新编号为段内连续编号，只保留段内用到的字符串）
+
+    Returns:
+        (排课ID列表, 字段 -> 列, 字段 -> 字典)
+    """
+    records = list(records)
+    columns = {name: array(typecode) for name, typecode in COLUMN_TYPES.items()}
+    dictionaries: Dict[str, List[str]] = {}
+
+    for field, interner_name in DICTIONARY_FIELDS:
+        interner = getattr(store, interner_name)
+        local: Dict[int, int] = {}
+        values: List[str] = []
+        column = columns[field]
+        for record in records:
+            idx = getattr(record, field)
+            if idx < 0:
+                column.append(-1)
+                continue
+            local_idx = local.get(idx)
+            if local_idx is None:
+                local_idx = local[idx] = len(values)
+                values.append(interner.value(idx))
+            column.append(local_idx)
+        dictionaries[field] = values
+
+    for field in ('day_of_week', 'period', 'date', 'created_at', 'hours'):
+        columns[field].extend(getattr(record, field) for record in records)
+    return [record.id for record in records], columns, dictionaries
+
+
+def encode_segment(ids: List[str], columns: Dict[str, array], dictionaries: Dict[str, List[str]],
+                   meta: Optional[Dict] = None, codec: str = DEFAULT_CODEC) -> bytes:
+    """编码为归档段字节"""
+    sections = [('ids', 'utf8', '\n'.join(ids).encode('utf-8'))]
+    sections.extend((f'dict:{field}', 'utf8', '\n'.join(values).encode('utf-8'))
+                    for field, values in dictionaries.items())
+    sections.extend((name, column.typecode, column.tobytes()) for name, column in columns.items())
+
+    header_sections, blobs, offset = [], [], 0
+    for name, kind, raw in sections:
+        blob = compress(codec, raw)
+        header_sections.append([name, kind, offset, len(blob), len(raw)])
+        blobs.append(blob)
+        offset += len(blob)
+    header = json.dumps({
+        "rows": len(ids),
+        "meta": meta or {},
+        "codec": codec,
+        "sections": header_sections
+    }, ensure_ascii=False).encode('utf-8')
+    return b''.join([ARCHIVE_MAGIC, struct.pack('<I', len(header)), header] + blobs)
+
+
+def write_segment(path: str, data: bytes):
+    """写入归档段文件（先写临时文件并落盘，再原子替换）"""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class ArchiveSegment:
+    """
+    只读归档段
+
+    - 打开时通过 mmap 映射文件并只解析头部，列与字典在首次访问时解压并缓存
+    - 查询先在整数列上筛选行号，只为命中的行构造字典
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._cache: Dict[str, object] = {}
+        self._lookups: Dict[str, Dict[str, int]] = {}
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ArchiveError(f"归档段为空: {os.path.basename(path)}")
+        if self._mmap[:len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC:
+            self.close()
+            raise ArchiveError(f"归档段格式错误: {os.path.basename(path)}")
+        try:
+            header_length = struct.unpack_from('<I', self._mmap, len(ARCHIVE_MAGIC))[0]
+            header_start = len(ARCHIVE_MAGIC) + 4
+            header = json.loads(bytes(self._mmap[header_start:header_start + header_length]))
+            self.rows: int = header['rows']
+            self.meta: Dict = header['meta']
+            self.codec: str = header['codec']
+            self._base = header_start + header_length
+            self._sections = {name: (kind, offset, length, raw_length)
+                              for name, kind, offset, length, raw_length in header['sections']}
+        except (struct.error, ValueError, KeyError, TypeError):
+            self.close()
+            raise ArchiveError(f"归档段头部损坏: {os.path.basename(path)}")
+
+    def close(self):
+        self._cache.clear()
+        self._mmap.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _raw(self, name: str) -> bytes:
+        kind, offset, length, raw_length = self._sections[name]
+        start = self._base + offset
+        with memoryview(self._mmap) as view:
+            return decompress(self.codec, view[start:start + length], raw_length)
+
+    def verify(self):
+        """校验段结构（导入前调用）：各列齐全、长度与行数一致、字典编号不越界"""
+        missing = [name for name in ['ids'] + [f'dict:{field}' for field, _ in DICTIONARY_FIELDS] + list(COLUMN_TYPES)
+                   if name not in self._sections]
+        if missing:
+            raise ArchiveError(f"归档段缺少列: {', '.join(missing)}")
+        if self.codec not in CODECS:
+            raise ArchiveError(f"不支持的压缩算法: {self.codec}")
+        size = len(self._mmap)
+        for name, (_, offset, length, _) in self._sections.items():
+            if self._base + offset + length > size:
+                raise ArchiveError(f"归档段数据不完整: {name}")
+        try:
+            ids = self.strings('ids')
+            columns = {name: self.column(name) for name in COLUMN_TYPES}
+        except ArchiveError:
+            raise
+        except ValueError as e:  # 列长度不是元素大小的整数倍、字符串不是 UTF-8
+            raise ArchiveError(f"归档段数据损坏: {e}")
+        if len(ids) != self.rows:
+            raise ArchiveError("排课ID数与行数不一致")
+        for name, typecode in COLUMN_TYPES.items():
+            if columns[name].typecode != typecode or len(columns[name]) != self.rows:
+                raise ArchiveError(f"列 {name} 与行数不一致")
+        for field, _ in DICTIONARY_FIELDS:
+            values = np.frombuffer(columns[field], dtype=np.int32)
+            if self.rows and (values.min() < -1 or values.max() >= len(self.dictionary(field))):
+                raise ArchiveError(f"列 {field} 的字典编号越界")
+
+    def column(self, name: str) -> array:
+        """整数列（首次访问时解压）"""
+        values = self._cache.get(name)
+        if values is None:
+            values = array(self._sections[name][0])
+            values.frombytes(self._raw(name))
+            self._cache[name] = values
+        return values
+
+    def strings(self, name: str) -> List[str]:
+        """字符串段（ids 或 dict:<字段>）"""
+        values = self._cache.get(name)
+        if values is None:
+            text = self._raw(name).decode('utf-8')
+            values = self._cache[name] = text.split('\n') if text else []
+        return values
+
+    def dictionary(self, field: str) -> List[str]:
+        return self.strings(f'dict:{field}')
+
+    def lookup(self, field: str, value: str) -> int:
+        """字符串 -> 段内编号（不存在返回 -1）"""
+        index = self._lookups.get(field)
+        if index is None:
+            index = self._lookups[field] = {item: idx for idx, item in enumerate(self.dictionary(field))}
+        return index.get(value, -1)
+
+    def select(self, filters: Dict[str, str]) -> List[int]:
+        """按 ID 字段等值筛选，返回命中的行号（升序）"""
+        mask = np.ones(self.rows, dtype=bool)
+        for field, value in filters.items():
+            idx = self.lookup(field, value)
+            if idx < 0:
+                return []
+            mask &= np.frombuffer(self.column(field), dtype=np.int32) == idx
+        return np.flatnonzero(mask).tolist()
+
+    def date_mask(self, start: int = 0, end: int = 0) -> Optional[np.ndarray]:
+        """日期序数在 [start, end) 内的行（end 为 0 表示不限；两者都为 0 时返回 None 表示全部行）"""
+        if not start and not end:
+            return None
+        dates = np.frombuffer(self.column('date'), dtype=np.int32)
+        mask = dates >= max(start, 1)
+        if end:
+            mask &= dates < end
+        return mask
+
+    def totals(self, field: str, mask: Optional[np.ndarray] = None) -> Dict[str, Tuple[int, int]]:
+        """
+        按 ID 字段汇总节数与课时（直接在整数列上 bincount，不构造记录）
+
+        Returns:
+            字段值 -> (节数, 课时 * HOURS_SCALE)
+        """
+        keys = np.frombuffer(self.column(field), dtype=np.int32)
+        hours = np.frombuffer(self.column('hours'), dtype=np.int32).astype(np.int64)
+        if mask is not None:
+            keys, hours = keys[mask], hours[mask]
+        present = keys >= 0
+        keys, hours = keys[present], hours[present]
+        size = len(self.dictionary(field))
+        counts = np.bincount(keys, minlength=size)
+        sums = np.bincount(keys, weights=hours, minlength=size)
+        return {value: (int(counts[idx]), int(sums[idx]))
+                for idx, value in enumerate(self.dictionary(field)) if counts[idx]}
+
+    def to_dict(self, row: int) -> Dict:
+        """还原为 schedule_db 字典格式"""
+        def text(field: str) -> Optional[str]:
+            idx = self.column(field)[row]
+            return self.dictionary(field)[idx] if idx >= 0 else None
+
+        return {
+            "id": self.strings('ids')[row],
+            "teacher_id": text('teacher'),
+            "course_id": text('course'),
+            "room_id": text('room'),
+            "student_id": text('student'),
+            "day_of_week": self.column('day_of_week')[row],
+            "period": self.column('period')[row],
+            "date": format_date_ordinal(self.column('date')[row]),
+            "faculty_code": text('faculty'),
+            "status": text('status'),
+            "created_at": datetime.fromtimestamp(self.column('created_at')[row]).isoformat(),
+            "hours": self.column('hours')[row] / HOURS_SCALE
+        }
+
+
+def combine_segments(segments: List[ArchiveSegment]) -> Tuple[List[str], Dict[str, array], Dict[str, List[str]]]:
+    """合并多个段的列（字典合并后整列重映射编号），用于导出整个学期"""
+    ids: List[str] = []
+    columns = {name: array(typecode) for name, typecode in COLUMN_TYPES.items()}
+    dictionaries: Dict[str, List[str]] = {field: [] for field, _ in DICTIONARY_FIELDS}
+    positions: Dict[str, Dict[str, int]] = {field: {} for field, _ in DICTIONARY_FIELDS}
+
+    for segment in segments:
+        ids.extend(segment.strings('ids'))
+        for field, _ in DICTIONARY_FIELDS:
+            merged, position = dictionaries[field], positions[field]
+            remap = np.empty(len(segment.dictionary(field)) + 1, dtype=np.int32)
+            remap[-1] = -1  # 下标 -1 保持为 -1
+            for idx, value in enumerate(segment.dictionary(field)):
+                if value not in position:
+                    position[value] = len(merged)
+                    merged.append(value)
+                remap[idx] = position[value]
+            local = np.frombuffer(segment.column(field), dtype=np.int32)
+            columns[field].frombytes(remap[local].tobytes())
+        for name in ('day_of_week', 'period', 'date', 'created_at', 'hours'):
+            columns[name].extend(segment.column(name))
+    return ids, columns, dictionaries
+
+
+def workload_report(segments: Iterable[ArchiveSegment], start: int = 0, end: int = 0) -> Dict:
+    """
+    历史工作量统计：按教师与教研室汇总节数与课时
+
+    Args:
+        start / end: 日期序数范围 [start, end)，为 0 表示不限
+    """
+    teachers: Dict[str, List[int]] = {}
+    faculties: Dict[str, List[int]] = {}
+    records = 0
+    for segment in segments:
+        mask = segment.date_mask(start, end)
+        records += segment.rows if mask is None else int(mask.sum())
+        for field, totals in (('teacher', teachers), ('faculty', faculties)):
+            for value, (count, hours) in segment.totals(field, mask).items():
+                entry = totals.setdefault(value, [0, 0])
+                entry[0] += count
+                entry[1] += hours
+
+    def rows(totals: Dict[str, List[int]], key: str) -> List[Dict]:
+        ordered = sorted(totals.items(), key=lambda item: (-item[1][1], item[0]))
+        return [{key: value, "classes": count, "hours": hours / HOURS_SCALE}
+                for value, (count, hours) in ordered]
+
+    return {
+        "records": records,
+        "teachers": rows(teachers, 'teacher_id'),
+        "faculties": rows(faculties, 'faculty_code')
+    }
+
+
+def _term_file_key(academic_year: str, semester_label: str) -> str:
+    return re.sub(r'[^0-9A-Za-z_.-]', '_', f'{academic_year}__{semester_label}')
+
+
+class TermArchive:
+    """
+    按学期组织的归档目录
+
+    - 每次归档写入一个新的段文件 <学年>__<学期>-<序号>.seg，同一学期可以有多个段
+    - 段按需打开，最近使用的 MAX_OPEN_SEGMENTS 个保持打开
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._open: 'OrderedDict[str, ArchiveSegment]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _paths(self, academic_year: str, semester_label: str) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        prefix = _term_file_key(academic_year, semester_label) + '-'
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith(prefix) and name.endswith(SEGMENT_SUFFIX))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def archive(self, academic_year: str, semester_label: str, store: ScheduleStore,
+                records: List[ScheduleRecord], meta: Optional[Dict] = None) -> str:
+        """将在线记录写入该学期的新归档段，返回段文件路径"""
+        return self.add(academic_year, semester_label, *encode_records(store, records), meta=meta)
+
+    def add(self, academic_year: str, semester_label: str, ids: List[str], columns: Dict[str, array],
+            dictionaries: Dict[str, List[str]], meta: Optional[Dict] = None, codec: str = DEFAULT_CODEC) -> str:
+        """将已编码的列写入该学期的新归档段，返回段文件路径"""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            paths = self._paths(academic_year, semester_label)
+            sequence = int(paths[-1].rsplit('-', 1)[1][:-len(SEGMENT_SUFFIX)]) + 1 if paths else 1
+            path = os.path.join(
+                self.directory,
+                f'{_term_file_key(academic_year, semester_label)}-{sequence:04d}{SEGMENT_SUFFIX}'
+            )
+            write_segment(path, encode_segment(ids, columns, dictionaries, dict(
+                meta or {}, academic_year=academic_year, semester_label=semester_label
+            ), codec))
+        return path
+
+    def segment(self, path: str) -> ArchiveSegment:
+        with self._lock:
+            segment = self._open.get(path)
+            if segment is None:
+                segment = self._open[path] = ArchiveSegment(path)
+                while len(self._open) > MAX_OPEN_SEGMENTS:
+                    _, oldest = self._open.popitem(last=False)
+                    oldest.close()
+            else:
+                self._open.move_to_end(path)
+            return segment
+
+    def segments(self, academic_year: str, semester_label: str) -> List[ArchiveSegment]:
+        return [self.segment(path) for path in self._paths(academic_year, semester_label)]
+
+    def all_segments(self) -> List[ArchiveSegment]:
+        if not os.path.isdir(self.directory):
+            return []
+        return [self.segment(os.path.join(self.directory, name))
+                for name in sorted(os.listdir(self.directory)) if name.endswith(SEGMENT_SUFFIX)]
+
+    def terms(self) -> List[Dict]:
+        """已归档学期 [{academic_year, semester_label, records, segments, bytes}]"""
+        terms: Dict[Tuple[str, str], Dict] = {}
+        for segment in self.all_segments():
+            key = (segment.meta['academic_year'], segment.meta['semester_label'])
+            term = terms.setdefault(key, {
+                "academic_year": key[0], "semester_label": key[1], "records": 0, "segments": 0, "bytes": 0
+            })
+            term['records'] += len(segment)
+            term['segments'] += 1
+            term['bytes'] += os.path.getsize(segment.path)
+        return list(terms.values())
+
+    def query(self, academic_year: str, semester_label: str, filters: Dict[str, str],
+              offset: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict], int]:
+        """查询归档学期的记录，返回 (当前页记录, 命中总数)"""
+        hits = [(segment, row) for segment in self.segments(academic_year, semester_label)
+                for row in segment.select(filters)]
+        end = len(hits) if limit is None else offset + limit
+        return [segment.to_dict(row) for segment, row in hits[offset:end]], len(hits)
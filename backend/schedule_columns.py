@@ -0,0 +1,157 @@
+"""
+排课记录列式存储
+将排课记录镜像为 NumPy 列（教师/教室/教研室编号、星期、节次、日期序数），
+工作量、分布与计数统计使用 bincount / 掩码向量化计算
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+from schedule_store import ScheduleRecord, format_date_ordinal
+
+
+class ScheduleColumns:
+    """
+    排课记录列式镜像
+
+    - 每条记录占一行，删除时仅标记失效，失效行过半时压缩
+    - 由 ScheduleStore.attach_columns() 挂载后随写入同步维护
+    """
+
+    _COLUMNS = (
+        ('teacher_idx', np.int32),
+        ('room_idx', np.int32),
+        ('faculty_idx', np.int16),
+        ('day', np.int8),
+        ('period', np.int8),
+        ('date_ordinal', np.int32),
+        ('alive', np.bool_)
+    )
+
+    def __init__(self, initial_capacity: int = 1024):
+        capacity = max(1, initial_capacity)
+        for name, dtype in self._COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self._rows: Dict[str, int] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # -------------------------------------------------
+    # 维护
+    # -------------------------------------------------
+
+    def append(self, record: ScheduleRecord):
+        if self._size >= len(self.alive):
+            self._grow()
+
+        row = self._size
+        self.teacher_idx[row] = record.teacher
+        self.room_idx[row] = record.room
+        self.faculty_idx[row] = record.faculty
+        self.day[row] = record.day_of_week
+        self.period[row] = record.period
+        self.date_ordinal[row] = record.date
+        self.alive[row] = True
+
+        self._rows[record.id] = row
+        self._size += 1
+
+    def discard(self, class_id: str):
+        row = self._rows.pop(class_id, None)
+        if row is None:
+            return
+        self.alive[row] = False
+        if self._size > 1024 and len(self._rows) < self._size // 2:
+            self._compact()
+
+    def set_value(self, class_id: str, column: str, value: int):
+        """更新记录在某一列上的值（如重新分配教室）"""
+        row = self._rows.get(class_id)
+        if row is not None:
+            getattr(self, column)[row] = value
+
+    def _grow(self):
+        capacity = len(self.alive) * 2
+        for name, _ in self._COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def _compact(self):
+        """移除失效行并重建行号"""
+        keep = np.flatnonzero(self.alive[:self._size])
+        remap = np.full(self._size, -1, dtype=np.int64)
+        remap[keep] = np.arange(len(keep))
+
+        for name, _ in self._COLUMNS:
+            column = getattr(self, name)
+            column[:len(keep)] = column[keep]
+            column[len(keep):self._size] = 0
+        self._rows = {class_id: int(remap[row]) for class_id, row in self._rows.items()}
+        self._size = len(keep)
+
+    # -------------------------------------------------
+    # 向量化统计
+    # -------------------------------------------------
+
+    def _live(self) -> slice:
+        return slice(0, self._size)
+
+    def count_by(self, column: str, size: int) -> np.ndarray:
+        """按编号列计数（失效行与 -1 编号不计入），返回长度为 size 的数组"""
+        live = self._live()
+        values = getattr(self, column)[live]
+        mask = self.alive[live] & (values >= 0)
+        return np.bincount(values[mask], minlength=size)[:size]
+
+    def day_distributions(self, group_column: str, size: int) -> List[Dict[str, int]]:
+        """
+        按分组编号统计按日分布，一次 bincount 完成全部分组
+
+        有日期的记录按 YYYY-MM-DD 统计，无日期的按星期数字统计
+
+        Args:
+            group_column: 分组列（如 faculty_idx、teacher_idx）
+            size: 分组数量
+
+        Returns:
+            长度为 size 的列表，第 i 项为编号 i 的 {日期或星期: 排课数}
+        """
+        live = self._live()
+        groups = getattr(self, group_column)[live].astype(np.int32)
+        ordinals = self.date_ordinal[live]
+        valid = self.alive[live] & (groups >= 0) & (groups < size)
+        dated = valid & (ordinals > 0)
+
+        # 有日期的记录编码为 分组 * 日期跨度 + 日期偏移，无日期的排在其后按 分组 * 8 + 星期 编码，
+        # 失效行落入最后一个桶，整体只做一次 bincount，避免布尔筛选带来的复制
+        first, span = 0, 1
+        if dated.any():
+            first = int(np.where(dated, ordinals, np.iinfo(np.int32).max).min())
+            span = int(np.where(dated, ordinals, 0).max()) - first + 1
+
+        undated_base = size * span
+        trash = undated_base + size * 8
+        dated_keys = groups * span
+        dated_keys += ordinals
+        dated_keys -= first
+        undated_keys = groups * 8
+        undated_keys += self.day[live]
+        undated_keys += undated_base
+        keys = np.where(dated, dated_keys, np.where(valid, undated_keys, trash))
+        counts = np.bincount(keys, minlength=trash + 1)
+
+        distributions: List[Dict[str, int]] = [{} for _ in range(size)]
+        for key in np.flatnonzero(counts[:trash]).tolist():
+            if key < undated_base:
+                group, offset = divmod(key, span)
+                distributions[group][format_date_ordinal(first + offset)] = int(counts[key])
+            else:
+                group, day = divmod(key - undated_base, 8)
+                distributions[group][str(day)] = int(counts[key])
+
+        return distributions
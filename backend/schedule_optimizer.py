@@ -0,0 +1,265 @@
+"""
+排课质量评分与局部搜索优化
+评分项（越低越好）：教师空堂、教师每周在优选日间的负载均衡、学生相邻两节课换教室、软偏好；
+优化使用模拟退火，每次移动一节课并只重算受影响的 教师/学生 日桶，增量计算分值变化
+"""
+
+import math
+import random
+import time
+from datetime import date as date_cls, timedelta
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+DEFAULT_WEIGHTS = {
+    'teacher_gaps': 1.0,      # 教师当天首末节之间的空堂节数
+    'load_balance': 0.5,      # 教师每周各优选日课程数的平方和（越均衡越小）
+    'student_travel': 2.0,    # 学生相邻两节课不在同一教室
+    'preferences': 3.0,       # 课程不在优选日或优选节次
+    'changes': 0.1            # 课程离开原时段（避免无收益的调整）
+}
+
+
+def _gaps(mask: int) -> int:
+    """位图首末位之间的空位数"""
+    if not mask:
+        return 0
+    low = (mask & -mask).bit_length()
+    return mask.bit_length() - low + 1 - bin(mask).count('1')
+
+
+class ScheduleClass:
+    """优化模型中的一节课"""
+
+    __slots__ = ('id', 'teacher', 'room', 'students', 'week', 'day', 'period', 'movable', 'origin')
+
+    def __init__(self, class_id, teacher, room, students, week, day, period, movable):
+        self.id = class_id
+        self.teacher = teacher
+        self.room = room
+        self.students = students
+        self.week = week            # 所在周周一的日期序数，无日期的每周循环课程为 0
+        self.day = day
+        self.period = period
+        self.movable = movable
+        self.origin = (day, period)
+
+    def date(self) -> Optional[str]:
+        if not self.week:
+            return None
+        return (date_cls.fromordinal(self.week) + timedelta(days=self.day - 1)).isoformat()
+
+
+class ScheduleOptimizer:
+    """
+    排课局部搜索优化器
+
+    - classes: 参与评分的全部课程（不可移动的课程作为约束与评分背景）
+    - days / periods: 可移动到的星期与节次；days 同时作为负载均衡的优选日
+    - is_blocked: (课程, 星期, 节次, 日期) -> 目标时段是否禁排
+    """
+
+    def __init__(
+        self,
+        classes: Iterable[ScheduleClass],
+        days: Sequence[int],
+        periods: Sequence[int],
+        weights: Optional[Dict[str, float]] = None,
+        preferred_periods: Optional[Sequence[int]] = None,
+        is_blocked: Optional[Callable[[ScheduleClass, int, int, Optional[str]], bool]] = None,
+        seed: Optional[int] = None
+    ):
+        self.classes = list(classes)
+        self.days = list(days)
+        self.periods = list(periods)
+        self.preferred_days = set(days)
+        self.preferred_periods = set(preferred_periods) if preferred_periods else None
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.is_blocked = is_blocked
+        self.rng = random.Random(seed)
+
+        self.teacher_days: Dict[tuple, int] = {}    # (教师, 周, 星期) -> 节次位图
+        self.teacher_load: Dict[tuple, int] = {}    # (教师, 周, 星期) -> 课程数
+        self.room_days: Dict[tuple, int] = {}       # (教室, 周, 星期) -> 节次位图
+        self.student_days: Dict[tuple, Dict[int, Optional[str]]] = {}  # (学生, 周, 星期) -> {节次: 教室}
+        for cls in self.classes:
+            self._place(cls)
+        self.movable = [cls for cls in self.classes if cls.movable]
+
+    # -------------------------------------------------
+    # 占用维护
+    # -------------------------------------------------
+
+    def _place(self, cls: ScheduleClass):
+        bit = 1 << cls.period
+        key = (cls.teacher, cls.week, cls.day)
+        self.teacher_days[key] = self.teacher_days.get(key, 0) | bit
+        self.teacher_load[key] = self.teacher_load.get(key, 0) + 1
+        if cls.room is not None:
+            room_key = (cls.room, cls.week, cls.day)
+            self.room_days[room_key] = self.room_days.get(room_key, 0) | bit
+        for student in cls.students:
+            self.student_days.setdefault((student, cls.week, cls.day), {})[cls.period] = cls.room
+
+    def _unplace(self, cls: ScheduleClass):
+        bit = 1 << cls.period
+        key = (cls.teacher, cls.week, cls.day)
+        self.teacher_days[key] &= ~bit
+        self.teacher_load[key] -= 1
+        if cls.room is not None:
+            self.room_days[(cls.room, cls.week, cls.day)] &= ~bit
+        for student in cls.students:
+            self.student_days[(student, cls.week, cls.day)].pop(cls.period, None)
+
+    def _is_free(self, cls: ScheduleClass, day: int, period: int) -> bool:
+        bit = 1 << period
+        if self.teacher_days.get((cls.teacher, cls.week, day), 0) & bit:
+            return False
+        if cls.room is not None and self.room_days.get((cls.room, cls.week, day), 0) & bit:
+            return False
+        for student in cls.students:
+            if period in self.student_days.get((student, cls.week, day), ()):
+                return False
+        if self.is_blocked is not None:
+            date = (date_cls.fromordinal(cls.week) + timedelta(days=day - 1)).isoformat() if cls.week else None
+            if self.is_blocked(cls, day, period, date):
+                return False
+        return True
+
+    # -------------------------------------------------
+    # 评分
+    # -------------------------------------------------
+
+    def _teacher_day_cost(self, teacher, week, day) -> float:
+        key = (teacher, week, day)
+        load = self.teacher_load.get(key, 0)
+        balance = load * load if day in self.preferred_days else 0
+        return (
+            self.weights['teacher_gaps'] * _gaps(self.teacher_days.get(key, 0))
+            + self.weights['load_balance'] * balance
+        )
+
+    @staticmethod
+    def _travel_moves(periods: Dict[int, Optional[str]]) -> int:
+        """学生当天相邻两节课教室不同的次数"""
+        return sum(
+            1 for period, room in periods.items()
+            if room is not None and periods.get(period + 1) not in (None, room)
+        )
+
+    def _student_day_cost(self, student, week, day) -> float:
+        periods = self.student_days.get((student, week, day))
+        if not periods:
+            return 0.0
+        return self.weights['student_travel'] * self._travel_moves(periods)
+
+    def _preference_misses(self, cls: ScheduleClass) -> int:
+        misses = 0
+        if cls.day not in self.preferred_days:
+            misses += 1
+        if self.preferred_periods is not None and cls.period not in self.preferred_periods:
+            misses += 1
+        return misses
+
+    def _preference_cost(self, cls: ScheduleClass) -> float:
+        return (
+            self.weights['preferences'] * self._preference_misses(cls)
+            + self.weights['changes'] * ((cls.day, cls.period) != cls.origin)
+        )
+
+    def breakdown(self) -> Dict[str, float]:
+        """各评分项及总分（越低越好）"""
+        counts = {
+            'teacher_gaps': sum(_gaps(mask) for mask in self.teacher_days.values()),
+            'load_balance': sum(
+                load * load for (_, _, day), load in self.teacher_load.items() if day in self.preferred_days
+            ),
+            'student_travel': sum(self._travel_moves(periods) for periods in self.student_days.values()),
+            'preferences': sum(self._preference_misses(cls) for cls in self.classes),
+            'changes': sum((cls.day, cls.period) != cls.origin for cls in self.classes)
+        }
+        result = {name: count * self.weights[name] for name, count in counts.items()}
+        result['total'] = sum(result.values())
+        return {name: round(value, 3) for name, value in result.items()}
+
+    def _local_cost(self, cls: ScheduleClass, days: Tuple[int, ...]) -> float:
+        """移动 cls 时受影响部分的分值（教师与其学生在相关日的桶，以及 cls 自身的偏好与调整）"""
+        cost = self._preference_cost(cls)
+        for day in days:
+            cost += self._teacher_day_cost(cls.teacher, cls.week, day)
+            for student in cls.students:
+                cost += self._student_day_cost(student, cls.week, day)
+        return cost
+
+    # -------------------------------------------------
+    # 搜索
+    # -------------------------------------------------
+
+    def _move(self, cls: ScheduleClass, day: int, period: int):
+        self._unplace(cls)
+        cls.day, cls.period = day, period
+        self._place(cls)
+
+    def optimize(self, time_budget_ms: int = 500, initial_temperature: float = 2.0,
+                 final_temperature: float = 0.01) -> Dict:
+        """
+        模拟退火：在时间预算内随机移动可移动课程，按增量分值变化决定是否接受
+
+        Returns:
+            {"iterations", "accepted", "moves": {class_id: (星期, 节次)}}
+        """
+        if not self.movable or not self.days or not self.periods:
+            return {"iterations": 0, "accepted": 0, "moves": {}}
+
+        original = {cls.id: (cls.day, cls.period) for cls in self.movable}
+        best = dict(original)
+        current_total = best_total = self.breakdown()['total']
+
+        deadline = time.perf_counter() + time_budget_ms / 1000
+        start = time.perf_counter()
+        iterations = accepted = 0
+        ratio = final_temperature / initial_temperature
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            progress = (now - start) / max(deadline - start, 1e-9)
+            temperature = initial_temperature * ratio ** progress
+
+            # 每轮批量尝试若干次移动，减少计时开销
+            for _ in range(64):
+                iterations += 1
+                cls = self.rng.choice(self.movable)
+                day = self.rng.choice(self.days)
+                period = self.rng.choice(self.periods)
+                if (day, period) == (cls.day, cls.period) or not self._is_free(cls, day, period):
+                    continue
+
+                old_day, old_period = cls.day, cls.period
+                days = (old_day,) if old_day == day else (old_day, day)
+                before = self._local_cost(cls, days)
+                self._move(cls, day, period)
+                delta = self._local_cost(cls, days) - before
+
+                if delta <= 0 or self.rng.random() < math.exp(-delta / temperature):
+                    accepted += 1
+                    current_total += delta
+                    if current_total < best_total - 1e-9:
+                        best_total = current_total
+                        best = {item.id: (item.day, item.period) for item in self.movable}
+                else:
+                    self._move(cls, old_day, old_period)
+
+        # 回到最优解：先整体移出再放回，避免课程互换位置时占用位图被误清除
+        changed = [cls for cls in self.movable if (cls.day, cls.period) != best[cls.id]]
+        for cls in changed:
+            self._unplace(cls)
+        for cls in changed:
+            cls.day, cls.period = best[cls.id]
+            self._place(cls)
+
+        moves = {
+            cls.id: (cls.day, cls.period) for cls in self.movable
+            if (cls.day, cls.period) != original[cls.id]
+        }
+        return {"iterations": iterations, "accepted": accepted, "moves": moves}
@@ -0,0 +1,289 @@
+"""
+排课沙盒叠加层
+在线排课存储之上的写时复制视图：沙盒内的新增/修改写入 added，被删除或修改的在线记录
+复制到 removed，在线存储本身不变；内存开销只与沙盒内的变更数相关
+"""
+
+import heapq
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from schedule_store import (
+    ScheduleRecord, ScheduleStore, HOURS_SCALE, iso_week_key, parse_date_ordinal, timetable_key
+)
+
+
+class ScheduleOverlay:
+    """
+    排课存储的写时复制叠加层
+
+    - 提供与 ScheduleStore 相同的读写接口，排课、生成与教室分配逻辑可直接在其上运行
+    - added / removed 与在线存储共用驻留表，编号可直接比较
+    - diff() 返回变更集，commit() 在校验无冲突后一次性写回在线存储
+    """
+
+    def __init__(self, base: ScheduleStore):
+        self.base = base
+        self.added = ScheduleStore(share_interners=base)
+        self.removed = ScheduleStore(share_interners=base)  # 被删除或修改的在线记录快照
+
+    # 驻留表与在线存储一致
+    @property
+    def teachers(self):
+        return self.base.teachers
+
+    @property
+    def courses(self):
+        return self.base.courses
+
+    @property
+    def rooms(self):
+        return self.base.rooms
+
+    @property
+    def students(self):
+        return self.base.students
+
+    @property
+    def faculties(self):
+        return self.base.faculties
+
+    @property
+    def statuses(self):
+        return self.base.statuses
+
+    # -------------------------------------------------
+    # 写入
+    # -------------------------------------------------
+
+    def _hide_base(self, class_id: str) -> Optional[ScheduleRecord]:
+        """将在线记录复制到 removed（仅第一次），返回在线记录"""
+        if class_id in self.removed:
+            return None
+        record = self.base.get(class_id)
+        if record is not None:
+            self.removed.insert(self.base.to_dict(record))
+        return record
+
+    def insert(self, data: Dict) -> ScheduleRecord:
+        self._hide_base(data['id'])
+        return self.added.insert(data)
+
+    def remove(self, class_id: str) -> Optional[ScheduleRecord]:
+        record = self.added.remove(class_id)
+        hidden = self._hide_base(class_id)
+        return record or hidden
+
+    def set_room(self, class_id: str, room_id: Optional[str]) -> Optional[ScheduleRecord]:
+        if class_id in self.added:
+            return self.added.set_room(class_id, room_id)
+        record = self._hide_base(class_id)
+        if record is None:
+            return None
+        data = self.base.to_dict(record)
+        data['room_id'] = room_id
+        return self.added.insert(data)
+
+    # -------------------------------------------------
+    # 读取
+    # -------------------------------------------------
+
+    def _base_visible(self, class_id: str) -> bool:
+        return class_id not in self.removed and class_id in self.base
+
+    def get(self, class_id: str) -> Optional[ScheduleRecord]:
+        record = self.added.get(class_id)
+        if record is None and self._base_visible(class_id):
+            record = self.base.get(class_id)
+        return record
+
+    def __contains__(self, class_id: str) -> bool:
+        return class_id in self.added or self._base_visible(class_id)
+
+    def __len__(self) -> int:
+        return len(self.base) - len(self.removed) + len(self.added)
+
+    def __iter__(self) -> Iterator[ScheduleRecord]:
+        return self.records()
+
+    def records(self) -> Iterator[ScheduleRecord]:
+        for record in self.base.records():
+            if record.id not in self.removed:
+                yield record
+        yield from self.added.records()
+
+    def teacher_records(self, teacher_id: str) -> List[ScheduleRecord]:
+        records = [r for r in self.base.teacher_records(teacher_id) if r.id not in self.removed]
+        return records + self.added.teacher_records(teacher_id)
+
+    def _timetable(self, method: str, owner_id: str, start: int, end: int) -> List[ScheduleRecord]:
+        base = [r for r in getattr(self.base, method)(owner_id, start, end) if r.id not in self.removed]
+        return list(heapq.merge(base, getattr(self.added, method)(owner_id, start, end),
+                                key=lambda r: timetable_key(r.date, r.period)))
+
+    def teacher_timetable(self, teacher_id: str, start: int = 0, end: int = 0) -> List[ScheduleRecord]:
+        return self._timetable('teacher_timetable', teacher_id, start, end)
+
+    def student_timetable(self, student_id: str, start: int = 0, end: int = 0) -> List[ScheduleRecord]:
+        return self._timetable('student_timetable', student_id, start, end)
+
+    def group_students(self, class_id: str) -> Optional[List[str]]:
+        if class_id in self.added:
+            return self.added.group_students(class_id)
+        return self.base.group_students(class_id) if self._base_visible(class_id) else None
+
+    def record_students(self, record: ScheduleRecord) -> Tuple[int, ...]:
+        store = self.added if self.added.get(record.id) is record else self.base
+        return store.record_students(record)
+
+    def teacher_class_count(self, teacher_id: str) -> int:
+        return (
+            self.base.teacher_class_count(teacher_id)
+            - self.removed.teacher_class_count(teacher_id)
+            + self.added.teacher_class_count(teacher_id)
+        )
+
+    def unroomed_records(self) -> List[ScheduleRecord]:
+        records = [r for r in self.base.unroomed_records() if r.id not in self.removed]
+        return records + self.added.unroomed_records()
+
+    def _is_busy(self, slots: str, owner: int, period: int,
+                 date: Optional[str], day_of_week: Optional[int]) -> bool:
+        if owner < 0:
+            return False
+        day_key = ScheduleStore.day_key(date, day_of_week)
+        period = int(period)
+        if getattr(self.added, slots).is_busy(owner, day_key, period):
+            return True
+        return (
+            getattr(self.base, slots).count(owner, day_key, period)
+            > getattr(self.removed, slots).count(owner, day_key, period)
+        )
+
+    def is_teacher_busy(self, teacher_id: str, period: int,
+                        date: Optional[str] = None, day_of_week: Optional[int] = None) -> bool:
+        return self._is_busy('teacher_slots', self.teachers.lookup(teacher_id), period, date, day_of_week)
+
+    def is_room_busy(self, room_id: str, period: int,
+                     date: Optional[str] = None, day_of_week: Optional[int] = None) -> bool:
+        return self._is_busy('room_slots', self.rooms.lookup(room_id), period, date, day_of_week)
+
+    def is_student_busy(self, student_id: Optional[str], period: int,
+                        date: Optional[str] = None, day_of_week: Optional[int] = None) -> bool:
+        return self._is_busy('student_slots', self.students.lookup(student_id), period, date, day_of_week)
+
+    def teacher_weekly_hours(self, teacher_id: str, date: Optional[str] = None) -> float:
+        teacher = self.teachers.lookup(teacher_id)
+        if teacher < 0:
+            return 0.0
+
+        recurring = 0
+        weeks: Dict[int, int] = {}
+        for store, sign in ((self.base, 1), (self.added, 1), (self.removed, -1)):
+            store_recurring, store_weeks = store.teacher_hour_parts(teacher)
+            recurring += sign * store_recurring
+            for week, hours in store_weeks.items():
+                weeks[week] = weeks.get(week, 0) + sign * hours
+
+        if date:
+            dated = weeks.get(iso_week_key(parse_date_ordinal(date)), 0)
+        else:
+            dated = max(weeks.values(), default=0)
+        return (recurring + dated) / HOURS_SCALE
+
+    day_key = staticmethod(ScheduleStore.day_key)
+
+    def day_label(self, record: ScheduleRecord) -> str:
+        return self.base.day_label(record)
+
+    def count_by_faculty(self) -> Dict[str, int]:
+        counts = dict(self.base.count_by_faculty())
+        for store, sign in ((self.added, 1), (self.removed, -1)):
+            for faculty, count in store.count_by_faculty().items():
+                counts[faculty] = counts.get(faculty, 0) + sign * count
+        return counts
+
+    def day_distribution_by_faculty(self) -> Dict[str, Dict[str, int]]:
+        distributions = {
+            faculty: dict(distribution)
+            for faculty, distribution in self.base.day_distribution_by_faculty().items()
+        }
+        for store, sign in ((self.added, 1), (self.removed, -1)):
+            for faculty, distribution in store.day_distribution_by_faculty().items():
+                target = distributions.setdefault(faculty, {})
+                for label, count in distribution.items():
+                    total = target.get(label, 0) + sign * count
+                    if total:
+                        target[label] = total
+                    else:
+                        target.pop(label, None)
+        return distributions
+
+    def to_dict(self, record: ScheduleRecord) -> Dict:
+        return self.base.to_dict(record)
+
+    # -------------------------------------------------
+    # 变更集
+    # -------------------------------------------------
+
+    def diff(self) -> Dict[str, List]:
+        """
+        沙盒相对在线存储的变更
+
+        Returns:
+            {"added": [记录], "removed": [记录], "modified": [{"before", "after"}]}
+        """
+        added, modified = [], []
+        for record in self.added.records():
+            snapshot = self.removed.get(record.id)
+            if snapshot is None:
+                added.append(self.added.to_dict(record))
+            else:
+                modified.append({
+                    "before": self.removed.to_dict(snapshot),
+                    "after": self.added.to_dict(record)
+                })
+        removed = [
+            self.removed.to_dict(record) for record in self.removed.records()
+            if record.id not in self.added
+        ]
+        return {"added": added, "removed": removed, "modified": modified}
+
+    def conflicts(self) -> List[str]:
+        """提交前检查：沙盒创建后在线存储中被改动的记录，以及已被在线记录占用的时段"""
+        messages = []
+        for snapshot in self.removed.records():
+            current = self.base.get(snapshot.id)
+            if current is None:
+                messages.append(f"排课记录 {snapshot.id} 已被删除")
+            elif self.base.to_dict(current) != self.removed.to_dict(snapshot):
+                messages.append(f"排课记录 {snapshot.id} 已被修改")
+
+        for record in self.added.records():
+            for day_key in ((record.date,) if record.date else (record.day_of_week,)):
+                if (
+                    self.base.teacher_slots.count(record.teacher, day_key, record.period)
+                    > self.removed.teacher_slots.count(record.teacher, day_key, record.period)
+                ):
+                    messages.append(f"排课记录 {record.id} 的教师时段已被占用")
+                if record.room >= 0 and (
+                    self.base.room_slots.count(record.room, day_key, record.period)
+                    > self.removed.room_slots.count(record.room, day_key, record.period)
+                ):
+                    messages.append(f"排课记录 {record.id} 的教室时段已被占用")
+                if any(
+                    self.base.student_slots.count(student, day_key, record.period)
+                    > self.removed.student_slots.count(student, day_key, record.period)
+                    for student in self.added.record_students(record)
+                ):
+                    messages.append(f"排课记录 {record.id} 的学生时段已被占用")
+        return messages
+
+    def commit(self) -> Dict[str, int]:
+        """将变更写回在线存储（调用方负责加锁并先检查 conflicts()）"""
+        removed = [record.id for record in self.removed.records()]
+        added = [self.added.to_dict(record) for record in self.added.records()]
+        for class_id in removed:
+            self.base.remove(class_id)
+        for data in added:
+            self.base.insert(data)
+        return {"added": len(added), "removed": len(removed)}
@@ -0,0 +1,760 @@
+"""
+排课记录紧凑存储
+排课记录使用 __slots__ 对象保存，教师/教室/课程/学生ID驻留为小整数，
+日期保存为序数，创建时间保存为时间戳；仅在序列化时构造字典
+"""
+
+HOURS_SCALE = 100  # 课时按 0.01 为单位保存为整数
+
+import gc
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date as date_cls, datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+_NO_ID = -1
+
+
+class StringInterner:
+    """字符串驻留表：字符串 <-> 连续小整数编号"""
+
+    __slots__ = ('_ids', '_values')
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._values: List[str] = []
+
+    def intern(self, value: Optional[str]) -> int:
+        """获取编号，不存在时分配新编号；None 编码为 -1"""
+        if value is None:
+            return _NO_ID
+        idx = self._ids.get(value)
+        if idx is None:
+            idx = self._ids[value] = len(self._values)
+            self._values.append(value)
+        return idx
+
+    def lookup(self, value: Optional[str]) -> int:
+        """仅查询编号，不分配；未登记返回 -1"""
+        if value is None:
+            return _NO_ID
+        return self._ids.get(value, _NO_ID)
+
+    def value(self, idx: int) -> Optional[str]:
+        return self._values[idx] if idx >= 0 else None
+
+    def values(self) -> List[str]:
+        return self._values
+
+    def load(self, values: List[str]):
+        """整体替换驻留表（从快照恢复）"""
+        self._values = list(values)
+        self._ids = {value: idx for idx, value in enumerate(self._values)}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class ScheduleRecord:
+    """单条排课记录（紧凑表示）"""
+
+    __slots__ = (
+        'id', 'teacher', 'course', 'room', 'student',
+        'day_of_week', 'period', 'date', 'faculty', 'status', 'created_at', 'hours'
+    )
+
+    def __init__(self, class_id, teacher, course, room, student,
+                 day_of_week, period, date, faculty, status, created_at, hours):
+        self.id = class_id              # 排课ID（与存储字典键共享同一字符串）
+        self.teacher = teacher          # 教师编号
+        self.course = course            # 课程编号
+        self.room = room                # 教室编号（-1 表示待分配）
+        self.student = student          # 学生编号（-1 表示无）
+        self.day_of_week = day_of_week  # 星期 1-7
+        self.period = period            # 节次
+        self.date = date                # 日期序数（0 表示未指定日期）
+        self.faculty = faculty          # 教研室编号
+        self.status = status            # 状态编号
+        self.created_at = created_at    # 创建时间（Unix 秒）
+        self.hours = hours              # 标准课时（乘以 HOURS_SCALE 的整数）
+
+
+def parse_date_ordinal(value: Optional[str]) -> int:
+    """YYYY-MM-DD -> 日期序数，空值返回 0；格式错误抛出 ValueError"""
+    if not value:
+        return 0
+    return date_cls.fromisoformat(value).toordinal()
+
+
+def format_date_ordinal(ordinal: int) -> Optional[str]:
+    return date_cls.fromordinal(ordinal).isoformat() if ordinal else None
+
+
+def iso_week_key(ordinal: int) -> int:
+    """日期序数 -> ISO 周键（年 * 100 + 周次）"""
+    year, week, _ = date_cls.fromordinal(ordinal).isocalendar()
+    return year * 100 + week
+
+
+def timetable_key(date_ordinal: int, period: int = 0) -> int:
+    """教师课表索引键：日期序数与节次组合为一个整数，按 (日期, 节次) 排序"""
+    return (date_ordinal << 8) | period
+
+
+def _day_keys(record: ScheduleRecord) -> Tuple[int, ...]:
+    """记录占用的日键：星期（1-7），若指定日期另加日期序数"""
+    if record.date:
+        return record.day_of_week, record.date
+    return (record.day_of_week,)
+
+
+class SlotOccupancy:
+    """
+    时段占用索引
+
+    按 所有者（教师/教室编号）-> 日键 -> 节次位图 保存，内存只与
+    (所有者, 日) 组合数相关，与记录条数无关；同一节次被重复占用时另行计数
+    """
+
+    __slots__ = ('_days', '_extra')
+
+    def __init__(self):
+        self._days: Dict[int, Dict[int, int]] = {}
+        self._extra: Dict[Tuple[int, int, int], int] = {}
+
+    def add(self, owner: int, day_key: int, period: int):
+        days = self._days.setdefault(owner, {})
+        mask = days.get(day_key, 0)
+        bit = 1 << period
+        if mask & bit:
+            key = (owner, day_key, period)
+            self._extra[key] = self._extra.get(key, 0) + 1
+        else:
+            days[day_key] = mask | bit
+
+    def discard(self, owner: int, day_key: int, period: int):
+        key = (owner, day_key, period)
+        extra = self._extra.get(key)
+        if extra:
+            if extra > 1:
+                self._extra[key] = extra - 1
+            else:
+                del self._extra[key]
+            return
+
+        days = self._days.get(owner)
+        if not days:
+            return
+        mask = days.get(day_key, 0) & ~(1 << period)
+        if mask:
+            days[day_key] = mask
+        else:
+            days.pop(day_key, None)
+            if not days:
+                del self._days[owner]
+
+    def is_busy(self, owner: int, day_key: int, period: int) -> bool:
+        return bool(self._days.get(owner, {}).get(day_key, 0) >> period & 1)
+
+    def count(self, owner: int, day_key: int, period: int) -> int:
+        """所有者在该节次的占用次数"""
+        if not self.is_busy(owner, day_key, period):
+            return 0
+        return 1 + self._extra.get((owner, day_key, period), 0)
+
+    @classmethod
+    def from_arrays(cls, owners, day_keys, periods) -> 'SlotOccupancy':
+        """由 所有者/日键/节次 三列（NumPy 整数数组）批量构建索引"""
+        import numpy as np
+
+        occupancy = cls()
+        if not len(owners):
+            return occupancy
+        # 组合键：所有者 << 27 | 日键 << 6 | 节次（日键为星期或日期序数，小于 2^21；节次小于 64）
+        keys = (owners << 27) | (day_keys << 6) | periods
+        unique_keys, counts = np.unique(keys, return_counts=True)
+        for key, count in zip(unique_keys[counts > 1].tolist(), counts[counts > 1].tolist()):
+            occupancy._extra[(key >> 27, (key >> 6) & 0x1FFFFF, key & 63)] = count - 1
+
+        owner_days = unique_keys >> 6
+        bits = np.left_shift(1, unique_keys & 63)
+        starts = np.flatnonzero(np.concatenate([[True], owner_days[1:] != owner_days[:-1]]))
+        masks = np.bitwise_or.reduceat(bits, starts)
+        days = occupancy._days
+        for owner_day, mask in zip(owner_days[starts].tolist(), masks.tolist()):
+            owner = owner_day >> 21
+            owner_masks = days.get(owner)
+            if owner_masks is None:
+                owner_masks = days[owner] = {}
+            owner_masks[owner_day & 0x1FFFFF] = mask
+        return occupancy
+
+    def day_mask(self, owner: int, day_key: int) -> int:
+        """所有者某日已占用节次的位图"""
+        return self._days.get(owner, {}).get(day_key, 0)
+
+
+class TimetableIndex:
+    """
+    课表索引
+
+    按 所有者（教师/学生编号）保存按 timetable_key 排序的键数组与同序的排课ID列表，
+    写入时二分插入，按日期范围查询为两次二分查找加切片
+    """
+
+    __slots__ = ('_keys', '_ids')
+
+    def __init__(self):
+        self._keys: Dict[int, array] = {}
+        self._ids: Dict[int, List[str]] = {}
+
+    def add(self, owner: int, key: int, class_id: str):
+        keys = self._keys.get(owner)
+        if keys is None:
+            keys = self._keys[owner] = array('q')
+            self._ids[owner] = []
+        index = bisect_right(keys, key)
+        keys.insert(index, key)
+        self._ids[owner].insert(index, class_id)
+
+    def discard(self, owner: int, key: int, class_id: str):
+        keys = self._keys.get(owner)
+        if keys is None:
+            return
+        ids = self._ids[owner]
+        try:
+            # 同一时段可能有多条记录（小组课），在键相同的区间内定位排课ID
+            index = ids.index(class_id, bisect_left(keys, key), bisect_right(keys, key))
+        except ValueError:
+            return
+        del keys[index]
+        del ids[index]
+        if not ids:
+            del self._keys[owner]
+            del self._ids[owner]
+
+    def slice(self, owner: int, start: int = 0, end: int = 0) -> List[str]:
+        """日期序数在 [start, end) 内的排课ID（end 为 0 表示不限）"""
+        keys = self._keys.get(owner)
+        if keys is None:
+            return []
+        low = bisect_left(keys, timetable_key(start))
+        high = bisect_left(keys, timetable_key(end)) if end else len(keys)
+        return self._ids[owner][low:high]
+
+    @classmethod
+    def from_arrays(cls, owners, keys, ids: List[str]) -> 'TimetableIndex':
+        """由 所有者/键 两列（NumPy 整数数组，所有者为 -1 的行跳过）与排课ID批量构建索引"""
+        import numpy as np
+
+        index = cls()
+        order = np.lexsort((keys, owners))
+        order = order[owners[order] >= 0]
+        sorted_ids = [ids[position] for position in order.tolist()]
+        sorted_keys = keys[order]
+        sorted_owners = owners[order]
+        bounds = np.flatnonzero(np.diff(sorted_owners)) + 1
+        for start, end in zip([0] + bounds.tolist(), bounds.tolist() + [len(sorted_ids)]):
+            if start < end:
+                owner = int(sorted_owners[start])
+                index._keys[owner] = array('q', sorted_keys[start:end].astype(np.int64).tobytes())
+                index._ids[owner] = sorted_ids[start:end]
+        return index
+
+
+class ScheduleStore:
+    """
+    排课记录存储
+
+    - 记录按排课ID保存为 ScheduleRecord，字符串ID经驻留表转换为整数
+    - 维护教师 -> 排课ID 以及教师/教室的时段占用位图，
+      冲突检查与教师课表查询不需要遍历全部记录
+    - 维护教师按 ISO 周累计的标准课时（无日期的记录视为每周循环），周课时查询不遍历历史记录
+    - 维护教师与学生的课表索引（TimetableIndex）：按 (日期, 节次) 排序，
+      按日期范围查询课表为两次二分查找加切片（无日期的每周循环课日期为 0，排在最前）
+    - 维护学生的时段占用位图，学生冲突检查为 O(1)
+    - 小组课（无单个 student_id，成员由 student_ids 给出）的每名成员同样计入学生位图与课表索引
+    - 对外返回字典时调用 to_dict()
+    """
+
+    def __init__(self, share_interners: Optional['ScheduleStore'] = None):
+        """
+        Args:
+            share_interners: 与该存储共用驻留表（编号可直接比较），用于沙盒叠加层
+        """
+        if share_interners is not None:
+            self.teachers = share_interners.teachers
+            self.courses = share_interners.courses
+            self.rooms = share_interners.rooms
+            self.students = share_interners.students
+            self.faculties = share_interners.faculties
+            self.statuses = share_interners.statuses
+        else:
+            self.teachers = StringInterner()
+            self.courses = StringInterner()
+            self.rooms = StringInterner()
+            self.students = StringInterner()
+            self.faculties = StringInterner()
+            self.statuses = StringInterner()
+
+        self._records: Dict[str, ScheduleRecord] = {}
+        self._by_teacher: Dict[int, Dict[str, None]] = {}  # 教师编号 -> 有序排课ID集合
+        self.teacher_timetables = TimetableIndex()
+        self.student_timetables = TimetableIndex()
+        self.teacher_slots = SlotOccupancy()
+        self.room_slots = SlotOccupancy()
+        self.student_slots = SlotOccupancy()
+        # 小组课成员：排课ID -> 学生编号（仅小组课记录）
+        self._groups: Dict[str, Tuple[int, ...]] = {}
+        # 周课时累计：教师编号 -> 每周循环课时；教师编号 -> {ISO 周键: 有日期记录课时}
+        self._recurring_hours: Dict[int, int] = {}
+        self._dated_hours: Dict[int, Dict[int, int]] = {}
+        # 日期序数共享同一整数对象，避免每条记录各持一份
+        self._ordinals: Dict[int, int] = {}
+        # 可选的列式镜像（ScheduleColumns），挂载后统计查询走向量化路径
+        self.columns = None
+        # 可选的写入监听：listener(op, 新记录或被删除的记录, 修改前的记录（新增时为 None）)
+        self.listener = None
+
+    def attach_columns(self, columns):
+        """挂载列式镜像，并回填已有记录"""
+        for record in self._records.values():
+            columns.append(record)
+        self.columns = columns
+
+    def attach_listener(self, listener):
+        """挂载写入监听（变更推送），insert/set_room 通知 upsert，remove 通知 delete"""
+        self.listener = listener
+
+    # -------------------------------------------------
+    # 写入
+    # -------------------------------------------------
+
+    def insert(self, data: Dict) -> ScheduleRecord:
+        """
+        写入一条排课记录
+
+        Args:
+            data: 与原 schedule_db 字典格式一致的记录（id, teacher_id, course_id, room_id,
+                  student_id, day_of_week, period, date, faculty_code, status, created_at），
+                  可选 hours 为该节课的标准课时（默认 1），可选 student_ids 为小组课成员
+        """
+        class_id = data['id']
+        previous = self._discard(class_id)
+
+        created_at = data.get('created_at')
+        if isinstance(created_at, str):
+            created_at = int(datetime.fromisoformat(created_at).timestamp())
+        elif created_at is None:
+            created_at = int(datetime.now().timestamp())
+
+        record = ScheduleRecord(
+            class_id,
+            self.teachers.intern(data.get('teacher_id')),
+            self.courses.intern(data.get('course_id')),
+            self.rooms.intern(data.get('room_id')),
+            self.students.intern(data.get('student_id')),
+            int(data.get('day_of_week') or 0),
+            int(data.get('period') or 0),
+            self._shared_ordinal(parse_date_ordinal(data.get('date'))),
+            self.faculties.intern(data.get('faculty_code')),
+            self.statuses.intern(data.get('status', 'scheduled')),
+            int(created_at),
+            int(round(float(data.get('hours', 1)) * HOURS_SCALE))
+        )
+
+        self._records[class_id] = record
+        self._by_teacher.setdefault(record.teacher, {})[class_id] = None
+        key = timetable_key(record.date, record.period)
+        self.teacher_timetables.add(record.teacher, key, class_id)
+        if record.student >= 0:
+            self.student_timetables.add(record.student, key, class_id)
+        for day_key in _day_keys(record):
+            self.teacher_slots.add(record.teacher, day_key, record.period)
+            if record.room >= 0:
+                self.room_slots.add(record.room, day_key, record.period)
+            if record.student >= 0:
+                self.student_slots.add(record.student, day_key, record.period)
+        if data.get('student_ids'):
+            members = tuple(dict.fromkeys(self.students.intern(student_id) for student_id in data['student_ids']))
+            self._groups[class_id] = members
+            self._index_members(record, members, True)
+        self._add_hours(record, record.hours)
+        if self.columns is not None:
+            self.columns.append(record)
+        if self.listener is not None:
+            self.listener('upsert', record, previous)
+        return record
+
+    def _index_members(self, record: ScheduleRecord, members: Tuple[int, ...], add: bool):
+        """将小组课成员计入（或移出）学生课表索引与占用位图（与记录的 student 相同的成员不重复计入）"""
+        key = timetable_key(record.date, record.period)
+        day_keys = _day_keys(record)
+        for student in members:
+            if student == record.student:
+                continue
+            if add:
+                self.student_timetables.add(student, key, record.id)
+            else:
+                self.student_timetables.discard(student, key, record.id)
+            for day_key in day_keys:
+                if add:
+                    self.student_slots.add(student, day_key, record.period)
+                else:
+                    self.student_slots.discard(student, day_key, record.period)
+
+    def remove(self, class_id: str) -> Optional[ScheduleRecord]:
+        """删除排课记录，返回被删除的记录"""
+        record = self._discard(class_id)
+        if record is not None and self.listener is not None:
+            self.listener('delete', record, record)
+        return record
+
+    def _discard(self, class_id: str) -> Optional[ScheduleRecord]:
+        record = self._records.pop(class_id, None)
+        if record is None:
+            return None
+
+        teacher_classes = self._by_teacher.get(record.teacher)
+        if teacher_classes is not None:
+            teacher_classes.pop(class_id, None)
+            if not teacher_classes:
+                del self._by_teacher[record.teacher]
+        key = timetable_key(record.date, record.period)
+        self.teacher_timetables.discard(record.teacher, key, class_id)
+        if record.student >= 0:
+            self.student_timetables.discard(record.student, key, class_id)
+        for day_key in _day_keys(record):
+            self.teacher_slots.discard(record.teacher, day_key, record.period)
+            if record.room >= 0:
+                self.room_slots.discard(record.room, day_key, record.period)
+            if record.student >= 0:
+                self.student_slots.discard(record.student, day_key, record.period)
+        members = self._groups.pop(class_id, None)
+        if members:
+            self._index_members(record, members, False)
+        self._add_hours(record, -record.hours)
+        if self.columns is not None:
+            self.columns.discard(class_id)
+        return record
+
+    def _add_hours(self, record: ScheduleRecord, delta: int):
+        """累加（或扣减）记录所在周的教师课时"""
+        if record.date:
+            weeks = self._dated_hours.setdefault(record.teacher, {})
+            week = iso_week_key(record.date)
+            total = weeks.get(week, 0) + delta
+            if total:
+                weeks[week] = total
+            else:
+                weeks.pop(week, None)
+                if not weeks:
+                    del self._dated_hours[record.teacher]
+        else:
+            total = self._recurring_hours.get(record.teacher, 0) + delta
+            if total:
+                self._recurring_hours[record.teacher] = total
+            else:
+                self._recurring_hours.pop(record.teacher, None)
+
+    def set_room(self, class_id: str, room_id: Optional[str]) -> Optional[ScheduleRecord]:
+        """修改记录的教室并同步教室占用索引"""
+        record = self._records.get(class_id)
+        if record is None:
+            return None
+
+        room = self.rooms.intern(room_id)
+        if room == record.room:
+            return record
+        for day_key in _day_keys(record):
+            if record.room >= 0:
+                self.room_slots.discard(record.room, day_key, record.period)
+            if room >= 0:
+                self.room_slots.add(room, day_key, record.period)
+        record.room = room
+        if self.columns is not None:
+            self.columns.set_value(class_id, 'room_idx', room)
+        if self.listener is not None:
+            self.listener('upsert', record, record)
+        return record
+
+    # 快照中按列保存的记录字段（均为整数）
+    SNAPSHOT_FIELDS = (
+        'teacher', 'course', 'room', 'student', 'day_of_week', 'period',
+        'date', 'faculty', 'status', 'created_at', 'hours'
+    )
+    INTERNER_NAMES = ('teachers', 'courses', 'rooms', 'students', 'faculties', 'statuses')
+
+    def load_rows(self, interned: Dict[str, List[str]], ids: List[str], columns: Dict[str, object],
+                  groups: Optional[Dict[str, List[int]]] = None):
+        """
+        从快照批量恢复记录（存储须为空）：记录逐条构造，占用位图、教师索引与周课时按列批量计算
+
+        Args:
+            interned: 驻留表名 -> 字符串列表（编号即下标）
+            ids: 排课ID列表
+            columns: SNAPSHOT_FIELDS 中每个字段 -> 与 ids 等长的整数序列（list 或 array）
+            groups: 小组课排课ID -> 成员学生编号（见 group_rows()）
+        """
+        import numpy as np
+
+        for name in self.INTERNER_NAMES:
+            getattr(self, name).load(interned.get(name, []))
+
+        arrays = {name: np.asarray(columns[name], dtype=np.int64) for name in self.SNAPSHOT_FIELDS}
+        teacher, room = arrays['teacher'], arrays['room']
+        day, period, date, hours = arrays['day_of_week'], arrays['period'], arrays['date'], arrays['hours']
+        dated = date > 0
+
+        # 批量创建大量对象时暂停循环垃圾回收（记录之间没有循环引用）
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            ordinals = self._ordinals
+            values = [arrays[name].tolist() for name in self.SNAPSHOT_FIELDS]
+            values[6] = [ordinals.setdefault(ordinal, ordinal) for ordinal in values[6]]
+            self._records.update(zip(ids, map(ScheduleRecord, ids, *values)))
+
+            # 教师 -> 排课ID（稳定排序保持原有顺序）
+            order = np.argsort(teacher, kind='stable')
+            sorted_ids = [ids[index] for index in order.tolist()]
+            sorted_teachers = teacher[order]
+            bounds = np.flatnonzero(np.diff(sorted_teachers)) + 1
+            starts = [0] + bounds.tolist()
+            ends = bounds.tolist() + [len(sorted_ids)]
+            for start, end in zip(starts, ends):
+                if start < end:
+                    self._by_teacher[int(sorted_teachers[start])] = dict.fromkeys(sorted_ids[start:end])
+
+            # 教师与学生课表索引
+            keys = (date << 8) | period
+            self.teacher_timetables = TimetableIndex.from_arrays(teacher, keys, ids)
+            self.student_timetables = TimetableIndex.from_arrays(arrays['student'], keys, ids)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        # 占用位图：星期与日期两种日键
+        self.teacher_slots = SlotOccupancy.from_arrays(
+            np.concatenate([teacher, teacher[dated]]),
+            np.concatenate([day, date[dated]]),
+            np.concatenate([period, period[dated]])
+        )
+        roomed = room >= 0
+        self.room_slots = SlotOccupancy.from_arrays(
+            np.concatenate([room[roomed], room[roomed & dated]]),
+            np.concatenate([day[roomed], date[roomed & dated]]),
+            np.concatenate([period[roomed], period[roomed & dated]])
+        )
+        student = arrays['student']
+        with_student = student >= 0
+        self.student_slots = SlotOccupancy.from_arrays(
+            np.concatenate([student[with_student], student[with_student & dated]]),
+            np.concatenate([day[with_student], date[with_student & dated]]),
+            np.concatenate([period[with_student], period[with_student & dated]])
+        )
+
+        # 周课时累计
+        undated = ~dated
+        owners, inverse = np.unique(teacher[undated], return_inverse=True)
+        totals = np.bincount(inverse, weights=hours[undated], minlength=len(owners))
+        for owner, total in zip(owners.tolist(), totals.tolist()):
+            if total:
+                self._recurring_hours[owner] = int(total)
+
+        unique_dates, date_index = np.unique(date[dated], return_inverse=True)
+        weeks = np.array([iso_week_key(ordinal) for ordinal in unique_dates.tolist()], dtype=np.int64)
+        keys = teacher[dated] * 1000000 + weeks[date_index]
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse, weights=hours[dated], minlength=len(unique_keys))
+        for key, total in zip(unique_keys.tolist(), totals.tolist()):
+            if total:
+                owner, week = divmod(key, 1000000)
+                self._dated_hours.setdefault(owner, {})[week] = int(total)
+
+        # 小组课数量很少，成员逐条计入索引
+        for class_id, members in (groups or {}).items():
+            record = self._records.get(class_id)
+            if record is not None:
+                members = tuple(members)
+                self._groups[class_id] = members
+                self._index_members(record, members, True)
+
+        if self.columns is not None:
+            for record in self._records.values():
+                self.columns.append(record)
+
+    def _shared_ordinal(self, ordinal: int) -> int:
+        return self._ordinals.setdefault(ordinal, ordinal)
+
+    # -------------------------------------------------
+    # 读取
+    # -------------------------------------------------
+
+    def get(self, class_id: str) -> Optional[ScheduleRecord]:
+        return self._records.get(class_id)
+
+    def __contains__(self, class_id: str) -> bool:
+        return class_id in self._records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[ScheduleRecord]:
+        return iter(self._records.values())
+
+    def records(self) -> Iterator[ScheduleRecord]:
+        return iter(self._records.values())
+
+    def teacher_records(self, teacher_id: str) -> List[ScheduleRecord]:
+        """教师的全部排课记录"""
+        class_ids = self._by_teacher.get(self.teachers.lookup(teacher_id), ())
+        return [self._records[class_id] for class_id in class_ids]
+
+    def teacher_timetable(self, teacher_id: str, start: int = 0, end: int = 0) -> List[ScheduleRecord]:
+        """
+        教师课表：日期序数在 [start, end) 内的记录，按 (日期, 节次) 排序
+
+        start 为 0 时包含无日期的每周循环课（排在最前），end 为 0 表示不限
+        """
+        records = self._records
+        return [records[class_id] for class_id in
+                self.teacher_timetables.slice(self.teachers.lookup(teacher_id), start, end)]
+
+    def student_timetable(self, student_id: str, start: int = 0, end: int = 0) -> List[ScheduleRecord]:
+        """学生课表（同 teacher_timetable）"""
+        records = self._records
+        return [records[class_id] for class_id in
+                self.student_timetables.slice(self.students.lookup(student_id), start, end)]
+
+    def teacher_class_count(self, teacher_id: str) -> int:
+        return len(self._by_teacher.get(self.teachers.lookup(teacher_id), ()))
+
+    def record_students(self, record: ScheduleRecord) -> Tuple[int, ...]:
+        """记录涉及的学生编号：小组课为全部成员，否则为单个学生（无学生时为空）"""
+        members = self._groups.get(record.id)
+        if members is not None:
+            return members
+        return (record.student,) if record.student >= 0 else ()
+
+    def group_students(self, class_id: str) -> Optional[List[str]]:
+        """小组课成员学生ID（非小组课返回 None）"""
+        members = self._groups.get(class_id)
+        return [self.students.value(student) for student in members] if members is not None else None
+
+    def group_rows(self) -> Dict[str, Tuple[int, ...]]:
+        """全部小组课成员（排课ID -> 学生编号），用于快照"""
+        return dict(self._groups)
+
+    def teacher_hour_parts(self, teacher: int) -> Tuple[int, Dict[int, int]]:
+        """教师课时累计原始值：(每周循环课时, {ISO 周键: 有日期记录课时})，单位为 1/HOURS_SCALE"""
+        return self._recurring_hours.get(teacher, 0), self._dated_hours.get(teacher, {})
+
+    def teacher_weekly_hours(self, teacher_id: str, date: Optional[str] = None) -> float:
+        """
+        教师周标准课时
+
+        给定日期时为该日期所在 ISO 周的课时（每周循环课时 + 该周有日期记录课时）；
+        未给定日期时为每周循环课时加上课时最多一周的有日期记录课时
+        """
+        teacher = self.teachers.lookup(teacher_id)
+        if teacher < 0:
+            return 0.0
+        weeks = self._dated_hours.get(teacher, {})
+        if date:
+            dated = weeks.get(iso_week_key(parse_date_ordinal(date)), 0)
+        else:
+            dated = max(weeks.values(), default=0)
+        return (self._recurring_hours.get(teacher, 0) + dated) / HOURS_SCALE
+
+    def is_teacher_busy(self, teacher_id: str, period: int,
+                        date: Optional[str] = None, day_of_week: Optional[int] = None) -> bool:
+        """教师在指定时段是否已有课程（给定日期按日期判断，否则按星期判断）"""
+        teacher = self.teachers.lookup(teacher_id)
+        if teacher < 0:
+            return False
+        return self.teacher_slots.is_busy(teacher, self.day_key(date, day_of_week), int(period))
+
+    def is_student_busy(self, student_id: Optional[str], period: int,
+                        date: Optional[str] = None, day_of_week: Optional[int] = None) -> bool:
+        """学生在指定时段是否已有课程（给定日期按日期判断，否则按星期判断）"""
+        student = self.students.lookup(student_id)
+        if student < 0:
+            return False
+        return self.student_slots.is_busy(student, self.day_key(date, day_of_week), int(period))
+
+    def unroomed_records(self) -> List[ScheduleRecord]:
+        """尚未分配教室的记录"""
+        return [record for record in self._records.values() if record.room < 0]
+
+    def is_room_busy(self, room_id: str, period: int,
+                     date: Optional[str] = None, day_of_week: Optional[int] = None) -> bool:
+        """教室在指定时段是否已被占用（给定日期按日期判断，否则按星期判断）"""
+        room = self.rooms.lookup(room_id)
+        if room < 0:
+            return False
+        return self.room_slots.is_busy(room, self.day_key(date, day_of_week), int(period))
+
+    @staticmethod
+    def day_key(date: Optional[str], day_of_week: Optional[int]) -> int:
+        """查询用日键：给定日期时为日期序数，否则为星期"""
+        if date:
+            return parse_date_ordinal(date)
+        return int(day_of_week or 0)
+
+    def day_label(self, record: ScheduleRecord) -> str:
+        """记录的日期标签：有日期时为 YYYY-MM-DD，否则为星期数字"""
+        return format_date_ordinal(record.date) or str(record.day_of_week)
+
+    # -------------------------------------------------
+    # 统计（挂载列式镜像时向量化计算）
+    # -------------------------------------------------
+
+    def count_by_faculty(self) -> Dict[str, int]:
+        """教研室代码 -> 排课数"""
+        if self.columns is not None:
+            counts = self.columns.count_by('faculty_idx', len(self.faculties)).tolist()
+        else:
+            counts = [0] * len(self.faculties)
+            for record in self._records.values():
+                if record.faculty >= 0:
+                    counts[record.faculty] += 1
+        return dict(zip(self.faculties.values(), counts))
+
+    def day_distribution_by_faculty(self) -> Dict[str, Dict[str, int]]:
+        """教研室代码 -> 按日分布（日期或星期 -> 排课数）"""
+        if self.columns is not None:
+            distributions = self.columns.day_distributions('faculty_idx', len(self.faculties))
+        else:
+            distributions = [{} for _ in range(len(self.faculties))]
+            for record in self._records.values():
+                if record.faculty >= 0:
+                    distribution = distributions[record.faculty]
+                    label = self.day_label(record)
+                    distribution[label] = distribution.get(label, 0) + 1
+        return dict(zip(self.faculties.values(), distributions))
+
+    # -------------------------------------------------
+    # 序列化
+    # -------------------------------------------------
+
+    def to_dict(self, record: ScheduleRecord) -> Dict:
+        """还原为原 schedule_db 的字典格式（小组课另含 student_ids）"""
+        data = {
+            "id": record.id,
+            "teacher_id": self.teachers.value(record.teacher),
+            "course_id": self.courses.value(record.course),
+            "room_id": self.rooms.value(record.room),
+            "student_id": self.students.value(record.student),
+            "day_of_week": record.day_of_week,
+            "period": record.period,
+            "date": format_date_ordinal(record.date),
+            "faculty_code": self.faculties.value(record.faculty),
+            "status": self.statuses.value(record.status),
+            "created_at": datetime.fromtimestamp(record.created_at).isoformat(),
+            "hours": record.hours / HOURS_SCALE
+        }
+        members = self._groups.get(record.id)
+        if members is not None:
+            data["student_ids"] = [self.students.value(student) for student in members]
+        return data
@@ -0,0 +1,158 @@
+"""
+增量同步写入日志
+对教师、课程、排课与教学资格数据的每次写入分配单调递增的版本号，
+每个键只保留最新一次写入（日志压缩）；删除保留为墓碑，墓碑过多时丢弃最早的一批并抬高同步下限
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, List, Optional, Tuple
+
+# 墓碑数超过该值时压缩
+MAX_TOMBSTONES = 10000
+
+
+class SyncLog:
+    """
+    版本化写入日志
+
+    - entries: (集合, 键) -> (版本, 是否删除)，按版本升序排列（写入时移到末尾）
+    - 日志只记录键与版本，数据在查询时从当前存储读取，不额外占用一份数据内存
+    - floor: 被丢弃墓碑的最大版本；since < floor 的客户端可能错过删除，需要全量重建
+    """
+
+    def __init__(self, max_tombstones: int = MAX_TOMBSTONES):
+        self.version = 0
+        self.floor = 0
+        self.max_tombstones = max_tombstones
+        self._entries: 'OrderedDict[Tuple[str, Hashable], Tuple[int, bool]]' = OrderedDict()
+        self._tombstones: 'OrderedDict[Tuple[str, Hashable], int]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def record(self, collection: str, key: Hashable, deleted: bool = False) -> int:
+        """记录一次写入，返回新版本号"""
+        with self._lock:
+            self.version += 1
+            entry = (collection, key)
+            self._entries[entry] = (self.version, deleted)
+            self._entries.move_to_end(entry)
+            self._tombstones.pop(entry, None)
+            if deleted:
+                self._tombstones[entry] = self.version
+                if len(self._tombstones) > self.max_tombstones:
+                    self._compact(len(self._tombstones) // 2)
+            return self.version
+
+    def compact(self, drop: int):
+        """丢弃最早的 drop 个墓碑并抬高同步下限"""
+        with self._lock:
+            self._compact(drop)
+
+    def _compact(self, drop: int):
+        for _ in range(min(drop, len(self._tombstones))):
+            entry, version = self._tombstones.popitem(last=False)
+            del self._entries[entry]
+            self.floor = max(self.floor, version)
+
+    def export(self) -> List[Tuple]:
+        """全部日志项 [(集合, 键, 版本, 是否删除)]，按版本升序（用于快照）"""
+        with self._lock:
+            return [(collection, key, version, deleted)
+                    for (collection, key), (version, deleted) in self._entries.items()]
+
+    def restore(self, entries: Iterable[Tuple], version: int = 0, floor: int = 0):
+        """
+        从快照与预写日志恢复：entries 按版本升序，同一键以后出现的为准
+
+        version / floor 为快照时的版本与同步下限（重放的日志项版本更大时以日志为准）
+        """
+        with self._lock:
+            self._entries.clear()
+            self._tombstones.clear()
+            self.version = version
+            self.floor = floor
+            for collection, key, entry_version, deleted in entries:
+                entry = (collection, key)
+                self._entries[entry] = (entry_version, deleted)
+                self._entries.move_to_end(entry)
+                self._tombstones.pop(entry, None)
+                if deleted:
+                    self._tombstones[entry] = entry_version
+                self.version = max(self.version, entry_version)
+
+    def changes_since(self, since: int, limit: Optional[int] = None) -> Tuple[List[Tuple], bool, int]:
+        """
+        版本大于 since 的写入（每个键只保留最新一次，按版本升序）
+
+        Returns:
+            ([(集合, 键, 版本, 是否删除)], reset, version)
+            reset 为 True 表示 since 早于同步下限，返回全部现存数据（不含墓碑），客户端应整体替换；
+            version 为下次请求使用的版本（结果被 limit 截断时为最后一条的版本）
+        """
+        with self._lock:
+            reset = since < self.floor
+            if reset:
+                since = 0
+
+            changes = []
+            for (collection, key), (version, deleted) in reversed(self._entries.items()):
+                if version <= since:
+                    break
+                if reset and deleted:
+                    continue
+                changes.append((collection, key, version, deleted))
+            version = self.version
+        changes.reverse()
+
+        if limit is not None and len(changes) > limit:
+            changes = changes[:limit]
+            version = changes[-1][2]
+        return changes, reset, version
+
+
+class TrackedDict(dict):
+    """
+    写入时通知回调的字典：on_change(键, 是否删除)
+
+    只跟踪顶层键的写入；修改值内部（如教师字典的字段）时由调用方自行记录
+    """
+
+    def __init__(self, on_change: Callable[[Hashable, bool], None], *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_change = on_change
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.on_change(key, False)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.on_change(key, True)
+
+    def pop(self, key, *default):
+        present = key in self
+        value = super().pop(key, *default)
+        if present:
+            self.on_change(key, True)
+        return value
+
+    def popitem(self):
+        key, value = super().popitem()
+        self.on_change(key, True)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        for key in list(self):
+            del self[key]
@@ -1,16 +1,21 @@
 """
 音乐学校课程排课系统后端API
 教师管理模块 - 支持按教研室和专业分配
+
+路由注册在 teacher_management_bp 上，由 app.create_app() 与教研室管理接口一起注册，
+教师、教学资格与资格矩阵使用 app_state 注入的共享状态
 """
 
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+from flask import Blueprint, request, jsonify
 from datetime import datetime
 from typing import List, Dict, Optional
 import uuid
 
-app = Flask(__name__)
-CORS(app)
+from app_state import SchedulerState, get_state
+from faculty_registry import FacultyRegistry, current_registry, install_registry
+from qualification_matrix import QUAL_FACULTY_MISMATCH, QUAL_NOT_GRANTED
+
+teacher_management_bp = Blueprint('teacher_management', __name__)
 
 # 教研室配置
 FACULTY_CONFIG = {
@@ -19,139 +24,121 @@ FACULTY_CONFIG = {
     '器乐专业': {'code': 'INSTRUMENT', 'description': '负责所有器乐课程教学'}
 }
 
-# 乐器到教研室映射
-FACULTY_MAPPING = {
-    '钢琴': '钢琴专业',
-    '声乐': '声乐专业',
-    '古筝': '器乐专业',
-    '笛子': '器乐专业',
-    '竹笛': '器乐专业',
-    '古琴': '器乐专业',
-    '葫芦丝': '器乐专业',
-    '双排键': '器乐专业',
-    '小提琴': '器乐专业',
-    '萨克斯': '器乐专业',
-    '大提琴': '器乐专业'
-}
-
-# 乐器配置（每班最多学生数）
+# 乐器配置（每班最多学生数、课时系数）
 INSTRUMENT_CONFIGS = {
-    '钢琴': {'max_students': 5, 'faculty': '钢琴专业'},
-    '声乐': {'max_students': 5, 'faculty': '声乐专业'},
-    '古筝': {'max_students': 8, 'faculty': '器乐专业'},
-    '笛子': {'max_students': 8, 'faculty': '器乐专业'},
-    '竹笛': {'max_students': 8, 'faculty': '器乐专业'},
-    '古琴': {'max_students': 5, 'faculty': '器乐专业'},
-    '葫芦丝': {'max_students': 8, 'faculty': '器乐专业'},
-    '双排键': {'max_students': 5, 'faculty': '器乐专业'},
-    '小提琴': {'max_students': 5, 'faculty': '器乐专业'},
-    '萨克斯': {'max_students': 5, 'faculty': '器乐专业'},
-    '大提琴': {'max_students': 5, 'faculty': '器乐专业'}
+    '钢琴': {'max_students': 5, 'faculty': '钢琴专业', 'duration_coefficient': 0.5},
+    '声乐': {'max_students': 5, 'faculty': '声乐专业', 'duration_coefficient': 0.5},
+    '古筝': {'max_students': 8, 'faculty': '器乐专业', 'duration_coefficient': 0.5},
+    '笛子': {'max_students': 8, 'faculty': '器乐专业', 'duration_coefficient': 0.5},
+    '竹笛': {'max_students': 8, 'faculty': '器乐专业', 'duration_coefficient': 0.5},
+    '古琴': {'max_students': 5, 'faculty': '器乐专业', 'duration_coefficient': 0.5},
+    '葫芦丝': {'max_students': 8, 'faculty': '器乐专业', 'duration_coefficient': 0.5},
+    '双排键': {'max_students': 5, 'faculty': '器乐专业', 'duration_coefficient': 0.5},
+    '小提琴': {'max_students': 5, 'faculty': '器乐专业', 'duration_coefficient': 0.5},
+    '萨克斯': {'max_students': 5, 'faculty': '器乐专业', 'duration_coefficient': 0.5},
+    '大提琴': {'max_students': 5, 'faculty': '器乐专业', 'duration_coefficient': 0.5}
 }
 
-# 内存数据库（实际项目中应使用MySQL/PostgreSQL）
-teachers_db = {}
-teacher_instruments_db = {}  # teacher_id -> List[instrument_name]
+# 课时系数默认值（与 v2 schema instrument_config.duration_coefficient 默认值一致）
+DEFAULT_DURATION_COEFFICIENT = 0.5
+
+# 只读注册表：各接口通过 current_registry() 解析教研室名称/代码与乐器配置
+install_registry(FacultyRegistry(FACULTY_CONFIG, INSTRUMENT_CONFIGS, DEFAULT_DURATION_COEFFICIENT))
 
 
 class TeacherManagement:
-    """教师管理类"""
+    """教师管理类（操作注入的共享状态，资格矩阵中教研室按代码比较）"""
 
     @staticmethod
-    def assign_teacher_to_faculty(teacher_id: str, instrument_name: str) -> Dict:
+    def assign_teacher_to_faculty(state: SchedulerState, teacher_id: str, instrument_name: str) -> Dict:
         """
         根据教师教授的乐器分配教研室
         """
-        faculty_name = FACULTY_MAPPING.get(instrument_name, '器乐专业')
+        registry = current_registry()
+        faculty_name = registry.instrument_faculty_name(instrument_name) or '器乐专业'
+        faculty_code = registry.faculty_code(faculty_name)
 
         update_data = {
-            'faculty_id': FACULTY_CONFIG[faculty_name]['code'],
+            'faculty_id': faculty_code,
+            'faculty_code': faculty_code,
             'faculty_name': faculty_name,
             'primary_instrument': instrument_name,
             'updated_at': datetime.now().isoformat()
         }
 
         # 更新教师信息
-        if teacher_id in teachers_db:
-            teachers_db[teacher_id].update(update_data)
+        teacher = state.teachers.get(teacher_id)
+        if teacher is not None:
+            teacher.update(update_data)
+            state.register_teacher(teacher_id, teacher)
 
-        # 添加到教师可教授乐器列表
-        TeacherManagement.add_teacher_instrument(teacher_id, instrument_name, 'primary')
+            # 添加到教师可教授乐器列表
+            TeacherManagement.add_teacher_instrument(state, teacher_id, instrument_name, 'primary')
 
         return update_data
 
     @staticmethod
-    def add_teacher_instrument(teacher_id: str, instrument_name: str, instrument_type: str = 'primary'):
-        """添加教师可教授乐器"""
-        if teacher_id not in teacher_instruments_db:
-            teacher_instruments_db[teacher_id] = []
-
-        # 检查是否已存在
-        exists = any(
-            inst['instrument_name'] == instrument_name
-            for inst in teacher_instruments_db[teacher_id]
-        )
-
-        if not exists:
-            teacher_instruments_db[teacher_id].append({
-                'instrument_name': instrument_name,
-                'instrument_type': instrument_type,
-                'added_at': datetime.now().isoformat()
-            })
+    def add_teacher_instrument(state: SchedulerState, teacher_id: str, instrument_name: str,
+                               instrument_type: str = 'primary'):
+        """添加教师可教授乐器（已有该乐器资格时不修改熟练程度）"""
+        teacher = state.teachers.get(teacher_id)
+        if teacher is None or instrument_name not in state.qualifications.instrument_ids:
+            return
+        if instrument_name not in state.teacher_instruments.get(teacher_id, {}):
+            state.grant_qualification(teacher_id, teacher, instrument_name, instrument_type)
 
     @staticmethod
-    def get_teachers_by_faculty_and_instrument(faculty_name: str, instrument_name: Optional[str] = None) -> List[Dict]:
+    def get_teachers_by_faculty_and_instrument(state: SchedulerState, faculty_name: str,
+                                               instrument_name: Optional[str] = None) -> List[Dict]:
         """
-        根据教研室和乐器获取教师列表
+        根据教研室和乐器获取教师列表（教研室可以是名称或代码）
         """
-        result = []
-
-        for teacher_id, teacher_data in teachers_db.items():
-            # 检查教研室
-            if teacher_data.get('faculty_name') != faculty_name:
-                continue
-
-            # 检查乐器
-            if instrument_name:
-                teacher_instruments = [
-                    inst['instrument_name']
-                    for inst in teacher_instruments_db.get(teacher_id, [])
-                ]
-                if instrument_name not in teacher_instruments:
-                    continue
-
-            result.append(teacher_data)
+        faculty_code = current_registry().faculty_code(faculty_name)
+
+        # 按乐器筛选时由资格矩阵直接给出候选教师
+        if instrument_name:
+            candidates = (
+                state.teachers[teacher_id]
+                for teacher_id in state.qualifications.teachers_for(instrument_name, require_faculty_match=False)
+                if teacher_id in state.teachers
+            )
+        else:
+            candidates = state.teachers.values()
+
+        result = [
+            teacher_data for teacher_data in candidates
+            if faculty_code and teacher_data.get('faculty_code') == faculty_code
+        ]
 
         return sorted(result, key=lambda x: x.get('name', ''))
 
     @staticmethod
-    def validate_teacher_qualification(teacher_id: str, instrument_name: str) -> Dict:
+    def validate_teacher_qualification(state: SchedulerState, teacher_id: str, instrument_name: str) -> Dict:
         """
         验证教师是否有资格教授指定乐器
         """
+        registry = current_registry()
+
         # 获取教师教研室
-        teacher_faculty = teachers_db.get(teacher_id, {}).get('faculty_name')
+        teacher_faculty = registry.faculty_name(state.teachers.get(teacher_id, {}).get('faculty_code'))
 
         # 获取乐器所属教研室
-        instrument_faculty = FACULTY_MAPPING.get(instrument_name)
+        instrument_faculty = registry.instrument_faculty_name(instrument_name)
 
         if not teacher_faculty or not instrument_faculty:
             return {'valid': False, 'reason': '教研室信息不完整'}
 
+        flags = state.qualifications.check(teacher_id, instrument_name)
+
         # 检查教研室是否匹配
-        if teacher_faculty != instrument_faculty:
+        if flags & QUAL_FACULTY_MISMATCH:
             return {
                 'valid': False,
                 'reason': f'教师属于{teacher_faculty}，无法教授{instrument_name}（{instrument_faculty}）'
             }
 
         # 检查教师是否具备该乐器教学资格
-        teacher_instruments = [
-            inst['instrument_name']
-            for inst in teacher_instruments_db.get(teacher_id, [])
-        ]
-
-        if instrument_name not in teacher_instruments:
+        if flags & QUAL_NOT_GRANTED:
             return {
                 'valid': False,
                 'reason': f'教师未被授权教授{instrument_name}'
@@ -162,53 +149,62 @@ class TeacherManagement:
 
 # API 路由
 
-@app.route('/api/teachers', methods=['GET'])
+@teacher_management_bp.route('/api/teachers', methods=['GET'])
 def get_teachers():
     """获取教师列表"""
+    state = get_state()
     faculty = request.args.get('faculty')
     instrument = request.args.get('instrument')
 
     if faculty:
-        teachers = TeacherManagement.get_teachers_by_faculty_and_instrument(faculty, instrument)
+        teachers = TeacherManagement.get_teachers_by_faculty_and_instrument(state, faculty, instrument)
     else:
-        teachers = list(teachers_db.values())
+        teachers = list(state.teachers.values())
 
     return jsonify({'success': True, 'data': teachers})
 
 
-@app.route('/api/teachers', methods=['POST'])
+@teacher_management_bp.route('/api/teachers', methods=['POST'])
 def create_teacher():
     """创建教师"""
+    state = get_state()
     data = request.json
 
     teacher_id = str(uuid.uuid4())
+    registry = current_registry()
+    faculty = data.get('faculty_name') or data.get('faculty_id')
+    faculty_name = registry.faculty_name(faculty)
+    faculty_code = registry.faculty_code(faculty)
 
     teacher_data = {
         'id': teacher_id,
         'name': data['name'],
         'email': data['email'],
         'password': data['password'],  # 生产环境应加密
-        'faculty_id': data.get('faculty_id'),
-        'faculty_name': data.get('faculty_name'),
+        'faculty_id': faculty_code,
+        'faculty_code': faculty_code,
+        'faculty_name': faculty_name,
+        'can_teach_instruments': [],
         'created_at': datetime.now().isoformat()
     }
 
-    teachers_db[teacher_id] = teacher_data
+    with state.lock:
+        state.register_teacher(teacher_id, teacher_data)
 
-    # 添加教师可教授乐器
-    for instrument in data.get('instruments', []):
-        TeacherManagement.add_teacher_instrument(teacher_id, instrument, 'secondary')
+        # 添加教师可教授乐器
+        for instrument in data.get('instruments', []):
+            TeacherManagement.add_teacher_instrument(state, teacher_id, instrument, 'secondary')
 
     return jsonify({'success': True, 'data': teacher_data}), 201
 
 
-@app.route('/api/teachers/<teacher_id>/validate', methods=['POST'])
+@teacher_management_bp.route('/api/teachers/<teacher_id>/validate', methods=['POST'])
 def validate_teacher(teacher_id: str):
     """验证教师资格"""
     data = request.json
     instrument_name = data.get('instrument_name')
 
-    result = TeacherManagement.validate_teacher_qualification(teacher_id, instrument_name)
+    result = TeacherManagement.validate_teacher_qualification(get_state(), teacher_id, instrument_name)
 
     return jsonify({
         'success': True,
@@ -216,42 +212,34 @@ def validate_teacher(teacher_id: str):
     })
 
 
-@app.route('/api/faculties', methods=['GET'])
+@teacher_management_bp.route('/api/faculties', methods=['GET'])
 def get_faculties():
     """获取教研室列表"""
-    faculties = []
-
-    for name, config in FACULTY_CONFIG.items():
-        faculties.append({
-            'faculty_name': name,
-            'faculty_code': config['code'],
-            'description': config['description']
-        })
-
-    return jsonify({'success': True, 'data': faculties})
+    return jsonify({'success': True, 'data': current_registry().faculties()})
 
 
-@app.route('/api/instruments', methods=['GET'])
+@teacher_management_bp.route('/api/instruments', methods=['GET'])
 def get_instruments():
     """获取乐器列表（含配置）"""
+    registry = current_registry()
     instruments = []
 
-    for name, config in INSTRUMENT_CONFIGS.items():
+    for name in registry.instrument_names:
         instruments.append({
             'instrument_name': name,
-            'max_students': config['max_students'],
-            'faculty': config['faculty']
+            'max_students': registry.max_students(name),
+            'faculty': registry.instrument_faculty_name(name)
         })
 
     return jsonify({'success': True, 'data': instruments})
 
 
-@app.route('/api/instruments/<instrument_name>/max-students', methods=['GET'])
+@teacher_management_bp.route('/api/instruments/<instrument_name>/max-students', methods=['GET'])
 def get_instrument_max_students(instrument_name: str):
     """获取乐器每班最多学生数"""
-    config = INSTRUMENT_CONFIGS.get(instrument_name)
+    registry = current_registry()
 
-    if not config:
+    if not registry.has_instrument(instrument_name):
         return jsonify({
             'success': False,
             'error': f'乐器 {instrument_name} 不存在'
@@ -261,13 +249,14 @@ def get_instrument_max_students(instrument_name: str):
         'success': True,
         'data': {
             'instrument_name': instrument_name,
-            'max_students': config['max_students']
+            'max_students': registry.max_students(instrument_name)
         }
     })
 
 
 if __name__ == '__main__':
-    # 支持Render等云平台的端口配置
+    # 兼容旧的启动命令：与 app.py 相同，启动包含全部接口的统一应用
     import os
+    from app import create_app
     port = int(os.environ.get('PORT', 5000))
-    app.run(debug=False, host='0.0.0.0', port=port)
+    create_app().run(debug=False, host='0.0.0.0', port=port)
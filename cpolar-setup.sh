@@ -58,7 +58,7 @@ fi
 
 # 启动服务（后台运行）
 echo "启动Flask服务..."
-nohup python teacher_management.py > ../backend.log 2>&1 &
+nohup python app.py > ../backend.log 2>&1 &
 BACKEND_PID=$!
 
 echo "后端服务已启动 (PID: $BACKEND_PID)"
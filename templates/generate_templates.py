@@ -2,26 +2,36 @@
 """生成音乐学校排课系统数据导入模板"""
 
 import os
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-
-# 设置中文字体
-try:
-    from openpyxl.styles import Font
-    font = Font(name='SimHei', size=11)
-except:
-    font = Font(size=11)
-
-# 样式定义
-header_fill = PatternFill(start_color="6B5B95", end_color="6B5B95", fill_type="solid")
-header_font = Font(name='SimHei', size=11, bold=True, color="FFFFFF")
-thin_border = Border(
-    left=Side(style='thin'),
-    right=Side(style='thin'),
-    top=Side(style='thin'),
-    bottom=Side(style='thin')
-)
+
+# openpyxl 在生成模板时才加载，导入本模块不依赖 openpyxl
+Workbook = Alignment = get_column_letter = None
+font = header_fill = header_font = thin_border = None
+
+
+def load_openpyxl():
+    """加载 openpyxl 与样式定义（重复调用无副作用）"""
+    global Workbook, Alignment, get_column_letter, font, header_fill, header_font, thin_border
+    if Workbook is not None:
+        return
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from openpyxl.utils import get_column_letter
+
+    # 设置中文字体
+    try:
+        font = Font(name='SimHei', size=11)
+    except:
+        font = Font(size=11)
+
+    # 样式定义
+    header_fill = PatternFill(start_color="6B5B95", end_color="6B5B95", fill_type="solid")
+    header_font = Font(name='SimHei', size=11, bold=True, color="FFFFFF")
+    thin_border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
 
 def set_column_widths(ws, widths):
     """设置列宽"""
@@ -30,6 +40,7 @@ def set_column_widths(ws, widths):
 
 def create_students_template():
     """创建学生导入模板"""
+    load_openpyxl()
     wb = Workbook()
     ws = wb.active
     ws.title = "学生"
@@ -68,6 +79,7 @@ def create_students_template():
 
 def create_courses_template():
     """创建课程导入模板"""
+    load_openpyxl()
     wb = Workbook()
     ws = wb.active
     ws.title = "课程"
@@ -106,6 +118,7 @@ def create_courses_template():
 
 def create_rooms_template():
     """创建教室导入模板"""
+    load_openpyxl()
     wb = Workbook()
     ws = wb.active
     ws.title = "教室"
@@ -0,0 +1,90 @@
+"""
+排课归档格式基准测试
+对比 schedule_db 字典格式的 JSON 导出与列式归档段的体积、编码耗时，
+以及历史工作量统计（按教师汇总课时）在归档段整数列上计算与还原为字典后计算的耗时
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from schedule_store import ScheduleStore  # noqa: E402
+from schedule_archive import (  # noqa: E402
+    ArchiveSegment, CODECS, encode_records, encode_segment, write_segment, workload_report
+)
+from schedule_memory_benchmark import generate_records  # noqa: E402
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def run_archive_benchmark(count: int = 300000):
+    """运行归档格式基准测试"""
+    print("=" * 60)
+    print(f"排课归档格式基准测试（{count} 条排课记录）")
+    print("=" * 60)
+
+    store = ScheduleStore()
+    for record in generate_records(count):
+        store.insert(record)
+    records = list(store.records())
+
+    dicts = [store.to_dict(record) for record in records]
+    json_data, json_ms = timed(lambda: json.dumps(dicts, ensure_ascii=False).encode('utf-8'))
+    print(f"  JSON 导出:         {len(json_data) / 1024 / 1024:8.2f} MB  {json_ms:8.1f} ms")
+
+    results = {'json_bytes': len(json_data)}
+    encoded = encode_records(store, records)
+    for codec in CODECS:
+        data, encode_ms = timed(lambda: encode_segment(*encoded, codec=codec))
+        print(f"  归档段（{codec}）:     {len(data) / 1024 / 1024:8.2f} MB  {encode_ms:8.1f} ms")
+        results[f'{codec}_bytes'] = len(data)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.seg')
+        write_segment(path, encode_segment(*encoded))
+
+        def report_from_segment():
+            segment = ArchiveSegment(path)
+            try:
+                return workload_report([segment])
+            finally:
+                segment.close()
+
+        def report_from_dicts():
+            segment = ArchiveSegment(path)
+            try:
+                totals = defaultdict(float)
+                for row in range(segment.rows):
+                    item = segment.to_dict(row)
+                    totals[item['teacher_id']] += item['hours']
+                return totals
+            finally:
+                segment.close()
+
+        columnar, columnar_ms = timed(report_from_segment)
+        inflated, inflated_ms = timed(report_from_dicts)
+    print(f"  工作量统计（列）:   {columnar_ms:8.1f} ms")
+    print(f"  工作量统计（字典）: {inflated_ms:8.1f} ms")
+
+    results['reports_match'] = all(
+        abs(inflated[row['teacher_id']] - row['hours']) < 1e-6 for row in columnar['teachers']
+    ) and len(columnar['teachers']) == len(inflated)
+    results['columnar_ms'] = columnar_ms
+    results['inflated_ms'] = inflated_ms
+    return results
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    result = run_archive_benchmark(count)
+    exit(0 if result['reports_match'] and result['zlib_bytes'] < result['json_bytes'] else 1)
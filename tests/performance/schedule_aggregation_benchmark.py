@@ -0,0 +1,70 @@
+"""
+排课统计基准测试
+对比 ScheduleStore 逐条遍历与 ScheduleColumns 向量化两种路径的全校统计耗时
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from schedule_columns import ScheduleColumns  # noqa: E402
+from schedule_memory_benchmark import generate_records  # noqa: E402
+from schedule_store import ScheduleStore  # noqa: E402
+
+
+def full_school_aggregation(store: ScheduleStore):
+    """教研室工作量汇总所需的全部统计"""
+    return store.count_by_faculty(), store.day_distribution_by_faculty()
+
+
+def time_ms(func, iterations: int) -> float:
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def run_aggregation_benchmark(count: int = 1000000):
+    """运行统计基准测试"""
+    print("=" * 60)
+    print(f"排课统计基准测试（{count} 条记录）")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    store = ScheduleStore()
+    store.attach_columns(ScheduleColumns(count))
+    for record in generate_records(count):
+        store.insert(record)
+    print(f"\n  写入耗时:     {time.perf_counter() - start:8.1f} s")
+
+    columns = store.columns
+    vectorized_ms = time_ms(lambda: full_school_aggregation(store), iterations=10)
+    vectorized_result = full_school_aggregation(store)
+
+    store.columns = None
+    loop_ms = time_ms(lambda: full_school_aggregation(store), iterations=2)
+    loop_result = full_school_aggregation(store)
+    store.columns = columns
+
+    print(f"  逐条遍历:     {loop_ms:8.1f} ms")
+    print(f"  向量化统计:   {vectorized_ms:8.1f} ms")
+    print(f"  加速比:       {loop_ms / max(vectorized_ms, 1e-6):8.1f}x")
+    print(f"  结果一致:     {'是' if loop_result == vectorized_result else '否'}")
+
+    return {
+        'records': count,
+        'loop_ms': loop_ms,
+        'vectorized_ms': vectorized_ms,
+        'consistent': loop_result == vectorized_result
+    }
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    result = run_aggregation_benchmark(count)
+    exit(0 if result['consistent'] and result['vectorized_ms'] < result['loop_ms'] else 1)
@@ -0,0 +1,92 @@
+"""
+排课记录内存基准测试
+对比原 schedule_db 字典记录与 ScheduleStore 紧凑记录在大规模数据下的内存占用
+"""
+
+import gc
+import os
+import random
+import sys
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+from schedule_store import ScheduleStore  # noqa: E402
+
+
+def generate_records(count: int, seed: int = 42):
+    """生成与排课API写入格式一致的模拟记录"""
+    rng = random.Random(seed)
+    teachers = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(300)]
+    rooms = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(120)]
+    courses = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(2000)]
+    students = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(5000)]
+    faculties = ['PIANO', 'VOCAL', 'INSTRUMENT']
+    base_date = datetime(2024, 2, 26)
+
+    for _ in range(count):
+        day_offset = rng.randrange(0, 140)
+        yield {
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "teacher_id": rng.choice(teachers),
+            "course_id": rng.choice(courses),
+            "room_id": rng.choice(rooms),
+            "student_id": rng.choice(students),
+            "day_of_week": day_offset % 7 + 1,
+            "period": rng.randint(1, 10),
+            "date": (base_date + timedelta(days=day_offset)).strftime('%Y-%m-%d'),
+            "faculty_code": rng.choice(faculties),
+            "status": "scheduled",
+            "created_at": (base_date + timedelta(seconds=rng.randrange(10 ** 7))).isoformat()
+        }
+
+
+def measure(build) -> float:
+    """测量构建过程净增内存（MB）"""
+    gc.collect()
+    tracemalloc.start()
+    holder = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del holder
+    gc.collect()
+    return current / 1024 / 1024
+
+
+def run_memory_benchmark(count: int = 300000):
+    """运行内存基准测试"""
+    print("=" * 60)
+    print(f"排课记录内存基准测试（{count} 条记录）")
+    print("=" * 60)
+
+    def build_dicts():
+        return {record['id']: record for record in generate_records(count)}
+
+    def build_store():
+        store = ScheduleStore()
+        for record in generate_records(count):
+            store.insert(record)
+        return store
+
+    dict_mb = measure(build_dicts)
+    store_mb = measure(build_store)
+    reduction = (1 - store_mb / dict_mb) * 100 if dict_mb else 0
+
+    print(f"\n  字典记录:     {dict_mb:8.1f} MB  ({dict_mb * 1024 * 1024 / count:.0f} 字节/条)")
+    print(f"  紧凑记录:     {store_mb:8.1f} MB  ({store_mb * 1024 * 1024 / count:.0f} 字节/条，含冲突索引)")
+    print(f"  内存减少:     {reduction:8.1f}%")
+
+    return {
+        'records': count,
+        'dict_mb': dict_mb,
+        'store_mb': store_mb,
+        'reduction_percent': reduction
+    }
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    result = run_memory_benchmark(count)
+    exit(0 if result['store_mb'] < result['dict_mb'] else 1)
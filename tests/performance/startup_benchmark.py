@@ -0,0 +1,102 @@
+"""
+启动耗时基准测试
+在全新进程中测量应用导入耗时、首个配置接口响应时间与数据预热（快照恢复）完成时间
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend')
+
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed_data_dir(count: int):
+    """生成 count 条排课记录并写入 SCHEDULER_DATA_DIR 下的快照（在子进程中执行）"""
+    from app import create_app
+    from api import faculty_api
+    from schedule_memory_benchmark import generate_records
+
+    create_app(warm_up_async=False)
+    with faculty_api.store_lock:
+        for record in generate_records(count):
+            faculty_api.schedule_db.insert(record)
+    faculty_api.persistence.snapshot(faculty_api.capture_state)
+
+
+def measure_startup() -> dict:
+    """测量当前进程的启动各阶段耗时（在全新子进程中执行）"""
+    started = time.perf_counter()
+    from app import create_app
+    from api.faculty_api import warm_up_done
+    imported = time.perf_counter()
+
+    app = create_app()
+    client = app.test_client()
+    created = time.perf_counter()
+
+    response = client.get('/api/blocked-time/terms')
+    first_response = time.perf_counter()
+    assert response.status_code == 200, response.status_code
+
+    warm_up_done.wait()
+    ready = time.perf_counter()
+
+    response = client.get('/api/sync?since=0&limit=100')
+    first_data_response = time.perf_counter()
+
+    return {
+        'import_ms': (imported - started) * 1000,
+        'create_app_ms': (created - imported) * 1000,
+        'first_response_ms': (first_response - started) * 1000,
+        'ready_ms': (ready - started) * 1000,
+        'first_data_response_ms': (first_data_response - started) * 1000,
+        'data_status': response.status_code
+    }
+
+
+def run_child(mode: str, data_dir: str, count: int = 0) -> dict:
+    env = dict(os.environ, SCHEDULER_DATA_DIR=data_dir, SNAPSHOT_INTERVAL='3600')
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), mode, str(count)],
+        env=env, cwd=BACKEND_DIR, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1]) if mode == '--measure' else {}
+
+
+def run_startup_benchmark(count: int = 200000, runs: int = 3):
+    """运行启动基准测试"""
+    print("=" * 60)
+    print(f"启动耗时基准测试（快照 {count} 条排课记录，取 {runs} 次最小值）")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        if count:
+            run_child('--seed', data_dir, count)
+        results = [run_child('--measure', data_dir) for _ in range(runs)]
+
+    best = {key: min(result[key] for result in results) for key in results[0] if key.endswith('_ms')}
+    print(f"  导入应用模块:     {best['import_ms']:8.1f} ms")
+    print(f"  创建应用:         {best['create_app_ms']:8.1f} ms")
+    print(f"  首个配置接口响应: {best['first_response_ms']:8.1f} ms")
+    print(f"  数据预热完成:     {best['ready_ms']:8.1f} ms")
+    print(f"  首个数据接口响应: {best['first_data_response_ms']:8.1f} ms")
+
+    return dict(best, records=count, data_ok=all(result['data_status'] == 200 for result in results))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--seed':
+        seed_data_dir(int(sys.argv[2]))
+    elif len(sys.argv) > 1 and sys.argv[1] == '--measure':
+        print(json.dumps(measure_startup()))
+    else:
+        count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+        result = run_startup_benchmark(count)
+        # 配置接口应在数据预热完成前响应
+        exit(0 if result['data_ok'] and result['first_response_ms'] < result['ready_ms'] else 1)